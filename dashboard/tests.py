@@ -1,3 +1,78 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+from tasks.models import Task
 
-# Create your tests here.
+Employee = get_user_model()
+
+
+def create_employee(number):
+    return Employee.objects.create_user(
+        username=f'employee{number}',
+        name=f'موظف {number}',
+        email=f'employee{number}@example.com',
+        job_number=f'J{number}',
+        mobile_number='0500000000',
+        section='admin',
+    )
+
+
+class NotificationsFeedTests(TestCase):
+    """The notifications poll reads the feed after its cursor and answers 304 when unchanged"""
+
+    def setUp(self):
+        self.creator = create_employee(1)
+        self.assignee = create_employee(2)
+        self.url = reverse('dashboard:notifications_ajax')
+        self.client.force_login(self.assignee)
+
+    def assign_task(self, name):
+        return Task.objects.create(name=name, created_by=self.creator, assigned_to=self.assignee)
+
+    def test_unchanged_feed_is_not_modified(self):
+        self.assign_task('مهمة 1')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_item_changes_the_etag(self):
+        self.assign_task('مهمة 1')
+        etag = self.client.get(self.url)['ETag']
+
+        self.assign_task('مهمة 2')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['count'], 2)
+
+    def test_since_returns_newer_items_and_advances_cursor(self):
+        self.assign_task('مهمة 1')
+        first = self.client.get(self.url).json()
+        self.assertEqual([item['task_name'] for item in first['notifications']], ['مهمة 1'])
+
+        self.assign_task('مهمة 2')
+        self.assign_task('مهمة 3')
+        newer = self.client.get(self.url, {'since': first['cursor']}).json()
+
+        self.assertEqual([item['task_name'] for item in newer['notifications']], ['مهمة 3', 'مهمة 2'])
+        self.assertEqual(newer['cursor'], newer['notifications'][0]['id'])
+        self.assertGreater(newer['cursor'], first['cursor'])
+
+        unchanged = self.client.get(self.url, {'since': newer['cursor']}).json()
+        self.assertEqual(unchanged['count'], 0)
+        self.assertEqual(unchanged['cursor'], newer['cursor'])
+
+    def test_bad_since_falls_back_to_zero(self):
+        self.assign_task('مهمة 1')
+
+        for since in ('abc', '-5', ''):
+            data = self.client.get(self.url, {'since': since}).json()
+            self.assertEqual(data['count'], 1, since)
+            self.assertEqual(data['cursor'], data['notifications'][0]['id'])
+
+        response = self.client.get(self.url, {'since': 'abc'})
+        self.assertEqual(response['ETag'], self.client.get(self.url, {'since': 0})['ETag'])
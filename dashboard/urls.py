@@ -13,4 +13,7 @@ urlpatterns = [
     
     # AJAX endpoints
     path('api/notifications/', views.get_notifications_ajax, name='notifications_ajax'),
+    
+    # Live updates (Server-Sent Events, needs the ASGI application)
+    path('api/events/', views.live_events_stream, name='live_events'),
 ]
\ No newline at end of file
@@ -1,9 +1,16 @@
+import asyncio
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import condition
 from django.db.models import Q, Count
 from django.utils import timezone
-from datetime import datetime, timedelta
-from tasks.models import Task, MonthlyGoal
+from datetime import datetime
+from tasks.models import MonthlyGoal
+from tasks.services.task_stats import get_task_stats
+from tasks.services.dashboard_snapshot import get_dashboard_snapshot
+from tasks.services.activity_feed import get_activity_items, get_latest_activity_id, serialize_activity_item
+from tasks.services.live_events import format_sse, get_live_event_hub, get_live_events_settings
 
 
 # ===== تحديث Dashboard View =====
@@ -25,78 +32,36 @@ def dashboard_view(request):
     # ===== NOTIFICATIONS SECTION =====
     # (الإشعارات تبقى كما هي...)
     
-    # ===== MY TASKS SECTION =====
-    # Get user's current tasks (ALL tasks related to user - created OR assigned)
-    my_tasks = Task.objects.filter(
-        Q(created_by=user) | Q(assigned_to=user)
-    ).filter(status='new').select_related('project', 'created_by', 'assigned_to').order_by('due_date', '-created_at')[:8]
-    
-    # Add permission flags to each task
-    for task in my_tasks:
-        task.can_be_edited_by = task.can_be_edited_by(user)
-        task.can_be_deleted_by = task.can_be_deleted_by(user)
-        task.can_change_status_by = task.can_change_status_by(user)
-    
-    # ===== إحصائيات محدّثة =====
-    # إجمالي جميع المهام (المُنشأة أو المُسندة للمستخدم)
-    total_my_tasks = Task.objects.filter(
-        Q(created_by=user) | Q(assigned_to=user)
-    ).count()
-    
-    # المهام المُنشأة من قبل المستخدم (شامل المُسندة للآخرين)
-    my_created_tasks = Task.objects.filter(created_by=user).count()
-    
-    # المهام المُسندة للمستخدم فقط
-    assigned_to_me_tasks = Task.objects.filter(assigned_to=user).count()
-    
-    # المهام المُنشأة والمُسندة للآخرين
-    my_assigned_to_others = Task.objects.filter(
-        created_by=user, 
-        assigned_to__isnull=False
-    ).exclude(assigned_to=user).count()
-    
-    # المهام المكتملة اليوم (جميع المهام المرتبطة بالمستخدم)
-    completed_tasks_today = Task.objects.filter(
-        Q(created_by=user) | Q(assigned_to=user),
-        status='finished',
-        updated_at__date=today
-    ).count()
-    
-    # المهام المعلقة (حالة جديد)
-    pending_tasks = Task.objects.filter(
-        Q(created_by=user) | Q(assigned_to=user),
-        status='new'
-    ).count()
-    
-    # المهام المتأخرة
-    overdue_tasks = Task.objects.filter(
-        Q(created_by=user) | Q(assigned_to=user),
-        status='new',
-        due_date__lt=today
-    ).count()
-    
-    # Monthly goals count for current user
-    monthly_goals_count = MonthlyGoal.objects.filter(
-        employee=user,
-        year=datetime.now().year
-    ).count()
+    # ===== MY TASKS SECTION + إحصائيات =====
+    # Counters, next open tasks and goals come from the user's cached snapshot,
+    # rebuilt only when a task or goal involving the user changes
+    snapshot = get_dashboard_snapshot(user)
+    my_tasks = snapshot['my_tasks']
+    task_counters = snapshot['task_counters']
+    monthly_goals_count = snapshot['monthly_goals_count']
+    notifications = snapshot['notifications']
     
     context = {
         'title': 'الرئيسية',
         'current_page': 'dashboard',
         'greeting_message': greeting_message,
         
+        # Notifications (activity feed)
+        'notifications': notifications,
+        'notifications_count': len(notifications),
+        'notifications_cursor': notifications[0].pk if notifications else 0,
+        
         # Tasks
         'my_tasks': my_tasks,
         
         # إحصائيات مفصّلة
-        'total_my_tasks': total_my_tasks,
-        'my_created_tasks': my_created_tasks,
-        'assigned_to_me_tasks': assigned_to_me_tasks,
-        'my_assigned_to_others': my_assigned_to_others,
-        'completed_tasks_today': completed_tasks_today,
-        'pending_tasks': pending_tasks,
-        'overdue_tasks': overdue_tasks,
+        'total_my_tasks': task_counters['total'],
+        'my_created_tasks': task_counters['created'],
+        'assigned_to_me_tasks': task_counters['assigned_to_me'],
+        'my_assigned_to_others': task_counters['assigned_to_others'],
+        'completed_tasks_today': task_counters['completed_today'],
+        'pending_tasks': task_counters['pending'],
+        'overdue_tasks': task_counters['overdue'],
         'monthly_goals_count': monthly_goals_count,
     }
     
@@ -110,20 +75,12 @@ def profile_view(request):
     user = request.user
     
     # Get user's task statistics
+    task_counters = get_task_stats(request)
     task_stats = {
-        'total_created': Task.objects.filter(created_by=user).count(),
-        'total_assigned': Task.objects.filter(assigned_to=user).count(),
-        'completed_this_month': Task.objects.filter(
-            Q(created_by=user) | Q(assigned_to=user),
-            status='finished',
-            updated_at__month=datetime.now().month,
-            updated_at__year=datetime.now().year
-        ).count(),
-        'overdue': Task.objects.filter(
-            Q(created_by=user) | Q(assigned_to=user),
-            status='new',
-            due_date__lt=timezone.now().date()
-        ).count()
+        'total_created': task_counters['created'],
+        'total_assigned': task_counters['assigned_to_me'],
+        'completed_this_month': task_counters['completed_this_month'],
+        'overdue': task_counters['overdue'],
     }
     
     # Get monthly goals count
@@ -150,55 +107,71 @@ def settings_view(request):
     return render(request, 'dashboard/settings.html', context)
 
 
+def _parse_since(request):
+    """
+    The since cursor of a feed poll (id of the newest item the client has), 0 if absent
+    """
+    try:
+        return max(int(request.GET.get('since', 0)), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _notifications_etag(request):
+    """
+    ETag of a feed poll: the answer only changes when a newer item exists
+    """
+    return f"{request.user.pk}-{_parse_since(request)}-{get_latest_activity_id(request.user.pk)}"
+
+
 @login_required
+@condition(etag_func=_notifications_etag)
 def get_notifications_ajax(request):
-    """AJAX endpoint to get fresh notifications without page reload"""
-    from django.http import JsonResponse
-    
-    user = request.user
-    
-    # Get recent notifications (similar logic as in dashboard_view)
-    notifications = []
-    
-    # Recent tasks assigned to me
-    recent_assigned_tasks = Task.objects.filter(
-        assigned_to=user,
-        created_at__gte=timezone.now() - timedelta(days=7),
-        status='new'
-    ).select_related('created_by').order_by('-created_at')[:5]
-    
-    for task in recent_assigned_tasks:
-        notifications.append({
-            'type': 'new-task',
-            'task_name': task.name,
-            'from_user_name': task.created_by.name,
-            'from_user_avatar': task.created_by.profile_picture.url if task.created_by.profile_picture else None,
-            'created_at': task.created_at.strftime('%Y-%m-%d %H:%M'),
-            'task_id': task.pk
-        })
-    
-    # Recently completed tasks I assigned
-    completed_assigned_tasks = Task.objects.filter(
-        created_by=user,
-        assigned_to__isnull=False,
-        status='finished',
-        updated_at__gte=timezone.now() - timedelta(days=3)
-    ).exclude(assigned_to=user).select_related('assigned_to').order_by('-updated_at')[:5]
-    
-    for task in completed_assigned_tasks:
-        notifications.append({
-            'type': 'completed-task',
-            'task_name': task.name,
-            'from_user_name': task.assigned_to.name,
-            'from_user_avatar': task.assigned_to.profile_picture.url if task.assigned_to.profile_picture else None,
-            'created_at': task.updated_at.strftime('%Y-%m-%d %H:%M'),
-            'task_id': task.pk
-        })
-    
-    # Sort by creation time
-    notifications = sorted(notifications, key=lambda x: x['created_at'], reverse=True)[:10]
+    """
+    AJAX endpoint polled for new notifications.
+    Reads the user's activity feed after the `since` cursor; an unchanged feed
+    answers 304 Not Modified after a single index lookup (If-None-Match).
+    """
+    since = _parse_since(request)
+    items = get_activity_items(request.user.pk, since=since)
+    notifications = [serialize_activity_item(item) for item in items]
     
     return JsonResponse({
         'notifications': notifications,
-        'count': len(notifications)
-    })
\ No newline at end of file
+        'count': len(notifications),
+        'cursor': items[0].pk if items else since,
+    })
+
+
+@login_required
+async def live_events_stream(request):
+    """
+    Server-Sent Events stream of the user's live updates: task-assigned,
+    task-completed, task-status and task-deadline events. Served by the ASGI
+    application; each open stream waits on an in-process queue, so nothing
+    is polled. A comment line is sent periodically to keep proxies from
+    closing an idle stream.
+    """
+    user = await request.auser()
+    hub = get_live_event_hub()
+    keepalive = get_live_events_settings().get('KEEPALIVE_SECONDS', 15)
+    
+    async def stream():
+        subscriber = hub.subscribe(user.pk)
+        queue = subscriber[1]
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                yield format_sse(event)
+        finally:
+            hub.unsubscribe(user.pk, subscriber)
+    
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
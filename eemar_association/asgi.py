@@ -2,6 +2,8 @@
 ASGI config for eemar_association project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The web process runs it (see Procfile) so the live events stream
+(dashboard:live_events, Server-Sent Events) can stay open without holding a worker.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -34,6 +34,13 @@ app.conf.beat_schedule = {
         'options': {'queue': 'periodic'}
     },
     
+    # إرسال الإشعارات المتبقية في صندوق الإشعارات الصادرة (كل دقيقة)
+    'process-notification-outbox': {
+        'task': 'tasks.tasks.process_notification_outbox_task',
+        'schedule': crontab(minute='*'),  # Every minute
+        'options': {'queue': 'emails'}
+    },
+    
     # إرسال الملخص اليومي (الموجود مسبقاً)
     'send-daily-digests': {
         'task': 'tasks.tasks.send_daily_digests_to_all_users',
@@ -55,6 +62,13 @@ app.conf.beat_schedule = {
         'options': {'queue': 'maintenance'}
     },
     
+    # إعادة احتساب عدادات المهام لإصلاح أي انحراف فيها (يومياً بعد منتصف الليل)
+    'rebuild-task-counters': {
+        'task': 'tasks.tasks.rebuild_task_counters_task',
+        'schedule': crontab(hour=0, minute=5),  # 12:05 AM daily
+        'options': {'queue': 'maintenance'}
+    },
+    
     # إرسال التقارير الأسبوعية (يوم الأحد الساعة 10 صباحاً)
     'send-weekly-reports': {
         'task': 'tasks.tasks.send_weekly_summary_reports',
@@ -102,7 +116,9 @@ app.conf.update(
         'tasks.tasks.send_task_assigned_email_task': {'queue': 'emails'},
         'tasks.tasks.send_task_completed_email_task': {'queue': 'emails'},
         'tasks.tasks.send_task_overdue_email_task': {'queue': 'emails'},
+        'tasks.tasks.send_overdue_notifications_chunk_task': {'queue': 'emails'},
         'tasks.tasks.send_daily_digest_task': {'queue': 'emails'},
+        'tasks.tasks.process_notification_outbox_task': {'queue': 'emails'},
         'tasks.deadline_notifications.send_deadline_reminder_email': {'queue': 'emails'},
         
         # المهام الدورية
@@ -114,6 +130,7 @@ app.conf.update(
         # مهام الصيانة
         'tasks.tasks.cleanup_old_notification_logs': {'queue': 'maintenance'},
         'tasks.tasks.update_notification_statistics': {'queue': 'maintenance'},
+        'tasks.tasks.rebuild_task_counters_task': {'queue': 'maintenance'},
         
         # مهام المراقبة
         'tasks.tasks.monitor_email_queue_health': {'queue': 'monitoring'},
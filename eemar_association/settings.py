@@ -189,6 +189,15 @@ EMAIL_HOST_USER = 'emaar2023@gmail.com'
 EMAIL_HOST_PASSWORD = 'jofo ffrs siry bfeb'
 DEFAULT_FROM_EMAIL = 'جمعية إعمار <emaar2023@gmail.com>'
 
+# Persistent SMTP connections reused by the notification services (per worker process)
+EMAIL_CONNECTION_POOL = {
+    'MAX_CONNECTIONS': 2,  # batches hold at most MAX_CONNECTIONS - 1, one is left for single sends
+    'IDLE_TIMEOUT': 60,  # seconds before an idle connection is reopened
+    'MAX_MESSAGES_PER_CONNECTION': 100,
+    'ACQUIRE_TIMEOUT': 30,  # seconds to wait for a free connection
+    'CHECK_AFTER_IDLE': 10,  # seconds idle before a reused connection is checked with NOOP
+}
+
 # ====== CELERY CONFIGURATION ======
 # Redis URL for Celery (you can use Railway's Redis or local Redis)
 REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
@@ -332,6 +341,21 @@ NOTIFICATION_SETTINGS = {
     'MAX_DAILY_REMINDERS_PER_TASK': 3,
     'REMINDER_INTERVAL_HOURS': 4,
     
+    # Notification outbox (task notifications are sent after the transaction commits)
+    'OUTBOX_MAX_ATTEMPTS': 5,
+    'OUTBOX_RETRY_DELAY_SECONDS': 60,  # doubled after every failed attempt
+    'OUTBOX_STALE_MINUTES': 10,  # requeue entries stuck in processing after a crash
+    'OUTBOX_BATCH_SIZE': 100,
+    'OUTBOX_THREAD_WORKERS': 2,  # local sender threads when Celery is not used
+    
+    # Overdue notifications are sent by Celery workers in chunks of this many tasks
+    'OVERDUE_CHUNK_SIZE': 100,
+    
+    # Workers re-check the shared template version at most this often (seconds)
+    'TEMPLATE_VERSION_CHECK_SECONDS': 5,
+    'PREFERENCE_VERSION_CHECK_SECONDS': 5,
+    'PREFERENCE_CACHE_SIZE': 5000,  # users whose preferences a worker keeps in memory
+    
     # Task notifications
     'TASK_ASSIGNED': {
         'enabled': True,
@@ -409,6 +433,16 @@ EMAIL_TEMPLATE_SETTINGS = {
 }
 
 # ====== TASK MANAGEMENT SETTINGS ======
+# Live updates (Server-Sent Events)
+LIVE_EVENTS_SETTINGS = {
+    # auto: Redis pub/sub in production, else Postgres LISTEN/NOTIFY, else in-process only
+    'BACKEND': os.environ.get('LIVE_EVENTS_BACKEND', 'auto'),
+    # Only an explicitly configured Redis is used by 'auto' (REDIS_URL has a localhost default)
+    'REDIS_URL': os.environ.get('REDIS_URL'),
+    'KEEPALIVE_SECONDS': 15,
+    'QUEUE_SIZE': 100,  # pending events kept per open stream
+}
+
 TASK_SETTINGS = {
     'DEFAULT_STATUS': 'new',
     'STATUS_CHOICES': [
@@ -426,6 +460,43 @@ TASK_SETTINGS = {
     'AUTO_ASSIGN_NOTIFICATIONS': True,
     'AUTO_COMPLETION_NOTIFICATIONS': True,
     'OVERDUE_CHECK_ENABLED': True,
+    'STATS_CACHE_TIMEOUT': 0,  # seconds to cache per-user task counters across requests (0 disables)
+    'DASHBOARD_CACHE_TIMEOUT': 60,  # safety-net lifetime of per-user dashboard snapshots (invalidated on change)
+}
+
+# ====== RENOVATION ESTIMATE SETTINGS ======
+RENOVATION_SETTINGS = {
+    'CURRENCY': 'ر.س',
+    'REPORT_CACHE_TIMEOUT': 3600,  # safety-net lifetime of program reports (invalidated on change)
+    # Estimated cost of one room with the given condition value: {field: {value: cost}}
+    'UNIT_COSTS': {
+        'furniture_condition': {'needs_change': 1500},
+        'windows_condition': {'maintenance': 150, 'needs_change': 600},
+        'doors_condition': {'maintenance': 150, 'needs_change': 700},
+        'ceiling_condition': {'maintenance': 400, 'needs_change': 2500},
+        'insulation_condition': {'needs_insulation': 1200},
+        'gypsum_condition': {'maintenance': 300, 'iron': 600},
+        'paint_condition': {'maintenance': 300, 'treatment': 600},
+        'wall_condition': {'maintenance': 400, 'treatment': 800},
+        'floor_condition': {'maintenance': 400, 'needs_change': 1800},
+        'level_condition': {'medium': 1000, 'large': 3000},
+        'ac_condition': {'maintenance': 200, 'needs_change': 2200},
+        'electrical_voltage': {'needs_conversion': 1500},
+        'electrical_extensions': {'external': 800, 'partial': 400},
+        'electrical_finishing': {'maintenance': 200, 'needs_change': 600},
+        'plumbing_extensions': {'external': 1000, 'partial': 500},
+        'plumbing_finishing': {'maintenance': 200, 'needs_change': 700},
+        'heater_condition': {'maintenance': 150, 'needs_change': 600},
+        'extractor_condition': {'none': 250, 'needs_central': 900},
+        'ground_tank_condition': {'maintenance': 500, 'needs_change': 3000},
+        'overhead_tank_condition': {'maintenance': 300, 'needs_change': 1200},
+        'tank_accessories_condition': {'maintenance': 150, 'needs_change': 400},
+        'appliances_condition': {'maintenance': 300, 'needs_change': 1500},
+        'kitchen_condition': {'maintenance': 1500, 'new': 8000},
+        'courtyard_floor_condition': {'maintenance': 800, 'needs_change': 3000},
+        'courtyard_wall_condition': {'needs_change': 2500, 'humidity': 1200},
+        'exterior_paint': {'treated': 1500, 'iron': 2000},
+    },
 }
 
 # ====== DEVELOPMENT SETTINGS ======
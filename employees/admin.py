@@ -7,6 +7,7 @@ from django.contrib.auth import get_user_model
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
+from tasks.exports import EMPLOYEE_EXPORT, export_response
 
 Employee = get_user_model()
 
@@ -113,7 +114,8 @@ class EmployeeAdmin(UserAdmin):
         'deactivate_employees',
         'make_staff',
         'remove_staff',
-        'export_employees'
+        'export_employees',
+        'export_employees_xlsx'
     ]
     
 
@@ -159,47 +161,14 @@ class EmployeeAdmin(UserAdmin):
     remove_staff.short_description = 'إزالة صلاحيات الإدارة'
     
     def export_employees(self, request, queryset):
-        """Export selected employees to CSV"""
-        import csv
-        from django.http import HttpResponse
-        from datetime import datetime
-        
-        response = HttpResponse(content_type='text/csv; charset=utf-8')
-        response['Content-Disposition'] = f'attachment; filename="employees_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-        
-        # Add BOM for proper Arabic display in Excel
-        response.write('\ufeff')
-        
-        writer = csv.writer(response)
-        
-        # Write header
-        writer.writerow([
-            'الاسم الكامل',
-            'اسم المستخدم', 
-            'الرقم الوظيفي',
-            'المسمى الوظيفي',
-            'القسم',
-            'البريد الإلكتروني',
-            'رقم الجوال',
-            'تاريخ التوظيف',
-            'الحالة',
-            'تاريخ آخر دخول'
-        ])
-        
-        # Write data
-        for employee in queryset:
-            writer.writerow([
-                employee.name,
-                employee.username,
-                employee.job_number,
-                employee.job_title,
-                employee.get_section_display_arabic(),
-                employee.email,
-                employee.mobile_number,
-                employee.last_login.strftime('%Y-%m-%d %H:%M') if employee.last_login else 'لم يدخل'
-            ])
-        
-        return response
+        """Export selected employees to CSV (streamed)"""
+        return export_response(EMPLOYEE_EXPORT, queryset, 'csv')
+    
+    def export_employees_xlsx(self, request, queryset):
+        """Export selected employees to Excel (streamed)"""
+        return export_response(EMPLOYEE_EXPORT, queryset, 'xlsx')
+    export_employees_xlsx.short_description = 'تصدير الموظفين المحددين إلى Excel'
+    
     export_employees.short_description = 'تصدير الموظفين المحددين إلى CSV'
     
     def get_queryset(self, request):
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.4 on 2026-10-16 14:00
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+from tasks.search import build_search_text, create_search_indexes, drop_search_indexes, fill_search_vectors
+
+
+def backfill_search_fields(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    Employee = apps.get_model('employees', 'Employee')
+
+    employees = list(Employee.objects.using(alias))
+    for employee in employees:
+        employee.search_text = build_search_text([
+            employee.name, employee.username, employee.email, employee.job_title, employee.job_number,
+        ])
+    Employee.objects.using(alias).bulk_update(employees, ['search_text'], batch_size=500)
+
+    fill_search_vectors(schema_editor, Employee)
+
+
+def add_search_indexes(apps, schema_editor):
+    create_search_indexes(schema_editor, 'employees_employee')
+
+
+def remove_search_indexes(apps, schema_editor):
+    drop_search_indexes(schema_editor, 'employees_employee')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0002_remove_employee_hire_date'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='employee',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='نص البحث'),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='فهرس البحث'),
+        ),
+        migrations.RunPython(backfill_search_fields, migrations.RunPython.noop),
+        migrations.RunPython(add_search_indexes, remove_search_indexes),
+    ]
@@ -4,8 +4,9 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
 from django.urls import reverse
+from tasks.search import SearchIndexedModel
 
-class Employee(AbstractUser):
+class Employee(AbstractUser, SearchIndexedModel):
     """
     Extended User model for employees with additional Arabic-specific fields
     Updated to support multiple project assignments
@@ -87,6 +88,9 @@ class Employee(AbstractUser):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Fields copied (normalized) into search_text for tasks.search.search()
+    SEARCH_FIELDS = ('name', 'username', 'email', 'job_title', 'job_number')
+    
     class Meta:
         verbose_name = "موظف"
         verbose_name_plural = "الموظفين"
@@ -2,12 +2,13 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.http import JsonResponse
-from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db.models import Q, Count
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.hashers import make_password
+from tasks.search import search
+from tasks.pagination import KeysetPaginator
 import json
 
 Employee = get_user_model()
@@ -29,13 +30,7 @@ def index(request):
     # Search functionality
     search_query = request.GET.get('search', '')
     if search_query:
-        employees = employees.filter(
-            Q(name__icontains=search_query) |
-            Q(username__icontains=search_query) |
-            Q(email__icontains=search_query) |
-            Q(job_title__icontains=search_query) |
-            Q(job_number__icontains=search_query)
-        )
+        employees = search(employees, search_query)
     
     # Filter by section
     section_filter = request.GET.get('section', '')
@@ -49,47 +44,32 @@ def index(request):
     elif status_filter == 'inactive':
         employees = employees.filter(is_active_employee=False)
     
-    # Add task statistics to each employee
-    employees_with_stats = []
-    for employee in employees:
+    # Keyset pagination by name, so only the visible page is read (no OFFSET / COUNT)
+    if has_tasks:
+        employees = employees.select_related('task_counter')
+    paginator = KeysetPaginator(employees, 10, ordering=('name', 'pk'))  # 10 employees per page
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    
+    # Add task statistics to the employees of the current page from the TaskCounter rollup,
+    # aggregating only for employees without a counter row yet (single grouped query)
+    page_employees = list(page_obj.object_list)
+    if has_tasks:
+        missing_counter_ids = [
+            employee.pk for employee in page_employees
+            if not hasattr(employee, 'task_counter')
+        ]
+        stats_by_employee = Task.objects.stats_for_employees(missing_counter_ids)
+        # Overdue tasks are not part of the rollup, counted live for the others
+        overdue_by_employee = Task.objects.overdue_counts_for_employees(
+            employee.pk for employee in page_employees if employee.pk not in stats_by_employee
+        )
+    
+    for employee in page_employees:
         if has_tasks:
-            # Calculate comprehensive task statistics for each employee
-            total_tasks = Task.objects.filter(
-                Q(created_by=employee) | Q(assigned_to=employee)
-            ).count()
-            
-            created_tasks = Task.objects.filter(created_by=employee).count()
-            assigned_tasks = Task.objects.filter(assigned_to=employee).count()
-            
-            # Tasks assigned to others by this employee
-            assigned_to_others = Task.objects.filter(
-                created_by=employee,
-                assigned_to__isnull=False
-            ).exclude(assigned_to=employee).count()
-            
-            completed_tasks = Task.objects.filter(
-                Q(created_by=employee) | Q(assigned_to=employee),
-                status='finished'
-            ).count()
-            
-            pending_tasks = Task.objects.filter(
-                Q(created_by=employee) | Q(assigned_to=employee),
-                status='new'
-            ).count()
-            
-            # Calculate completion rate
-            completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-            
-            # Add stats to employee object
-            employee.task_stats = {
-                'total_tasks': total_tasks,
-                'created_tasks': created_tasks,
-                'assigned_tasks': assigned_tasks,
-                'assigned_to_others': assigned_to_others,
-                'completed_tasks': completed_tasks,
-                'pending_tasks': pending_tasks,
-                'completion_rate': round(completion_rate, 1)
-            }
+            if employee.pk in stats_by_employee:
+                employee.task_stats = stats_by_employee[employee.pk]
+            else:
+                employee.task_stats = employee.task_counter.as_stats(overdue_by_employee[employee.pk])
         else:
             # If no Task model, set empty stats
             employee.task_stats = {
@@ -101,27 +81,24 @@ def index(request):
                 'pending_tasks': 0,
                 'completion_rate': 0
             }
-        
-        employees_with_stats.append(employee)
-    
-    # Pagination
-    paginator = Paginator(employees_with_stats, 10)  # 10 employees per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj.object_list = page_employees
     
     # Get section choices for filter dropdown
     section_choices = Employee.SECTION_CHOICES
     
     # Calculate overall statistics
     if has_tasks:
-        total_all_tasks = Task.objects.count()
-        total_completed_tasks = Task.objects.filter(status='finished').count()
-        total_pending_tasks = Task.objects.filter(status='new').count()
-        
-        # Tasks assigned to others statistics
-        total_assigned_to_others = Task.objects.filter(
-            assigned_to__isnull=False
-        ).exclude(created_by=None).count()
+        overall = Task.objects.aggregate(
+            total=Count('pk'),
+            completed=Count('pk', filter=Q(status='finished')),
+            pending=Count('pk', filter=Q(status='new')),
+            # Tasks assigned to others statistics
+            assigned_to_others=Count('pk', filter=Q(assigned_to__isnull=False, created_by__isnull=False)),
+        )
+        total_all_tasks = overall['total']
+        total_completed_tasks = overall['completed']
+        total_pending_tasks = overall['pending']
+        total_assigned_to_others = overall['assigned_to_others']
         
         overall_completion_rate = (total_completed_tasks / total_all_tasks * 100) if total_all_tasks > 0 else 0
     else:
@@ -131,6 +108,13 @@ def index(request):
         total_assigned_to_others = 0
         overall_completion_rate = 0
     
+    # Employee statistics
+    employee_counts = Employee.objects.aggregate(
+        total=Count('pk'),
+        active=Count('pk', filter=Q(is_active_employee=True)),
+        inactive=Count('pk', filter=Q(is_active_employee=False)),
+    )
+    
     context = {
         'title': 'إدارة الموظفين',
         'current_page': 'employees',
@@ -141,9 +125,9 @@ def index(request):
         'section_choices': section_choices,
         
         # Employee statistics
-        'total_employees': Employee.objects.count(),
-        'active_employees': Employee.objects.filter(is_active_employee=True).count(),
-        'inactive_employees': Employee.objects.filter(is_active_employee=False).count(),
+        'total_employees': employee_counts['total'],
+        'active_employees': employee_counts['active'],
+        'inactive_employees': employee_counts['inactive'],
         
         # Task statistics
         'has_tasks': has_tasks,
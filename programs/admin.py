@@ -1,6 +1,9 @@
 # programs/admin.py
 from django.contrib import admin
 from .models import Program, House, HouseGeneralInfo, RoomDetail
+from .services.house_provisioning import provision_houses
+from .services.renovation_needs import schedule_house_needs_refresh
+from .services.survey_progress import track_program_progress
 
 @admin.register(Program)
 class ProgramAdmin(admin.ModelAdmin):
@@ -23,6 +26,7 @@ class ProgramAdmin(admin.ModelAdmin):
         if not obj.pk:
             obj.created_by = request.user
         super().save_model(request, obj, form, change)
+        provision_houses(obj)
 
 
 @admin.register(House)
@@ -32,21 +36,59 @@ class HouseAdmin(admin.ModelAdmin):
     search_fields = ('program__name', 'house_number')
     readonly_fields = ('created_at',)
     
+    def get_queryset(self, request):
+        """Survey progress of each house computed in the changelist query"""
+        return super().get_queryset(request).select_related('program').with_progress()
+    
     def has_general_info(self, obj):
-        try:
-            return bool(obj.general_info)
-        except HouseGeneralInfo.DoesNotExist:
-            return False
+        return obj.has_general_info
     has_general_info.boolean = True
     has_general_info.short_description = 'معلومات عامة'
     
     def room_details_count(self, obj):
-        return obj.room_details.count()
+        return f'{obj.rooms_analyzed} / {obj.rooms_expected}'
     room_details_count.short_description = 'عدد الغرف المُحللة'
 
 
+class SurveyProgressAdminMixin:
+    """
+    Update the program survey progress with deletions from the admin
+    (saves are handled by the survey signals)
+    """
+    
+    def delete_model(self, request, obj):
+        with track_program_progress(obj.house.program_id, House.objects.filter(pk=obj.house_id)):
+            super().delete_model(request, obj)
+    
+    def delete_queryset(self, request, queryset):
+        houses = {}
+        for house_id, program_id in queryset.order_by().values_list('house_id', 'house__program_id').distinct():
+            houses.setdefault(program_id, []).append(house_id)
+        for program_id, house_ids in houses.items():
+            with track_program_progress(program_id, House.objects.filter(pk__in=house_ids)):
+                super().delete_queryset(request, queryset.filter(house__program_id=program_id))
+
+
+class RenovationNeedsAdminMixin:
+    """
+    Recount the renovation needs of the houses whose rooms are deleted from the admin
+    (saves are handled by the post_save signals)
+    """
+    
+    def delete_model(self, request, obj):
+        house_id, program_id = obj.house_id, obj.house.program_id
+        super().delete_model(request, obj)
+        schedule_house_needs_refresh(house_id, program_id)
+    
+    def delete_queryset(self, request, queryset):
+        houses = set(queryset.values_list('house_id', 'house__program_id'))
+        super().delete_queryset(request, queryset)
+        for house_id, program_id in houses:
+            schedule_house_needs_refresh(house_id, program_id)
+
+
 @admin.register(HouseGeneralInfo)
-class HouseGeneralInfoAdmin(admin.ModelAdmin):
+class HouseGeneralInfoAdmin(SurveyProgressAdminMixin, admin.ModelAdmin):
     list_display = ('house', 'owner_name', 'id_number', 'number_of_residents', 'building_type')
     list_filter = ('building_type', 'created_at')
     search_fields = ('owner_name', 'id_number', 'phone_number', 'house__program__name')
@@ -70,7 +112,7 @@ class HouseGeneralInfoAdmin(admin.ModelAdmin):
 
 
 @admin.register(RoomDetail)
-class RoomDetailAdmin(admin.ModelAdmin):
+class RoomDetailAdmin(RenovationNeedsAdminMixin, SurveyProgressAdminMixin, admin.ModelAdmin):
     list_display = ('__str__', 'house', 'room_type', 'room_number', 'area', 'people_count')
     list_filter = ('room_type', 'furniture_condition', 'created_at', 'house__program')
     search_fields = ('house__program__name', 'house__house_number', 'room_type')
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ProgramsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'programs'
+    
+    def ready(self):
+        """
+        Import signals when the app is ready
+        """
+        import programs.signals
@@ -397,4 +397,35 @@ class RoomDetailForm(forms.ModelForm):
                 fields_to_remove.append(field_name)
         
         for field_name in fields_to_remove:
-            del self.fields[field_name]
\ No newline at end of file
+            del self.fields[field_name]
+
+class SurveyImportForm(forms.Form):
+    """Form for importing a survey file into a program"""
+    
+    kind = forms.ChoiceField(
+        choices=[],
+        widget=forms.Select(attrs={
+            'class': 'form-select'
+        }),
+        label='نوع البيانات'
+    )
+    
+    file = forms.FileField(
+        widget=forms.ClearableFileInput(attrs={
+            'class': 'form-control',
+            'accept': '.csv,.xlsx'
+        }),
+        label='الملف (CSV أو Excel)'
+    )
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        from .services.survey_import import SURVEY_KINDS
+        self.fields['kind'].choices = list(SURVEY_KINDS.items())
+    
+    def clean_file(self):
+        from .services.survey_import import get_import_format
+        file = self.cleaned_data['file']
+        if get_import_format(file.name) is None:
+            raise forms.ValidationError('يجب أن يكون الملف بصيغة CSV أو XLSX')
+        return file
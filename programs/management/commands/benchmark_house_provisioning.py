@@ -0,0 +1,76 @@
+import time
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from programs.models import Program, House
+from programs.services.house_provisioning import provision_houses
+
+Employee = get_user_model()
+
+class Rollback(Exception):
+    pass
+
+class Command(BaseCommand):
+    help = 'Measure program creation time by number of houses (changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[10, 100, 1000, 10000],
+            help='Numbers of houses to measure (default: 10 100 1000 10000)',
+        )
+        parser.add_argument(
+            '--baseline',
+            action='store_true',
+            help='Also measure one House.objects.create() per house, as before',
+        )
+
+    def handle(self, *args, **options):
+        employee = Employee.objects.order_by('pk').first()
+        if employee is None:
+            self.stdout.write(self.style.ERROR("An employee is needed to create programs"))
+            return
+
+        self.stdout.write(f"Database: {connection.vendor}")
+        for size in options['sizes']:
+            # Round trips are what a remote database makes expensive, so count them too
+            elapsed, queries = self._measure(employee, size, provision_houses)
+            line = f"{size:>7} houses   bulk: {elapsed * 1000:9.1f} ms {queries:>6} queries"
+            if options['baseline']:
+                baseline, baseline_queries = self._measure(employee, size, self._create_one_by_one)
+                line += (
+                    f"   one by one: {baseline * 1000:9.1f} ms {baseline_queries:>6} queries"
+                    f"   (x{baseline / elapsed:.0f})"
+                )
+            self.stdout.write(line)
+
+    def _measure(self, employee, size, provision):
+        self.queries = 0
+        started = time.perf_counter()
+        try:
+            with transaction.atomic(), connection.execute_wrapper(self._count_query):
+                program = Program.objects.create(
+                    name=f'Benchmark {size}',
+                    number_of_houses=size,
+                    address='-',
+                    created_by=employee
+                )
+                provision(program)
+                elapsed = time.perf_counter() - started
+                queries = self.queries
+                if program.houses.count() != size:
+                    self.stdout.write(self.style.ERROR(f"{size}: wrong number of houses"))
+                raise Rollback
+        except Rollback:
+            pass
+        return elapsed, queries
+
+    def _count_query(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def _create_one_by_one(self, program):
+        for i in range(1, program.number_of_houses + 1):
+            House.objects.create(program=program, house_number=i)
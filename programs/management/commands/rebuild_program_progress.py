@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from programs.models import Program
+from programs.services.survey_progress import rebuild_program_progress
+
+class Command(BaseCommand):
+    help = 'Recompute the materialized survey progress of every program and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drift without writing the recomputed progress',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No progress will be written'))
+
+        drift = rebuild_program_progress(dry_run=dry_run)
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Program progress is in sync, no drift found'))
+            return
+
+        names = dict(
+            Program.objects.filter(pk__in=[entry['program_id'] for entry in drift]).values_list('pk', 'name')
+        )
+
+        for entry in drift:
+            program_name = names.get(entry['program_id'], entry['program_id'])
+            if entry['missing']:
+                self.stdout.write(f"  {program_name}: missing progress row")
+            for field, (stored, actual) in entry['changes'].items():
+                self.stdout.write(f"  {program_name}: {field} {stored} -> {actual}")
+
+        missing_count = sum(1 for entry in drift if entry['missing'])
+        action = 'Would fix' if dry_run else 'Fixed'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{action} progress of {len(drift)} programs ({missing_count} missing rows)"
+            )
+        )
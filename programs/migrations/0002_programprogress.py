@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-16 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgramProgress',
+            fields=[
+                ('program', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='progress', serialize=False, to='programs.program', verbose_name='البرنامج')),
+                ('houses_count', models.IntegerField(default=0, verbose_name='عدد المنازل')),
+                ('houses_with_general_info', models.IntegerField(default=0, verbose_name='منازل بمعلومات عامة')),
+                ('houses_completed', models.IntegerField(default=0, verbose_name='منازل مكتملة المسح')),
+                ('rooms_expected', models.IntegerField(default=0, verbose_name='الغرف المطلوب تحليلها')),
+                ('rooms_analyzed', models.IntegerField(default=0, verbose_name='الغرف المُحللة')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ آخر تحديث')),
+            ],
+            options={
+                'verbose_name': 'تقدم مسح البرنامج',
+                'verbose_name_plural': 'تقدم مسح البرامج',
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-16 14:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0002_programprogress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HouseRenovationNeeds',
+            fields=[
+                ('house', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='renovation_needs', serialize=False, to='programs.house', verbose_name='المنزل')),
+                ('rooms_count', models.IntegerField(default=0, verbose_name='عدد الغرف المُحللة')),
+                ('needs', models.JSONField(blank=True, default=dict, verbose_name='احتياجات الترميم')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ آخر تحديث')),
+            ],
+            options={
+                'verbose_name': 'احتياجات ترميم المنزل',
+                'verbose_name_plural': 'احتياجات ترميم المنازل',
+            },
+        ),
+    ]
@@ -1,5 +1,10 @@
 # programs/models.py
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (
+    Q, F, Count, Sum, Exists, OuterRef, Subquery, Case, When, Value, BooleanField, IntegerField,
+)
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import GreaterThanOrEqual
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -62,6 +67,72 @@ class Program(models.Model):
         return reverse('programs:detail', kwargs={'pk': self.pk})
 
 
+class HouseQuerySet(models.QuerySet):
+    """
+    Custom queryset for House with the survey progress computed in SQL
+    """
+    
+    @staticmethod
+    def _progress_expressions():
+        """
+        SQL expressions of a house's survey state: general info present, rooms
+        expected (room counts of the general info), rooms analyzed (room details
+        within those counts) and survey complete
+        """
+        room_counts = HouseGeneralInfo.ROOM_COUNT_FIELDS
+        
+        rooms_expected = sum(
+            (Coalesce(F(f'general_info__{field}'), 0) for field in room_counts.values()),
+            Value(0)
+        )
+        
+        # A room detail counts while its number is within the house's current room counts
+        within_counts = Q()
+        for room_type, field in room_counts.items():
+            within_counts |= Q(room_type=room_type, room_number__lte=OuterRef(f'general_info__{field}'))
+        analyzed = RoomDetail.objects.filter(
+            within_counts,
+            house=OuterRef('pk')
+        ).order_by().values('house').annotate(count=Count('pk')).values('count')
+        rooms_analyzed = Coalesce(Subquery(analyzed, output_field=IntegerField()), 0)
+        
+        has_general_info = Exists(HouseGeneralInfo.objects.filter(house=OuterRef('pk')))
+        is_complete = Q(has_general_info) & GreaterThanOrEqual(rooms_analyzed, rooms_expected)
+        return has_general_info, rooms_expected, rooms_analyzed, is_complete
+    
+    def with_progress(self):
+        """
+        Annotate the survey progress of each house in the same query:
+        has_general_info, rooms_expected, rooms_analyzed and is_survey_complete
+        """
+        has_general_info, rooms_expected, rooms_analyzed, is_complete = self._progress_expressions()
+        return self.annotate(
+            has_general_info=has_general_info,
+            rooms_expected=rooms_expected,
+            rooms_analyzed=rooms_analyzed,
+            is_survey_complete=Case(
+                When(is_complete, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField()
+            )
+        )
+    
+    def progress_totals(self):
+        """
+        Survey totals of the houses in one aggregate query (the expressions are
+        aggregated directly, not through annotations of with_progress)
+        """
+        has_general_info, rooms_expected, rooms_analyzed, is_complete = self._progress_expressions()
+        totals = self.aggregate(
+            houses_count=Count('pk'),
+            houses_with_general_info=Count('pk', filter=Q(has_general_info)),
+            houses_completed=Count('pk', filter=is_complete),
+            rooms_expected=Sum(rooms_expected),
+            rooms_analyzed=Sum(rooms_analyzed),
+        )
+        return {field: value or 0 for field, value in totals.items()}
+
+
 class House(models.Model):
     """
     House model representing individual houses in a program
@@ -83,6 +154,8 @@ class House(models.Model):
         verbose_name="تاريخ الإنشاء"
     )
     
+    objects = HouseQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "منزل"
         verbose_name_plural = "المنازل"
@@ -105,6 +178,17 @@ class HouseGeneralInfo(models.Model):
         ('reinforced', 'مسلح'),
     ]
     
+    # Room type (RoomDetail.room_type) -> field holding the number of such rooms
+    ROOM_COUNT_FIELDS = {
+        'bedroom': 'bedrooms',
+        'bathroom': 'bathrooms',
+        'living_room': 'living_rooms',
+        'kitchen': 'kitchens',
+        'majlis': 'majlis',
+        'rooftop': 'rooftops',
+        'courtyard': 'courtyards',
+    }
+    
     house = models.OneToOneField(
         House,
         on_delete=models.CASCADE,
@@ -211,6 +295,15 @@ class HouseGeneralInfo(models.Model):
     
     def __str__(self):
         return f"معلومات عامة - {self.house}"
+    
+    def get_rooms_count(self):
+        """Total number of rooms to analyze"""
+        return sum(getattr(self, field) for field in self.ROOM_COUNT_FIELDS.values())
+    
+    def save(self, *args, **kwargs):
+        # Keep the pre/post_save receivers (ProgramProgress delta) in the same transaction as the write
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
 
 class RoomDetail(models.Model):
@@ -749,9 +842,120 @@ class RoomDetail(models.Model):
     def __str__(self):
         return f"{self.get_room_type_display()} {self.room_number} - {self.house}"
     
+    def save(self, *args, **kwargs):
+        # Keep the pre/post_save receivers (ProgramProgress delta) in the same transaction as the write
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
     def get_absolute_url(self):
         return reverse('programs:room_detail', kwargs={
             'program_pk': self.house.program.pk,
             'house_pk': self.house.pk,
             'room_pk': self.pk
-        })
\ No newline at end of file
+        })
+
+
+class ProgramProgress(models.Model):
+    """
+    Materialized survey progress of a program.
+    
+    Updated with the progress change of the touched houses only (HouseQuerySet
+    progress_totals before and after) whenever general info or a room detail
+    is saved and when houses are added or removed (see
+    programs.services.survey_progress), so program pages read one row instead
+    of aggregating every house. Can be recomputed with
+    `manage.py rebuild_program_progress`.
+    """
+    
+    program = models.OneToOneField(
+        Program,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='progress',
+        verbose_name="البرنامج"
+    )
+    
+    houses_count = models.IntegerField(default=0, verbose_name="عدد المنازل")
+    houses_with_general_info = models.IntegerField(default=0, verbose_name="منازل بمعلومات عامة")
+    houses_completed = models.IntegerField(default=0, verbose_name="منازل مكتملة المسح")
+    rooms_expected = models.IntegerField(default=0, verbose_name="الغرف المطلوب تحليلها")
+    rooms_analyzed = models.IntegerField(default=0, verbose_name="الغرف المُحللة")
+    
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="تاريخ آخر تحديث"
+    )
+    
+    COUNTER_FIELDS = (
+        'houses_count',
+        'houses_with_general_info',
+        'houses_completed',
+        'rooms_expected',
+        'rooms_analyzed',
+    )
+    
+    class Meta:
+        verbose_name = "تقدم مسح البرنامج"
+        verbose_name_plural = "تقدم مسح البرامج"
+    
+    def __str__(self):
+        return f"{self.program} - {self.completion_percentage}%"
+    
+    @staticmethod
+    def _percentage(part, total):
+        return round(part / total * 100) if total else 0
+    
+    @property
+    def general_info_percentage(self):
+        """Percentage of houses with general information"""
+        return self._percentage(self.houses_with_general_info, self.houses_count)
+    
+    @property
+    def rooms_percentage(self):
+        """Percentage of expected rooms already analyzed"""
+        return self._percentage(self.rooms_analyzed, self.rooms_expected)
+    
+    @property
+    def completion_percentage(self):
+        """Percentage of houses whose survey is complete"""
+        return self._percentage(self.houses_completed, self.houses_count)
+
+
+class HouseRenovationNeeds(models.Model):
+    """
+    Materialized renovation needs of a house: per room type, the number of
+    rooms and how many of them have each condition value
+    ({room_type: {'rooms': n, 'needs': {field: {value: count}}}}).
+    
+    Recomputed for one house when one of its room details is saved, so a
+    program report only reads one row per house (see
+    programs.services.renovation_needs).
+    """
+    
+    house = models.OneToOneField(
+        House,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='renovation_needs',
+        verbose_name="المنزل"
+    )
+    
+    rooms_count = models.IntegerField(default=0, verbose_name="عدد الغرف المُحللة")
+    
+    needs = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="احتياجات الترميم"
+    )
+    
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="تاريخ آخر تحديث"
+    )
+    
+    class Meta:
+        verbose_name = "احتياجات ترميم المنزل"
+        verbose_name_plural = "احتياجات ترميم المنازل"
+    
+    def __str__(self):
+        return f"احتياجات الترميم - {self.house}"
@@ -0,0 +1,79 @@
+# programs/services/house_provisioning.py
+# Create and trim the houses of a program in bulk: one INSERT (or a few
+# batches) and one range DELETE in a single transaction instead of a query per house
+
+import logging
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from ..models import House
+from .renovation_needs import invalidate_program_renovation
+from .survey_progress import track_program_progress
+
+logger = logging.getLogger('programs')
+
+# Houses inserted per bulk_create batch
+HOUSE_BATCH_SIZE = 1000
+
+# From this many new houses, PostgreSQL generates the rows itself (generate_series)
+GENERATE_SERIES_THRESHOLD = 1000
+
+
+def create_houses(program, first_number, last_number, using='default'):
+    """
+    Insert houses first_number..last_number of a program, returns the number created
+    """
+    count = last_number - first_number + 1
+    if count <= 0:
+        return 0
+
+    connection = connections[using]
+    if connection.vendor == 'postgresql' and count >= GENERATE_SERIES_THRESHOLD:
+        # The rows never leave the server: one statement whatever the count
+        table = connection.ops.quote_name(House._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (program_id, house_number, created_at) '
+                f'SELECT %s, number, %s FROM generate_series(%s, %s) AS number',
+                [program.pk, timezone.now(), first_number, last_number]
+            )
+            return cursor.rowcount
+
+    houses = House.objects.using(using).bulk_create(
+        (House(program=program, house_number=number) for number in range(first_number, last_number + 1)),
+        batch_size=HOUSE_BATCH_SIZE
+    )
+    return len(houses)
+
+
+def trim_houses(program, last_number, using='default'):
+    """
+    Delete the houses of a program numbered above last_number (with their
+    general info and room details), returns the number of houses deleted
+    """
+    _, deleted = House.objects.using(using).filter(
+        program=program,
+        house_number__gt=last_number
+    ).delete()
+    return deleted.get(House._meta.label, 0)
+
+
+def provision_houses(program, using='default'):
+    """
+    Make the houses of a program match its number_of_houses: houses are
+    numbered 1..N, missing numbers at the end are added and the ones above
+    N removed. Returns (created, deleted).
+    """
+    target = program.number_of_houses
+    houses = House.objects.using(using).filter(program=program)
+    with transaction.atomic(using=using):
+        # Last house kept; every house above it is removed or added
+        current = houses.filter(house_number__lte=target).aggregate(last=Max('house_number'))['last'] or 0
+        with track_program_progress(program.pk, houses.filter(house_number__gt=current)):
+            deleted = trim_houses(program, target, using)
+            created = create_houses(program, current + 1, target, using)
+
+    if created or deleted:
+        transaction.on_commit(lambda: invalidate_program_renovation(program.pk), using=using)
+        logger.info(f"Program {program.pk}: {created} houses created, {deleted} deleted")
+    return created, deleted
@@ -0,0 +1,234 @@
+# programs/services/renovation_needs.py
+# Renovation needs of programs: counts of each room condition value computed in
+# SQL per house and room type, materialized per house (HouseRenovationNeeds),
+# rolled up per program with estimated costs and cached until a room changes
+
+import hashlib
+import json
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from ..models import House, HouseRenovationNeeds, RoomDetail
+
+
+def get_renovation_settings():
+    return getattr(settings, 'RENOVATION_SETTINGS', {})
+
+
+def get_unit_costs():
+    """
+    Estimated cost per room of each condition value: {field: {value: cost}}
+    """
+    return get_renovation_settings().get('UNIT_COSTS', {})
+
+
+def get_condition_fields():
+    """
+    The RoomDetail fields with a fixed set of condition values (all choice
+    fields except the room type)
+    """
+    return [field for field in RoomDetail._meta.fields if field.choices and field.name != 'room_type']
+
+
+def count_room_conditions(queryset):
+    """
+    Count the rooms of a RoomDetail queryset and each condition value, grouped
+    by house and room type, in one query. Returns
+    {house_id: {room_type: {'rooms': n, 'needs': {field: {value: count}}}}}
+    with only the non-zero counts.
+    """
+    columns = {}
+    aggregates = {'rooms': Count('pk')}
+    for field in get_condition_fields():
+        for value, _ in field.choices:
+            alias = f'c{len(columns)}'
+            columns[alias] = (field.name, value)
+            aggregates[alias] = Count('pk', filter=Q(**{field.name: value}))
+
+    rows = queryset.order_by().values('house_id', 'room_type').annotate(**aggregates)
+
+    result = defaultdict(dict)
+    for row in rows:
+        needs = {}
+        for alias, (field, value) in columns.items():
+            if row[alias]:
+                needs.setdefault(field, {})[value] = row[alias]
+        result[row['house_id']][row['room_type']] = {'rooms': row['rooms'], 'needs': needs}
+    return result
+
+
+def refresh_house_needs(house_ids):
+    """
+    Recompute and store the renovation needs of the given houses (one counting
+    query and one upsert), returns {house_id: HouseRenovationNeeds}
+    """
+    house_ids = list(house_ids)
+    if not house_ids:
+        return {}
+    counts = count_room_conditions(RoomDetail.objects.filter(house_id__in=house_ids))
+
+    rows = [
+        HouseRenovationNeeds(
+            house_id=house_id,
+            rooms_count=sum(entry['rooms'] for entry in counts.get(house_id, {}).values()),
+            needs=counts.get(house_id, {}),
+            updated_at=timezone.now(),
+        )
+        for house_id in House.objects.filter(pk__in=house_ids).values_list('pk', flat=True)
+    ]
+    HouseRenovationNeeds.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['house'],
+        update_fields=['rooms_count', 'needs', 'updated_at']
+    )
+    return {row.house_id: row for row in rows}
+
+
+def schedule_house_needs_refresh(house_id, program_id):
+    """
+    Once the current transaction commits, recompute the needs of one house
+    and invalidate its program's cached report
+    """
+    def refresh():
+        refresh_house_needs([house_id])
+        invalidate_program_renovation(program_id)
+    transaction.on_commit(refresh)
+
+
+def get_report_version_key(program_id):
+    return f'renovation_report:version:{program_id}'
+
+
+def get_report_version(program_id):
+    key = get_report_version_key(program_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key, 1)
+    return version
+
+
+def invalidate_program_renovation(program_id):
+    """
+    Bump the report version of a program so its next report is rebuilt
+    """
+    if not program_id:
+        return
+    key = get_report_version_key(program_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(timezone.now().timestamp()), None)
+
+
+def get_costs_signature(unit_costs):
+    # Part of the cache key, so a changed cost table never serves old estimates
+    data = json.dumps(unit_costs, sort_keys=True, default=str).encode()
+    return hashlib.md5(data, usedforsecurity=False).hexdigest()[:12]
+
+
+def estimate_needs_cost(needs, unit_costs):
+    """
+    Estimated cost of {field: {value: count}} with a {field: {value: cost}} table
+    """
+    return sum(
+        count * unit_costs.get(field, {}).get(value, 0)
+        for field, values in needs.items()
+        for value, count in values.items()
+    )
+
+
+def build_renovation_report(program_id, unit_costs):
+    """
+    Renovation report of a program from the per-house rows (houses without
+    a row yet are computed in one batch first):
+    rooms, total_cost, fields (counts and costs of each condition value),
+    room_types and houses (rooms and estimated cost)
+    """
+    houses = list(House.objects.filter(program_id=program_id).values_list('pk', 'house_number'))
+    stored = dict(
+        HouseRenovationNeeds.objects.filter(house__program_id=program_id).values_list('house_id', 'needs')
+    )
+    missing = [house_id for house_id, _ in houses if house_id not in stored]
+    if missing:
+        stored.update({house_id: row.needs for house_id, row in refresh_house_needs(missing).items()})
+
+    totals = defaultdict(Counter)
+    room_type_totals = defaultdict(lambda: {'rooms': 0, 'cost': 0})
+    house_rows = []
+    for house_id, house_number in houses:
+        house_rooms = 0
+        house_cost = 0
+        for room_type, entry in stored.get(house_id, {}).items():
+            cost = estimate_needs_cost(entry['needs'], unit_costs)
+            room_type_totals[room_type]['rooms'] += entry['rooms']
+            room_type_totals[room_type]['cost'] += cost
+            house_rooms += entry['rooms']
+            house_cost += cost
+            for field, values in entry['needs'].items():
+                totals[field].update(values)
+        house_rows.append({
+            'house_id': house_id,
+            'house_number': house_number,
+            'rooms': house_rooms,
+            'cost': house_cost,
+        })
+
+    fields = []
+    for field in get_condition_fields():
+        counts = totals.get(field.name)
+        if not counts:
+            continue
+        field_costs = unit_costs.get(field.name, {})
+        values = [
+            {
+                'value': value,
+                'label': label,
+                'count': counts[value],
+                'unit_cost': field_costs.get(value, 0),
+                'cost': counts[value] * field_costs.get(value, 0),
+            }
+            for value, label in field.choices
+            if counts.get(value)
+        ]
+        fields.append({
+            'field': field.name,
+            'label': field.verbose_name,
+            'values': values,
+            'cost': sum(item['cost'] for item in values),
+        })
+
+    room_types = [
+        {'type': room_type, 'label': label, **room_type_totals[room_type]}
+        for room_type, label in RoomDetail.ROOM_TYPE_CHOICES
+        if room_type in room_type_totals
+    ]
+
+    return {
+        'rooms': sum(row['rooms'] for row in house_rows),
+        'total_cost': sum(row['cost'] for row in house_rows),
+        'fields': fields,
+        'room_types': room_types,
+        'houses': house_rows,
+    }
+
+
+def get_program_renovation_report(program):
+    """
+    The renovation report of a program, from the cache while no room of the
+    program changed and the cost table is the same
+    """
+    unit_costs = get_unit_costs()
+    key = (
+        f'renovation_report:{program.pk}:{get_report_version(program.pk)}:'
+        f'{get_costs_signature(unit_costs)}'
+    )
+    report = cache.get(key)
+    if report is None:
+        report = build_renovation_report(program.pk, unit_costs)
+        cache.set(key, report, get_renovation_settings().get('REPORT_CACHE_TIMEOUT', 3600))
+    return report
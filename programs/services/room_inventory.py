@@ -0,0 +1,134 @@
+# programs/services/room_inventory.py
+# Expected-vs-existing room matrix of houses for the technical analysis:
+# the expected rooms come from the general info counts, driven by
+# RoomDetail.ROOM_TYPE_CHOICES, and the room details of a whole batch of
+# houses are read in a single query
+
+from collections import defaultdict
+from ..models import HouseGeneralInfo, RoomDetail
+
+# Card icon of each room type
+ROOM_TYPE_ICONS = {
+    'bedroom': 'bx-bed',
+    'bathroom': 'bx-bath',
+    'living_room': 'bx-home',
+    'kitchen': 'bx-restaurant',
+    'majlis': 'bx-group',
+    'rooftop': 'bx-building',
+    'courtyard': 'bx-landscape',
+}
+
+
+def get_room_type_display(room_type):
+    return dict(RoomDetail.ROOM_TYPE_CHOICES).get(room_type, room_type)
+
+
+def is_valid_room_type(room_type):
+    return room_type in HouseGeneralInfo.ROOM_COUNT_FIELDS
+
+
+class HouseRoomInventory:
+    """
+    The rooms a house should have (from its general info) matched with the
+    room details already entered, in ROOM_TYPE_CHOICES order
+    """
+
+    def __init__(self, house, general_info, room_details):
+        self.house = house
+        self.general_info = general_info
+        existing = {(detail.room_type, detail.room_number): detail for detail in room_details}
+
+        self.room_cards = []
+        # Per room type: {'type', 'type_display', 'icon', 'expected', 'analyzed'}
+        self.room_types = []
+        for room_type, type_display in RoomDetail.ROOM_TYPE_CHOICES:
+            expected = self.get_expected_count(room_type)
+            analyzed = 0
+            for number in range(1, expected + 1):
+                room_detail = existing.pop((room_type, number), None)
+                analyzed += room_detail is not None
+                self.room_cards.append({
+                    'type': room_type,
+                    'type_display': type_display,
+                    'number': number,
+                    'icon': ROOM_TYPE_ICONS.get(room_type, 'bx-square'),
+                    'has_details': room_detail is not None,
+                    'room_detail': room_detail
+                })
+            self.room_types.append({
+                'type': room_type,
+                'type_display': type_display,
+                'icon': ROOM_TYPE_ICONS.get(room_type, 'bx-square'),
+                'expected': expected,
+                'analyzed': analyzed,
+            })
+
+        # Details left over from rooms removed from the general info counts
+        self.extra_room_details = sorted(existing.values(), key=lambda d: (d.room_type, d.room_number))
+
+    def get_expected_count(self, room_type):
+        field = HouseGeneralInfo.ROOM_COUNT_FIELDS.get(room_type)
+        if self.general_info is None or field is None:
+            return 0
+        return getattr(self.general_info, field)
+
+    @property
+    def total_rooms(self):
+        return len(self.room_cards)
+
+    @property
+    def analyzed_rooms(self):
+        return sum(1 for card in self.room_cards if card['has_details'])
+
+    @property
+    def remaining_rooms(self):
+        return self.total_rooms - self.analyzed_rooms
+
+    @property
+    def progress_percentage(self):
+        return round(self.analyzed_rooms / self.total_rooms * 100) if self.total_rooms else 0
+
+    def get_room_detail(self, room_type, room_number):
+        for card in self.room_cards:
+            if card['type'] == room_type and card['number'] == room_number:
+                return card['room_detail']
+        return None
+
+
+# RoomDetail columns enough to match the rooms, for views that only count them
+ROOM_KEY_FIELDS = ('id', 'house_id', 'room_type', 'room_number')
+
+
+def build_room_inventories(houses, room_fields=None):
+    """
+    Room inventories of a batch of houses (general_info should be
+    select_related), with one room details query for the whole batch.
+    room_fields limits the loaded RoomDetail columns (e.g. ROOM_KEY_FIELDS).
+    Returns the inventories in the order of the houses.
+    """
+    houses = list(houses)
+    houses_by_id = {house.pk: house for house in houses}
+    details_by_house = defaultdict(list)
+    if houses:
+        room_details = RoomDetail.objects.filter(house_id__in=houses_by_id)
+        if room_fields:
+            room_details = room_details.only(*room_fields)
+        for room_detail in room_details:
+            room_detail.house = houses_by_id[room_detail.house_id]
+            details_by_house[room_detail.house_id].append(room_detail)
+
+    inventories = []
+    for house in houses:
+        try:
+            general_info = house.general_info
+        except HouseGeneralInfo.DoesNotExist:
+            general_info = None
+        inventories.append(HouseRoomInventory(house, general_info, details_by_house[house.pk]))
+    return inventories
+
+
+def get_room_inventory(house):
+    """
+    Room inventory of a single house
+    """
+    return build_room_inventories([house])[0]
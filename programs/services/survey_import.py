@@ -0,0 +1,398 @@
+# programs/services/survey_import.py
+# Bulk import of house surveys (general info or room details) from CSV/XLSX:
+# rows are validated with the survey forms, upserted in chunks and every
+# rejected row is reported as the file is read
+
+import csv
+import io
+import re
+import zipfile
+from xml.etree.ElementTree import iterparse, parse
+from django import forms
+from ..forms import HouseGeneralInfoForm, RoomDetailForm
+from ..models import House, HouseGeneralInfo, RoomDetail
+from .renovation_needs import invalidate_program_renovation, refresh_house_needs
+from .room_inventory import is_valid_room_type
+from .survey_progress import track_program_progress
+
+IMPORT_FORMATS = ('csv', 'xlsx')
+
+# Rows validated and upserted per batch
+IMPORT_CHUNK_SIZE = 1000
+
+SURVEY_KINDS = {
+    'general_info': 'المعلومات العامة',
+    'rooms': 'تفاصيل الغرف',
+}
+
+# Columns identifying the house (and the room) of a row, with their Arabic headers
+KEY_COLUMNS = {
+    'house_number': 'رقم المنزل',
+    'room_type': 'نوع الغرفة',
+    'room_number': 'رقم الغرفة',
+}
+
+# Separators accepted between the values of a multiple choice cell
+MULTIPLE_VALUES_SEPARATOR = re.compile(r'\s*[,،;|]\s*')
+
+XLSX_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+XLSX_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+XLSX_PACKAGE_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+
+def get_import_format(filename):
+    """
+    File format from a file name ('csv' or 'xlsx'), None when not supported
+    """
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return extension if extension in IMPORT_FORMATS else None
+
+
+def iter_csv_table(file):
+    """
+    Rows of a CSV file (binary) as lists of strings, a UTF-8 BOM is skipped
+    """
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.reader(text)
+    finally:
+        text.detach()
+
+
+def _xlsx_column_index(reference):
+    index = 0
+    for char in reference:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - 64
+    return index - 1
+
+
+def _xlsx_first_sheet_path(archive):
+    workbook = parse(archive.open('xl/workbook.xml')).getroot()
+    sheet = workbook.find(f'{XLSX_NS}sheets/{XLSX_NS}sheet')
+    relation_id = sheet.get(f'{XLSX_REL_NS}id')
+    relations = parse(archive.open('xl/_rels/workbook.xml.rels')).getroot()
+    for relation in relations.iter(f'{XLSX_PACKAGE_REL_NS}Relationship'):
+        if relation.get('Id') == relation_id:
+            target = relation.get('Target')
+            return target.lstrip('/') if target.startswith('/') else f'xl/{target}'
+    raise ValueError('The workbook has no worksheet')
+
+
+def iter_xlsx_table(file):
+    """
+    Rows of the first worksheet of an XLSX file as lists of strings, parsed
+    incrementally (the shared strings table is the only part held in memory)
+    """
+    with zipfile.ZipFile(file) as archive:
+        shared_strings = []
+        if 'xl/sharedStrings.xml' in archive.namelist():
+            for _, element in iterparse(archive.open('xl/sharedStrings.xml')):
+                if element.tag == f'{XLSX_NS}si':
+                    shared_strings.append(''.join(text.text or '' for text in element.iter(f'{XLSX_NS}t')))
+                    element.clear()
+
+        with archive.open(_xlsx_first_sheet_path(archive)) as sheet:
+            for _, element in iterparse(sheet):
+                if element.tag != f'{XLSX_NS}row':
+                    continue
+                row = []
+                for cell in element.iter(f'{XLSX_NS}c'):
+                    cell_type = cell.get('t')
+                    if cell_type == 'inlineStr':
+                        value = ''.join(text.text or '' for text in cell.iter(f'{XLSX_NS}t'))
+                    else:
+                        value = cell.findtext(f'{XLSX_NS}v') or ''
+                        if cell_type == 's' and value:
+                            value = shared_strings[int(value)]
+                    reference = cell.get('r')
+                    index = _xlsx_column_index(reference) if reference else len(row)
+                    row.extend([''] * (index - len(row)))
+                    row.append(value)
+                element.clear()
+                yield row
+
+
+def iter_table(file, file_format):
+    if file_format == 'xlsx':
+        return iter_xlsx_table(file)
+    return iter_csv_table(file)
+
+
+def _normalize(text):
+    return ' '.join(str(text).replace('*', '').split()).lower()
+
+
+def _normalize_header(text):
+    # Form labels carry ranges in parentheses: "عدد غرف النوم (1-8)"
+    return _normalize(re.sub(r'\(.*?\)', '', str(text)))
+
+
+def _to_int(value):
+    # Spreadsheets often store whole numbers as floats ("12.0")
+    try:
+        return int(float(value))
+    except (ValueError, OverflowError):
+        return None
+
+
+class SurveyImporter:
+    """
+    Import the general info or the room details of a program's houses.
+
+    Columns are matched by field name or Arabic label, choice cells accept
+    the stored value or its label. Each row goes through the same form as the
+    survey pages (HouseGeneralInfoForm / RoomDetailForm for the room type);
+    the houses, their general info and the existing rows are loaded once per
+    chunk, and the valid rows of a chunk are upserted with one
+    bulk_create(update_conflicts=True) per form layout.
+
+    run() yields the errors of the rejected rows while reading the file:
+    {'row', 'house_number', 'room_type', 'room_number', 'field', 'message'};
+    the survey progress is updated with each chunk, the counters are final
+    and the renovation needs refreshed once it is exhausted. A row later in the file overrides an earlier row for the same
+    house/room.
+    """
+
+    def __init__(self, program, kind, chunk_size=IMPORT_CHUNK_SIZE):
+        if kind not in SURVEY_KINDS:
+            raise ValueError(f'Unknown survey kind: {kind}')
+        self.program = program
+        self.kind = kind
+        self.chunk_size = chunk_size
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.house_ids = set()
+        self.forms = {}
+
+        if kind == 'general_info':
+            self.model = HouseGeneralInfo
+            self.key_columns = ('house_number',)
+            self.layouts = {None: list(HouseGeneralInfoForm.base_fields)}
+        else:
+            self.model = RoomDetail
+            self.key_columns = ('house_number', 'room_type', 'room_number')
+            # The room form keeps a different set of fields per room type
+            self.layouts = {
+                room_type: list(RoomDetailForm(room_type=room_type).fields)
+                for room_type, _ in RoomDetail.ROOM_TYPE_CHOICES
+            }
+
+        self.labels = dict(KEY_COLUMNS)
+        self.choices = {}
+        form_class = HouseGeneralInfoForm if kind == 'general_info' else RoomDetailForm
+        for name, field in form_class.base_fields.items():
+            model_field = self.model._meta.get_field(name)
+            self.labels[name] = str(model_field.verbose_name)
+            if isinstance(field, forms.ChoiceField):
+                self.choices[name] = self._choice_lookup(field.choices)
+        self.choices['room_type'] = self._choice_lookup(RoomDetail.ROOM_TYPE_CHOICES)
+
+        self.header_lookup = {}
+        for name, label in self.labels.items():
+            self.header_lookup[_normalize_header(name)] = name
+            self.header_lookup[_normalize_header(label)] = name
+        for name, field in form_class.base_fields.items():
+            if field.label:
+                self.header_lookup.setdefault(_normalize_header(field.label), name)
+
+    @staticmethod
+    def _choice_lookup(choices):
+        lookup = {}
+        for value, label in choices:
+            if value in ('', None):
+                continue
+            lookup[_normalize(value)] = value
+            lookup[_normalize(label)] = value
+        return lookup
+
+    @property
+    def imported(self):
+        return self.created + self.updated
+
+    def run(self, table):
+        """
+        Import the rows of a table (the first row is the header), yielding the errors
+        """
+        table = iter(table)
+        header = next(table, None)
+        if header is None:
+            yield self._error(1, {}, None, 'الملف فارغ')
+            return
+
+        columns = [self.header_lookup.get(_normalize_header(title)) for title in header]
+        missing = [column for column in self.key_columns if column not in columns]
+        if missing:
+            labels = '، '.join(self.labels[column] for column in missing)
+            yield self._error(1, {}, None, f'أعمدة مفقودة: {labels}')
+            return
+
+        try:
+            chunk = []
+            for line, values in enumerate(table, start=2):
+                if not any(str(value).strip() for value in values):
+                    continue
+                row = {}
+                for column, value in zip(columns, values):
+                    if column is not None:
+                        row[column] = str(value).strip()
+                chunk.append((line, row))
+                if len(chunk) >= self.chunk_size:
+                    yield from self._import_chunk(chunk)
+                    chunk = []
+            if chunk:
+                yield from self._import_chunk(chunk)
+        finally:
+            # Also after a read error, for the chunks already imported
+            self._refresh_rollups()
+
+    def _error(self, line, row, field, message):
+        return {
+            'row': line,
+            'house_number': row.get('house_number', ''),
+            'room_type': row.get('room_type', ''),
+            'room_number': row.get('room_number', ''),
+            'field': self.labels.get(field, field or ''),
+            'message': str(message),
+        }
+
+    def _form_data(self, row, fields):
+        data = {}
+        for name in fields:
+            value = row.get(name, '')
+            if name == 'structural_problems':
+                values = MULTIPLE_VALUES_SEPARATOR.split(value) if value else []
+                data[name] = [self.choices[name].get(_normalize(item), item) for item in values if item]
+            elif name in self.choices and value:
+                data[name] = self.choices[name].get(_normalize(value), value)
+            else:
+                data[name] = value
+        return data
+
+    def _bind_form(self, room_type, data):
+        """
+        The survey form of a layout bound to a row. Building a form deep-copies
+        all of its fields and widgets, which costs more than validating the row,
+        so each layout's form is built once and rebound to every row.
+        """
+        form = self.forms.get(room_type)
+        if form is None:
+            if room_type is None:
+                form = HouseGeneralInfoForm(data)
+            else:
+                form = RoomDetailForm(data, room_type=room_type)
+            self.forms[room_type] = form
+            return form
+        form.data = data
+        form.instance = self.model()
+        form._errors = None
+        return form
+
+    def _load_houses(self, chunk):
+        numbers = {_to_int(row.get('house_number', '')) for _, row in chunk}
+        houses = self.program.houses.filter(house_number__in=numbers)
+        if self.kind == 'rooms':
+            houses = houses.select_related('general_info')
+        return {house.house_number: house for house in houses}
+
+    def _import_chunk(self, chunk):
+        houses = self._load_houses(chunk)
+        valid = {}
+
+        for line, row in chunk:
+            house = houses.get(_to_int(row.get('house_number', '')))
+            if house is None:
+                self.failed += 1
+                yield self._error(line, row, 'house_number', 'المنزل غير موجود في البرنامج')
+                continue
+
+            room_type = None
+            key = (house.pk,)
+            if self.kind == 'rooms':
+                room_type = self.choices['room_type'].get(_normalize(row.get('room_type', '')))
+                if not is_valid_room_type(room_type):
+                    self.failed += 1
+                    yield self._error(line, row, 'room_type', 'نوع الغرفة غير معروف')
+                    continue
+                general_info = getattr(house, 'general_info', None)
+                if general_info is None:
+                    self.failed += 1
+                    yield self._error(line, row, None, 'يجب إدخال المعلومات العامة للمنزل أولاً')
+                    continue
+                rooms_count = getattr(general_info, HouseGeneralInfo.ROOM_COUNT_FIELDS[room_type])
+                room_number = _to_int(row.get('room_number', '')) or 0
+                if not rooms_count:
+                    self.failed += 1
+                    yield self._error(line, row, 'room_type', 'لا توجد غرف من هذا النوع في المعلومات العامة للمنزل')
+                    continue
+                if not 1 <= room_number <= rooms_count:
+                    self.failed += 1
+                    yield self._error(line, row, 'room_number', f'رقم الغرفة يجب أن يكون بين 1 و {rooms_count}')
+                    continue
+                key = (house.pk, room_type, room_number)
+
+            form = self._bind_form(room_type, self._form_data(row, self.layouts[room_type]))
+            if not form.is_valid():
+                self.failed += 1
+                for field, errors in form.errors.items():
+                    for message in errors:
+                        yield self._error(line, row, None if field == '__all__' else field, message)
+                continue
+
+            instance = form.save(commit=False)
+            instance.house = house
+            if room_type is not None:
+                instance.room_type = room_type
+                instance.room_number = key[2]
+            # Rows for the same house/room: the last one wins
+            valid[key] = (room_type, instance)
+
+        if valid:
+            self._upsert(valid)
+
+    def _existing_keys(self, keys):
+        house_ids = {key[0] for key in keys}
+        if self.kind == 'general_info':
+            existing = self.model.objects.filter(house_id__in=house_ids).values_list('house_id')
+        else:
+            existing = self.model.objects.filter(house_id__in=house_ids).values_list(
+                'house_id', 'room_type', 'room_number'
+            )
+        return set(existing)
+
+    def _upsert(self, valid):
+        existing = self._existing_keys(valid)
+        updated = len(existing & set(valid))
+
+        by_layout = {}
+        for room_type, instance in valid.values():
+            by_layout.setdefault(room_type, []).append(instance)
+
+        unique_fields = ['house'] if self.kind == 'general_info' else ['house', 'room_type', 'room_number']
+        houses = House.objects.filter(pk__in={key[0] for key in valid})
+        with track_program_progress(self.program.pk, houses):
+            for room_type, instances in by_layout.items():
+                self.model.objects.bulk_create(
+                    instances,
+                    update_conflicts=True,
+                    unique_fields=unique_fields,
+                    update_fields=self.layouts[room_type] + ['updated_at'],
+                )
+
+        self.updated += updated
+        self.created += len(valid) - updated
+        self.house_ids.update(key[0] for key in valid)
+
+    def _refresh_rollups(self):
+        # bulk_create sends no post_save, refresh what the room signals would have
+        # (the survey progress is updated with each chunk)
+        if not self.house_ids:
+            return
+        if self.kind == 'rooms':
+            house_ids = sorted(self.house_ids)
+            for start in range(0, len(house_ids), self.chunk_size):
+                refresh_house_needs(house_ids[start:start + self.chunk_size])
+            invalidate_program_renovation(self.program.pk)
+
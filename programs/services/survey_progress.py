@@ -0,0 +1,121 @@
+# programs/services/survey_progress.py
+# Survey progress rollup of a program, materialized in ProgramProgress: kept up
+# to date with the change of the touched houses only, recomputed in full by
+# the rebuild command
+
+import logging
+from contextlib import contextmanager
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from ..models import House, Program, ProgramProgress
+
+logger = logging.getLogger('programs')
+
+
+def compute_program_progress(program_id):
+    """
+    Survey progress totals of a program from its houses, in one aggregate query
+    """
+    return House.objects.filter(program_id=program_id).progress_totals()
+
+
+def refresh_program_progress(program_id):
+    """
+    Recompute and store the progress of a program, returns the ProgramProgress
+    (None when the program no longer exists)
+    """
+    if not Program.objects.filter(pk=program_id).exists():
+        return None
+    progress, _ = ProgramProgress.objects.update_or_create(
+        program_id=program_id,
+        defaults=compute_program_progress(program_id)
+    )
+    return progress
+
+
+def schedule_program_progress_refresh(program_id):
+    """
+    Refresh the progress of a program once the current transaction commits
+    """
+    if program_id:
+        transaction.on_commit(lambda: refresh_program_progress(program_id))
+
+
+def lock_program_progress(program_id, using='default'):
+    """
+    Lock the progress row of a program until the current transaction ends, so
+    concurrent changes to its houses are counted one after the other
+    """
+    list(ProgramProgress.objects.using(using).select_for_update().filter(program_id=program_id).values_list('pk'))
+
+
+def apply_program_progress_delta(program_id, before, after, using='default'):
+    """
+    Add the difference between two progress_totals() of the same houses to
+    the stored progress (computed in full on commit if the program has none yet)
+    """
+    delta = {
+        field: after.get(field, 0) - before.get(field, 0)
+        for field in ProgramProgress.COUNTER_FIELDS
+        if after.get(field, 0) != before.get(field, 0)
+    }
+    if not delta:
+        return
+    updated = ProgramProgress.objects.using(using).filter(program_id=program_id).update(
+        updated_at=timezone.now(),
+        **{field: F(field) + value for field, value in delta.items()}
+    )
+    if not updated:
+        schedule_program_progress_refresh(program_id)
+
+
+@contextmanager
+def track_program_progress(program_id, houses):
+    """
+    Apply the progress change of some houses of a program (a House queryset,
+    evaluated before and after the block) to the stored ProgramProgress in
+    the same transaction as the change
+    """
+    with transaction.atomic(using=houses.db):
+        lock_program_progress(program_id, houses.db)
+        before = houses.progress_totals()
+        yield
+        apply_program_progress_delta(program_id, before, houses.progress_totals(), houses.db)
+
+
+def get_program_progress(program):
+    """
+    The stored progress of a program, computed on first use
+    """
+    try:
+        return program.progress
+    except ProgramProgress.DoesNotExist:
+        return refresh_program_progress(program.pk)
+
+
+def rebuild_program_progress(dry_run=False):
+    """
+    Recompute the progress of every program and fix the stored rows.
+    Returns a list of drift entries:
+    {'program_id', 'missing', 'changes': {field: (stored, actual)}}
+    """
+    stored = {progress.program_id: progress for progress in ProgramProgress.objects.all()}
+    drift = []
+    for program_id in Program.objects.values_list('pk', flat=True).iterator():
+        actual = compute_program_progress(program_id)
+        progress = stored.get(program_id)
+        changes = {
+            field: (getattr(progress, field) if progress else 0, value)
+            for field, value in actual.items()
+            if progress is None or getattr(progress, field) != value
+        }
+        if progress is not None and not changes:
+            continue
+        drift.append({'program_id': program_id, 'missing': progress is None, 'changes': changes})
+        if not dry_run:
+            ProgramProgress.objects.update_or_create(program_id=program_id, defaults=actual)
+
+    if drift:
+        logger.warning(f"Program progress drift found for {len(drift)} programs")
+    return drift
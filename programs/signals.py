@@ -0,0 +1,55 @@
+# programs/signals.py
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+from .models import House, HouseGeneralInfo, RoomDetail
+from .services.renovation_needs import schedule_house_needs_refresh
+from .services.survey_progress import apply_program_progress_delta, lock_program_progress
+
+
+def _get_program_id(house_id):
+    return House.objects.filter(pk=house_id).values_list('program_id', flat=True).first()
+
+
+def _get_instance_program_id(instance):
+    house = instance._state.fields_cache.get('house')
+    return house.program_id if house is not None else _get_program_id(instance.house_id)
+
+
+@receiver(pre_save, sender=HouseGeneralInfo)
+@receiver(pre_save, sender=RoomDetail)
+def snapshot_progress_before_survey_change(sender, instance, raw=False, **kwargs):
+    """
+    Lock the program's progress row and record the house's progress before
+    general info or a room detail is saved (the save runs in a transaction)
+    """
+    if raw:
+        return
+    program_id = _get_instance_program_id(instance)
+    lock_program_progress(program_id)
+    instance._progress_before = (program_id, House.objects.filter(pk=instance.house_id).progress_totals())
+
+
+@receiver(post_save, sender=HouseGeneralInfo)
+@receiver(post_save, sender=RoomDetail)
+def update_progress_on_survey_change(sender, instance, raw=False, **kwargs):
+    """
+    Add the change of the house's progress to the program's survey progress.
+    Deletions are not hooked here on purpose: a delete receiver would stop the cascade
+    from programs and houses being a fast delete. Trimming houses is counted by
+    provision_houses, and deleting a program removes its progress row.
+    """
+    snapshot = instance.__dict__.pop('_progress_before', None)
+    if raw or snapshot is None:
+        return
+    program_id, before = snapshot
+    after = House.objects.filter(pk=instance.house_id).progress_totals()
+    apply_program_progress_delta(program_id, before, after)
+
+
+@receiver(post_save, sender=RoomDetail)
+def refresh_renovation_needs_on_room_change(sender, instance, **kwargs):
+    """
+    Recount the renovation needs of the room's house and invalidate the program's
+    cached renovation report (only this house is recomputed)
+    """
+    schedule_house_needs_refresh(instance.house_id, _get_instance_program_id(instance))
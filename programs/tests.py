@@ -1,3 +1,407 @@
-from django.test import TestCase
+import io
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from .models import House, HouseGeneralInfo, HouseRenovationNeeds, Program, ProgramProgress, RoomDetail
+from .services.house_provisioning import provision_houses
+from .services.renovation_needs import (
+    count_room_conditions, estimate_needs_cost, get_program_renovation_report, refresh_house_needs,
+)
+from .services.room_inventory import ROOM_KEY_FIELDS, build_room_inventories
+from .services.survey_import import SurveyImporter, iter_csv_table
+from .services.survey_progress import compute_program_progress, rebuild_program_progress, refresh_program_progress
 
-# Create your tests here.
+Employee = get_user_model()
+
+
+def create_program(number_of_houses):
+    creator = Employee.objects.create_user(
+        username=f'creator{Employee.objects.count()}',
+        name='منشئ البرنامج',
+        email=f'creator{Employee.objects.count()}@example.com',
+        job_number=f'P{Employee.objects.count()}',
+        mobile_number='0500000000',
+        section='admin',
+    )
+    program = Program.objects.create(
+        name='برنامج',
+        description='وصف',
+        number_of_houses=number_of_houses,
+        address='العنوان',
+        created_by=creator,
+    )
+    provision_houses(program)
+    return program
+
+
+def create_general_info(house, **counts):
+    data = {
+        'owner_name': 'المالك',
+        'id_number': '1000000000',
+        'number_of_residents': 4,
+        'phone_number': '0500000000',
+        'building_type': 'popular',
+        'bedrooms': 2,
+        'bathrooms': 1,
+        'living_rooms': 1,
+        'kitchens': 1,
+        'majlis': 1,
+        'plot_area': 300,
+        'house_area': 200,
+    }
+    data.update(counts)
+    return HouseGeneralInfo.objects.create(house=house, **data)
+
+
+class ProgramProgressTests(TestCase):
+    """The stored progress follows survey saves with per-house deltas"""
+
+    def setUp(self):
+        self.program = create_program(3)
+        refresh_program_progress(self.program.pk)
+        self.house = self.program.houses.get(house_number=1)
+
+    def assert_progress_matches_houses(self):
+        progress = ProgramProgress.objects.get(program=self.program)
+        stored = {field: getattr(progress, field) for field in ProgramProgress.COUNTER_FIELDS}
+        self.assertEqual(stored, compute_program_progress(self.program.pk))
+        return progress
+
+    def test_general_info_and_rooms(self):
+        info = create_general_info(self.house, bedrooms=2)
+        progress = self.assert_progress_matches_houses()
+        self.assertEqual(progress.houses_with_general_info, 1)
+        self.assertEqual(progress.rooms_expected, 6)
+
+        for number in (1, 2):
+            RoomDetail.objects.create(house=self.house, room_type='bedroom', room_number=number)
+        self.assertEqual(self.assert_progress_matches_houses().rooms_analyzed, 2)
+
+        # Fewer bedrooms: the second bedroom no longer counts
+        info.bedrooms = 1
+        info.save()
+        progress = self.assert_progress_matches_houses()
+        self.assertEqual(progress.rooms_expected, 5)
+        self.assertEqual(progress.rooms_analyzed, 1)
+
+    def test_save_reads_only_the_house(self):
+        create_general_info(self.house)
+
+        with CaptureQueriesContext(connection) as queries:
+            RoomDetail.objects.create(house=self.house, room_type='kitchen', room_number=1)
+
+        self.assertFalse([query for query in queries if '"programs_house"."program_id"' in query['sql']])
+        self.assertEqual(self.assert_progress_matches_houses().rooms_analyzed, 1)
+
+    def test_rebuild_repairs_drift(self):
+        create_general_info(self.house)
+        ProgramProgress.objects.filter(program=self.program).update(rooms_expected=99)
+
+        drift = rebuild_program_progress()
+
+        self.assertEqual([entry['program_id'] for entry in drift], [self.program.pk])
+        self.assert_progress_matches_houses()
+        self.assertEqual(rebuild_program_progress(), [])
+
+
+class ProvisionHousesTests(TestCase):
+    """Houses follow the program's number_of_houses"""
+
+    def setUp(self):
+        self.program = create_program(3)
+        refresh_program_progress(self.program.pk)
+
+    def house_numbers(self):
+        return list(self.program.houses.values_list('house_number', flat=True))
+
+    def test_grow_adds_missing_numbers(self):
+        self.program.number_of_houses = 6
+
+        self.assertEqual(provision_houses(self.program), (3, 0))
+        self.assertEqual(self.house_numbers(), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(provision_houses(self.program), (0, 0))
+        self.assertEqual(ProgramProgress.objects.get(program=self.program).houses_count, 6)
+
+    def test_shrink_removes_houses_above_count_with_their_surveys(self):
+        last = self.program.houses.get(house_number=3)
+        create_general_info(last)
+        RoomDetail.objects.create(house=last, room_type='kitchen', room_number=1)
+        create_general_info(self.program.houses.get(house_number=1))
+
+        self.program.number_of_houses = 2
+        self.assertEqual(provision_houses(self.program), (0, 1))
+
+        self.assertEqual(self.house_numbers(), [1, 2])
+        self.assertFalse(HouseGeneralInfo.objects.filter(house_id=last.pk).exists())
+        self.assertFalse(RoomDetail.objects.filter(house_id=last.pk).exists())
+        progress = ProgramProgress.objects.get(program=self.program)
+        self.assertEqual(progress.houses_count, 2)
+        self.assertEqual(progress.houses_with_general_info, 1)
+        self.assertEqual(progress.rooms_analyzed, 0)
+        self.assertEqual(rebuild_program_progress(dry_run=True), [])
+
+    def test_gap_in_numbers_is_filled_from_last_house(self):
+        self.program.houses.filter(house_number=3).delete()
+        self.program.number_of_houses = 4
+
+        self.assertEqual(provision_houses(self.program), (2, 0))
+        self.assertEqual(self.house_numbers(), [1, 2, 3, 4])
+
+    def test_other_programs_untouched(self):
+        other = create_program(2)
+        self.program.number_of_houses = 0
+
+        self.assertEqual(provision_houses(self.program), (0, 3))
+        self.assertEqual(House.objects.filter(program=other).count(), 2)
+
+
+GENERAL_INFO_HEADER = [
+    'house_number', 'owner_name', 'id_number', 'number_of_residents', 'phone_number',
+    'building_type', 'bedrooms', 'bathrooms', 'living_rooms', 'kitchens', 'majlis',
+    'rooftops', 'courtyards', 'plot_area', 'house_area',
+]
+
+
+def general_info_row(house_number, owner_name='المالك', bedrooms=2):
+    return [
+        house_number, owner_name, '1000000000', '4', '0500000000',
+        'شعبي', bedrooms, '1', '1', '1', '1', '0', '0', '300', '200',
+    ]
+
+
+class SurveyImporterTests(TestCase):
+    """Survey rows are validated, upserted and counted into the program rollups"""
+
+    def setUp(self):
+        self.program = create_program(3)
+        refresh_program_progress(self.program.pk)
+
+    def run_import(self, kind, rows, header=GENERAL_INFO_HEADER):
+        importer = SurveyImporter(self.program, kind, chunk_size=2)
+        errors = list(importer.run([header] + rows))
+        return importer, errors
+
+    def test_general_info_created_then_updated(self):
+        importer, errors = self.run_import('general_info', [general_info_row(1), general_info_row(2)])
+        self.assertEqual(errors, [])
+        self.assertEqual((importer.created, importer.updated), (2, 0))
+
+        importer, errors = self.run_import('general_info', [general_info_row(2, 'مالك جديد')])
+        self.assertEqual((importer.created, importer.updated), (0, 1))
+        info = HouseGeneralInfo.objects.get(house__program=self.program, house__house_number=2)
+        self.assertEqual(info.owner_name, 'مالك جديد')
+        self.assertEqual(info.building_type, 'popular')
+        self.assertEqual(HouseGeneralInfo.objects.count(), 2)
+
+    def test_last_row_for_a_house_wins(self):
+        rows = [general_info_row(1, 'الأول'), general_info_row(1, 'الثاني', bedrooms=3)]
+        importer, errors = self.run_import('general_info', rows)
+
+        self.assertEqual(errors, [])
+        info = HouseGeneralInfo.objects.get(house__program=self.program, house__house_number=1)
+        self.assertEqual((info.owner_name, info.bedrooms), ('الثاني', 3))
+        self.assertEqual(importer.imported, 1)
+
+    def test_rejected_rows_are_reported(self):
+        rows = [general_info_row(9), general_info_row(1, bedrooms=20), general_info_row(2)]
+        importer, errors = self.run_import('general_info', rows)
+
+        self.assertEqual([(error['row'], error['field']) for error in errors], [
+            (2, 'رقم المنزل'),
+            (3, HouseGeneralInfo._meta.get_field('bedrooms').verbose_name),
+        ])
+        self.assertEqual((importer.imported, importer.failed), (1, 2))
+
+    def test_room_numbers_within_general_info_counts(self):
+        house = self.program.houses.get(house_number=1)
+        create_general_info(house, bedrooms=2)
+        header = ['رقم المنزل', 'نوع الغرفة', 'رقم الغرفة', 'paint_condition']
+        rows = [
+            ['1', 'غرفة نوم', '1', ''],
+            ['1', 'bedroom', '2.0', ''],
+            ['1', 'bedroom', '3', ''],
+            ['1', 'bedroom', '0', ''],
+            ['1', 'rooftop', '1', ''],
+            ['2', 'bedroom', '1', ''],
+            ['1', 'garage', '1', ''],
+        ]
+        importer, errors = self.run_import('rooms', rows, header)
+
+        self.assertEqual(importer.created, 2)
+        self.assertEqual(
+            [(error['row'], error['field']) for error in errors],
+            [(4, 'رقم الغرفة'), (5, 'رقم الغرفة'), (6, 'نوع الغرفة'), (7, ''), (8, 'نوع الغرفة')]
+        )
+        self.assertEqual(
+            sorted(RoomDetail.objects.filter(house=house).values_list('room_type', 'room_number')),
+            [('bedroom', 1), ('bedroom', 2)]
+        )
+
+    def test_rollups_refreshed(self):
+        house = self.program.houses.get(house_number=1)
+        create_general_info(house, bedrooms=2)
+        header = ['house_number', 'room_type', 'room_number', 'furniture_condition']
+        rows = [['1', 'bedroom', '1', 'needs_change'], ['1', 'bedroom', '2', 'تغيير'], ['1', 'kitchen', '1', '']]
+        self.run_import('rooms', rows, header)
+
+        progress = ProgramProgress.objects.get(program=self.program)
+        self.assertEqual(progress.rooms_analyzed, 3)
+        self.assertEqual(rebuild_program_progress(dry_run=True), [])
+        needs = HouseRenovationNeeds.objects.get(house=house)
+        self.assertEqual(needs.rooms_count, 3)
+        self.assertEqual(needs.needs['bedroom']['needs']['furniture_condition'], {'needs_change': 2})
+
+    def test_csv_with_arabic_headers(self):
+        importer = SurveyImporter(self.program, 'general_info')
+        labels = [importer.labels[name] for name in GENERAL_INFO_HEADER]
+        lines = [','.join(labels), ','.join(str(value) for value in general_info_row(3))]
+        data = io.BytesIO(('\ufeff' + '\r\n'.join(lines)).encode())
+
+        errors = list(importer.run(iter_csv_table(data)))
+
+        self.assertEqual(errors, [])
+        self.assertTrue(HouseGeneralInfo.objects.filter(house__program=self.program, house__house_number=3).exists())
+
+
+UNIT_COSTS = {
+    'furniture_condition': {'needs_change': 1000},
+    'windows_condition': {'needs_change': 500, 'maintenance': 200},
+}
+
+
+@override_settings(RENOVATION_SETTINGS={'UNIT_COSTS': UNIT_COSTS})
+class RenovationNeedsTests(TestCase):
+    """Room condition counts and estimated costs per room type, house and program"""
+
+    def setUp(self):
+        cache.clear()
+        self.program = create_program(2)
+        self.first, self.second = self.program.houses.order_by('house_number')
+        RoomDetail.objects.create(
+            house=self.first, room_type='bedroom', room_number=1,
+            furniture_condition='needs_change', windows_condition='needs_change',
+        )
+        RoomDetail.objects.create(house=self.first, room_type='bedroom', room_number=2, furniture_condition='excellent')
+        RoomDetail.objects.create(house=self.first, room_type='kitchen', room_number=1, windows_condition='maintenance')
+        RoomDetail.objects.create(house=self.second, room_type='bedroom', room_number=1, furniture_condition='needs_change')
+
+    def test_count_room_conditions(self):
+        counts = count_room_conditions(RoomDetail.objects.filter(house__program=self.program))
+
+        self.assertEqual(counts, {
+            self.first.pk: {
+                'bedroom': {'rooms': 2, 'needs': {
+                    'furniture_condition': {'needs_change': 1, 'excellent': 1},
+                    'windows_condition': {'needs_change': 1},
+                }},
+                'kitchen': {'rooms': 1, 'needs': {'windows_condition': {'maintenance': 1}}},
+            },
+            self.second.pk: {
+                'bedroom': {'rooms': 1, 'needs': {'furniture_condition': {'needs_change': 1}}},
+            },
+        })
+
+    def test_estimate_needs_cost(self):
+        needs = {'furniture_condition': {'needs_change': 2, 'excellent': 3}, 'doors_condition': {'maintenance': 1}}
+        self.assertEqual(estimate_needs_cost(needs, UNIT_COSTS), 2000)
+
+    def test_program_report(self):
+        report = get_program_renovation_report(self.program)
+
+        self.assertEqual(report['rooms'], 4)
+        self.assertEqual(report['total_cost'], 2700)
+        self.assertEqual(
+            [(row['house_number'], row['rooms'], row['cost']) for row in report['houses']],
+            [(1, 3, 1700), (2, 1, 1000)]
+        )
+        self.assertEqual(
+            [(row['type'], row['rooms'], row['cost']) for row in report['room_types']],
+            [('bedroom', 3, 2500), ('kitchen', 1, 200)]
+        )
+        furniture = next(row for row in report['fields'] if row['field'] == 'furniture_condition')
+        self.assertEqual(
+            [(item['value'], item['count'], item['cost']) for item in furniture['values']],
+            [('excellent', 1, 0), ('needs_change', 2, 2000)]
+        )
+        self.assertEqual(furniture['cost'], 2000)
+
+    def test_changed_cost_table_is_not_served_from_cache(self):
+        self.assertEqual(get_program_renovation_report(self.program)['total_cost'], 2700)
+
+        with override_settings(RENOVATION_SETTINGS={'UNIT_COSTS': {'furniture_condition': {'needs_change': 10}}}):
+            self.assertEqual(get_program_renovation_report(self.program)['total_cost'], 20)
+
+    def test_room_save_invalidates_report_and_refreshes_only_its_house(self):
+        self.assertEqual(get_program_renovation_report(self.program)['rooms'], 4)
+
+        with mock.patch(
+            'programs.services.renovation_needs.refresh_house_needs',
+            wraps=refresh_house_needs,
+        ) as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                RoomDetail.objects.create(
+                    house=self.second, room_type='kitchen', room_number=1, windows_condition='needs_change'
+                )
+                # Cached until the commit
+                self.assertEqual(get_program_renovation_report(self.program)['rooms'], 4)
+
+        refresh.assert_called_once_with([self.second.pk])
+        report = get_program_renovation_report(self.program)
+        self.assertEqual(report['rooms'], 5)
+        self.assertEqual(report['total_cost'], 3200)
+        self.assertEqual(HouseRenovationNeeds.objects.get(house=self.second).rooms_count, 2)
+
+
+class RoomInventoryTests(TestCase):
+    """Expected rooms from the general info matched with the entered room details"""
+
+    def setUp(self):
+        self.program = create_program(2)
+        self.first, self.second = self.program.houses.order_by('house_number')
+        create_general_info(self.first, bedrooms=2, bathrooms=1, living_rooms=0, kitchens=1, majlis=0)
+        RoomDetail.objects.create(house=self.first, room_type='bedroom', room_number=1)
+        RoomDetail.objects.create(house=self.first, room_type='kitchen', room_number=1)
+        # Left over after the bedrooms count went down from 3 to 2
+        RoomDetail.objects.create(house=self.first, room_type='bedroom', room_number=3)
+        RoomDetail.objects.create(house=self.second, room_type='majlis', room_number=1)
+
+    def get_inventories(self, **kwargs):
+        houses = self.program.houses.select_related('general_info').order_by('house_number')
+        with CaptureQueriesContext(connection) as queries:
+            inventories = build_room_inventories(houses, **kwargs)
+        self.assertEqual(len(queries), 2)
+        return inventories
+
+    def test_expected_and_analyzed_counts(self):
+        first, second = self.get_inventories()
+
+        counts = {row['type']: (row['expected'], row['analyzed']) for row in first.room_types}
+        self.assertEqual(counts['bedroom'], (2, 1))
+        self.assertEqual(counts['bathroom'], (1, 0))
+        self.assertEqual(counts['kitchen'], (1, 1))
+        self.assertEqual(counts['majlis'], (0, 0))
+        self.assertEqual((first.total_rooms, first.analyzed_rooms, first.remaining_rooms), (4, 2, 2))
+        self.assertEqual(first.progress_percentage, 50)
+        self.assertIsNotNone(first.get_room_detail('bedroom', 1))
+        self.assertIsNone(first.get_room_detail('bedroom', 2))
+
+        # No general info yet: nothing is expected
+        self.assertIsNone(second.general_info)
+        self.assertEqual(second.total_rooms, 0)
+        self.assertEqual(second.progress_percentage, 0)
+
+    def test_extra_room_details(self):
+        first, second = self.get_inventories()
+
+        self.assertEqual([(d.room_type, d.room_number) for d in first.extra_room_details], [('bedroom', 3)])
+        self.assertEqual([(d.room_type, d.room_number) for d in second.extra_room_details], [('majlis', 1)])
+        self.assertEqual(second.extra_room_details[0].house, self.second)
+
+    def test_room_key_fields(self):
+        first, _ = self.get_inventories(room_fields=ROOM_KEY_FIELDS)
+
+        self.assertEqual(first.analyzed_rooms, 2)
+        self.assertEqual(len(first.extra_room_details), 1)
@@ -11,6 +11,9 @@ urlpatterns = [
     path('<int:pk>/', views.program_detail, name='detail'),
     path('<int:pk>/edit/', views.edit_program, name='edit'),
     path('<int:pk>/delete/', views.delete_program, name='delete'),
+    path('<int:pk>/technical-analysis/', views.program_technical_analysis, name='program_technical_analysis'),
+    path('<int:pk>/renovation-needs/', views.program_renovation_needs, name='program_renovation_needs'),
+    path('<int:pk>/import-survey/', views.import_survey, name='import_survey'),
     
     # House management
     path('<int:program_pk>/houses/', views.houses_list, name='houses_list'),
@@ -1,18 +1,29 @@
 # programs/views.py
+import zipfile
+from xml.etree.ElementTree import ParseError
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.core.paginator import Paginator
+from django.db import transaction
 from django.db.models import Q
 from django.views.decorators.http import require_http_methods
 from .models import Program, House, HouseGeneralInfo, RoomDetail
-from .forms import ProgramForm, HouseGeneralInfoForm, RoomDetailForm
+from .forms import ProgramForm, HouseGeneralInfoForm, RoomDetailForm, SurveyImportForm
+from .services.house_provisioning import provision_houses
+from .services.renovation_needs import get_program_renovation_report, get_renovation_settings
+from .services.survey_import import KEY_COLUMNS, SurveyImporter, get_import_format, iter_table
+from .services.survey_progress import get_program_progress
+from .services.room_inventory import (
+    ROOM_KEY_FIELDS, build_room_inventories, get_room_inventory, get_room_type_display,
+    is_valid_room_type,
+)
 
 @login_required
 def index(request):
     """Display all programs with search and pagination"""
-    programs = Program.objects.all()
+    programs = Program.objects.select_related('created_by', 'progress')
     
     # Search functionality
     search_query = request.GET.get('search', '')
@@ -45,16 +56,13 @@ def create_program(request):
     if request.method == 'POST':
         form = ProgramForm(request.POST)
         if form.is_valid():
-            program = form.save(commit=False)
-            program.created_by = request.user
-            program.save()
-            
-            # Create houses for the program
-            for i in range(1, program.number_of_houses + 1):
-                House.objects.create(
-                    program=program,
-                    house_number=i
-                )
+            with transaction.atomic():
+                program = form.save(commit=False)
+                program.created_by = request.user
+                program.save()
+                
+                # Create houses for the program
+                provision_houses(program)
             
             messages.success(request, f'تم إنشاء البرنامج "{program.name}" بنجاح مع {program.number_of_houses} منزل')
             return redirect('programs:detail', pk=program.pk)
@@ -73,14 +81,16 @@ def create_program(request):
 @login_required
 def program_detail(request, pk):
     """Display program details"""
-    program = get_object_or_404(Program, pk=pk)
-    houses = program.houses.all()
+    program = get_object_or_404(Program.objects.select_related('created_by'), pk=pk)
+    # Survey state of every house in one query, program totals from the stored rollup
+    houses = program.houses.select_related('general_info').with_progress()
     
     context = {
         'title': f'برنامج: {program.name}',
         'current_page': 'programs',
         'program': program,
-        'houses': houses
+        'houses': houses,
+        'progress': get_program_progress(program)
     }
     
     return render(request, 'programs/detail.html', context)
@@ -94,22 +104,11 @@ def edit_program(request, pk):
     if request.method == 'POST':
         form = ProgramForm(request.POST, instance=program)
         if form.is_valid():
-            old_house_count = program.number_of_houses
-            program = form.save()
-            new_house_count = program.number_of_houses
-            
-            # Adjust house count if changed
-            if new_house_count > old_house_count:
-                # Add new houses
-                for i in range(old_house_count + 1, new_house_count + 1):
-                    House.objects.create(
-                        program=program,
-                        house_number=i
-                    )
-            elif new_house_count < old_house_count:
-                # Remove excess houses (from the end)
-                excess_houses = program.houses.filter(house_number__gt=new_house_count)
-                excess_houses.delete()
+            with transaction.atomic():
+                program = form.save()
+                
+                # Adjust house count if changed (add at the end / remove from the end)
+                provision_houses(program)
             
             messages.success(request, f'تم تحديث البرنامج "{program.name}" بنجاح')
             return redirect('programs:detail', pk=program.pk)
@@ -156,13 +155,14 @@ def delete_program(request, pk):
 def houses_list(request, program_pk):
     """Display houses in a program"""
     program = get_object_or_404(Program, pk=program_pk)
-    houses = program.houses.all()
+    houses = program.houses.select_related('general_info').with_progress()
     
     context = {
         'title': f'منازل برنامج: {program.name}',
         'current_page': 'programs',
         'program': program,
-        'houses': houses
+        'houses': houses,
+        'progress': get_program_progress(program)
     }
     
     return render(request, 'programs/houses_list.html', context)
@@ -258,8 +258,8 @@ def edit_house_general_info(request, program_pk, house_pk):
 @login_required
 def technical_analysis(request, program_pk, house_pk):
     """Display technical analysis page with room cards"""
-    program = get_object_or_404(Program, pk=program_pk)
-    house = get_object_or_404(House, pk=house_pk, program=program)
+    house = _get_house(program_pk, house_pk)
+    program = house.program
     
     # Check if general info exists
     try:
@@ -268,112 +268,8 @@ def technical_analysis(request, program_pk, house_pk):
         messages.error(request, 'يجب إكمال المعلومات العامة للمنزل أولاً')
         return redirect('programs:house_detail', program_pk=program.pk, house_pk=house.pk)
     
-    # Get existing room details for status checking
-    existing_room_details = house.room_details.all()
-    existing_rooms_dict = {}
-    for room_detail in existing_room_details:
-        key = f"{room_detail.room_type}_{room_detail.room_number}"
-        existing_rooms_dict[key] = room_detail
-    
-    # Create room cards based on general info
-    room_cards = []
-    
-    # Bedrooms
-    for i in range(1, general_info.bedrooms + 1):
-        key = f"bedroom_{i}"
-        room_detail = existing_rooms_dict.get(key)
-        room_cards.append({
-            'type': 'bedroom',
-            'type_display': 'غرفة نوم',
-            'number': i,
-            'icon': 'bx-bed',
-            'has_details': room_detail is not None,
-            'room_detail': room_detail
-        })
-    
-    # Bathrooms
-    for i in range(1, general_info.bathrooms + 1):
-        key = f"bathroom_{i}"
-        room_detail = existing_rooms_dict.get(key)
-        room_cards.append({
-            'type': 'bathroom',
-            'type_display': 'دورة مياه',
-            'number': i,
-            'icon': 'bx-bath',
-            'has_details': room_detail is not None,
-            'room_detail': room_detail
-        })
-    
-    # Living rooms
-    for i in range(1, general_info.living_rooms + 1):
-        key = f"living_room_{i}"
-        room_detail = existing_rooms_dict.get(key)
-        room_cards.append({
-            'type': 'living_room',
-            'type_display': 'غرفة معيشة',
-            'number': i,
-            'icon': 'bx-home',
-            'has_details': room_detail is not None,
-            'room_detail': room_detail
-        })
-    
-    # Kitchens
-    for i in range(1, general_info.kitchens + 1):
-        key = f"kitchen_{i}"
-        room_detail = existing_rooms_dict.get(key)
-        room_cards.append({
-            'type': 'kitchen',
-            'type_display': 'مطبخ',
-            'number': i,
-            'icon': 'bx-restaurant',
-            'has_details': room_detail is not None,
-            'room_detail': room_detail
-        })
-    
-    # Majlis
-    for i in range(1, general_info.majlis + 1):
-        key = f"majlis_{i}"
-        room_detail = existing_rooms_dict.get(key)
-        room_cards.append({
-            'type': 'majlis',
-            'type_display': 'مجلس',
-            'number': i,
-            'icon': 'bx-group',
-            'has_details': room_detail is not None,
-            'room_detail': room_detail
-        })
-    
-    # Rooftops
-    for i in range(1, general_info.rooftops + 1):
-        key = f"rooftop_{i}"
-        room_detail = existing_rooms_dict.get(key)
-        room_cards.append({
-            'type': 'rooftop',
-            'type_display': 'سطح',
-            'number': i,
-            'icon': 'bx-building',
-            'has_details': room_detail is not None,
-            'room_detail': room_detail
-        })
-    
-    # Courtyards
-    for i in range(1, general_info.courtyards + 1):
-        key = f"courtyard_{i}"
-        room_detail = existing_rooms_dict.get(key)
-        room_cards.append({
-            'type': 'courtyard',
-            'type_display': 'حوش',
-            'number': i,
-            'icon': 'bx-landscape',
-            'has_details': room_detail is not None,
-            'room_detail': room_detail
-        })
-    
-    # Calculate progress statistics
-    total_rooms = len(room_cards)
-    analyzed_rooms = sum(1 for room in room_cards if room['has_details'])
-    remaining_rooms = total_rooms - analyzed_rooms
-    progress_percentage = round((analyzed_rooms / total_rooms * 100) if total_rooms > 0 else 0)
+    # Expected rooms from the general info matched with the existing room details
+    inventory = get_room_inventory(house)
     
     context = {
         'title': f'التحليل الفني - منزل رقم {house.house_number}',
@@ -381,35 +277,149 @@ def technical_analysis(request, program_pk, house_pk):
         'program': program,
         'house': house,
         'general_info': general_info,
-        'room_cards': room_cards,
-        'total_rooms': total_rooms,
-        'analyzed_rooms': analyzed_rooms,
-        'remaining_rooms': remaining_rooms,
-        'progress_percentage': progress_percentage
+        'room_cards': inventory.room_cards,
+        'total_rooms': inventory.total_rooms,
+        'analyzed_rooms': inventory.analyzed_rooms,
+        'remaining_rooms': inventory.remaining_rooms,
+        'progress_percentage': inventory.progress_percentage
     }
     
     return render(request, 'programs/technical_analysis.html', context)
 
 
+@login_required
+def program_technical_analysis(request, pk):
+    """Display the room analysis matrix of all houses in a program"""
+    program = get_object_or_404(Program, pk=pk)
+    houses = program.houses.select_related('general_info')
+    
+    paginator = Paginator(houses, 50)  # 50 houses per page
+    page_obj = paginator.get_page(request.GET.get('page'))
+    
+    # One room details query for the houses of the page, with only the room keys
+    inventories = build_room_inventories(page_obj.object_list, room_fields=ROOM_KEY_FIELDS)
+    
+    room_types = [
+        {'type': room_type, 'type_display': type_display}
+        for room_type, type_display in RoomDetail.ROOM_TYPE_CHOICES
+    ]
+    
+    # Program totals from the stored rollup rather than from every house
+    progress = get_program_progress(program)
+    
+    context = {
+        'title': f'التحليل الفني - {program.name}',
+        'current_page': 'programs',
+        'program': program,
+        'page_obj': page_obj,
+        'inventories': inventories,
+        'room_types': room_types,
+        'houses_count': progress.houses_count,
+        'total_rooms': progress.rooms_expected,
+        'analyzed_rooms': progress.rooms_analyzed,
+        'remaining_rooms': progress.rooms_expected - progress.rooms_analyzed,
+        'progress_percentage': progress.rooms_percentage
+    }
+    
+    return render(request, 'programs/program_technical_analysis.html', context)
+
+
+@login_required
+def program_renovation_needs(request, pk):
+    """Display the renovation needs of a program and their estimated cost"""
+    program = get_object_or_404(Program, pk=pk)
+    
+    # Cached until a room of the program changes
+    report = get_program_renovation_report(program)
+    
+    context = {
+        'title': f'احتياجات الترميم - {program.name}',
+        'current_page': 'programs',
+        'program': program,
+        'report': report,
+        'currency': get_renovation_settings().get('CURRENCY', ''),
+    }
+    
+    return render(request, 'programs/renovation_needs.html', context)
+
+
+# Errors listed on the import page, the rest are only counted
+SURVEY_IMPORT_ERRORS_SHOWN = 500
+
+
+@login_required
+def import_survey(request, pk):
+    """Import the general info or room details of a program's houses from a file"""
+    program = get_object_or_404(Program, pk=pk)
+    importer = None
+    errors = []
+    read_error = None
+    
+    if request.method == 'POST':
+        form = SurveyImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            file = form.cleaned_data['file']
+            importer = SurveyImporter(program, form.cleaned_data['kind'])
+            try:
+                for error in importer.run(iter_table(file, get_import_format(file.name))):
+                    if len(errors) < SURVEY_IMPORT_ERRORS_SHOWN:
+                        errors.append(error)
+            except (ValueError, KeyError, zipfile.BadZipFile, ParseError, UnicodeDecodeError):
+                read_error = 'تعذرت قراءة الملف، تأكد من أنه ملف CSV (UTF-8) أو Excel صالح'
+                messages.error(request, read_error)
+            if importer.imported:
+                messages.success(request, f'تم استيراد {importer.imported} صف بنجاح')
+            if importer.failed:
+                messages.warning(request, f'تعذر استيراد {importer.failed} صف، راجع الأخطاء أدناه')
+    else:
+        form = SurveyImportForm()
+    
+    context = {
+        'title': f'استيراد المسح - {program.name}',
+        'current_page': 'programs',
+        'program': program,
+        'form': form,
+        'importer': importer,
+        'errors': errors,
+        'read_error': read_error,
+        'errors_truncated': importer is not None and importer.failed and len(errors) >= SURVEY_IMPORT_ERRORS_SHOWN,
+        'key_columns': KEY_COLUMNS,
+    }
+    
+    return render(request, 'programs/survey_import.html', context)
+
+
+def _get_house(program_pk, house_pk):
+    """House of a program with its program and general info, in one query"""
+    return get_object_or_404(
+        House.objects.select_related('program', 'general_info'),
+        pk=house_pk,
+        program_id=program_pk
+    )
+
+
+def _get_room_detail(house, room_type, room_number):
+    """Room detail of a house, or None when not entered yet"""
+    if not is_valid_room_type(room_type):
+        raise Http404('نوع الغرفة غير معروف')
+    return RoomDetail.objects.filter(
+        house=house,
+        room_type=room_type,
+        room_number=room_number
+    ).first()
+
+
 @login_required
 def room_detail(request, program_pk, house_pk, room_type, room_number):
     """Display room details and form"""
-    program = get_object_or_404(Program, pk=program_pk)
-    house = get_object_or_404(House, pk=house_pk, program=program)
+    house = _get_house(program_pk, house_pk)
+    program = house.program
     
     # Get or create room detail
-    try:
-        room_detail = RoomDetail.objects.get(
-            house=house,
-            room_type=room_type,
-            room_number=room_number
-        )
-        is_edit = True
-    except RoomDetail.DoesNotExist:
-        room_detail = None
-        is_edit = False
+    room_detail = _get_room_detail(house, room_type, room_number)
+    is_edit = room_detail is not None
     
-    room_type_display = dict(RoomDetail.ROOM_TYPE_CHOICES).get(room_type, room_type)
+    room_type_display = get_room_type_display(room_type)
     
     context = {
         'title': f'{room_type_display} {room_number} - منزل رقم {house.house_number}',
@@ -429,20 +439,12 @@ def room_detail(request, program_pk, house_pk, room_type, room_number):
 @login_required
 def edit_room_detail(request, program_pk, house_pk, room_type, room_number):
     """Edit room technical details"""
-    program = get_object_or_404(Program, pk=program_pk)
-    house = get_object_or_404(House, pk=house_pk, program=program)
+    house = _get_house(program_pk, house_pk)
+    program = house.program
     
     # Get or create room detail
-    try:
-        room_detail = RoomDetail.objects.get(
-            house=house,
-            room_type=room_type,
-            room_number=room_number
-        )
-        is_edit = True
-    except RoomDetail.DoesNotExist:
-        room_detail = None
-        is_edit = False
+    room_detail = _get_room_detail(house, room_type, room_number)
+    is_edit = room_detail is not None
     
     if request.method == 'POST':
         if is_edit:
@@ -458,7 +460,7 @@ def edit_room_detail(request, program_pk, house_pk, room_type, room_number):
             room_detail.save()
             
             action = 'تحديث' if is_edit else 'إضافة'
-            room_type_display = dict(RoomDetail.ROOM_TYPE_CHOICES).get(room_type, room_type)
+            room_type_display = get_room_type_display(room_type)
             messages.success(request, f'تم {action} تفاصيل {room_type_display} {room_number} بنجاح')
             
             return redirect('programs:room_detail', 
@@ -472,7 +474,7 @@ def edit_room_detail(request, program_pk, house_pk, room_type, room_number):
         else:
             form = RoomDetailForm(room_type=room_type)
     
-    room_type_display = dict(RoomDetail.ROOM_TYPE_CHOICES).get(room_type, room_type)
+    room_type_display = get_room_type_display(room_type)
     
     context = {
         'title': f'تفاصيل {room_type_display} {room_number} - منزل رقم {house.house_number}',
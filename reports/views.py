@@ -14,6 +14,7 @@ import calendar
 # Import models from tasks app
 try:
     from tasks.models import Task, MonthlyGoal
+    from tasks.services.task_stats import TaskStatsService
 except ImportError:
     Task = None
     MonthlyGoal = None
@@ -55,6 +56,7 @@ import calendar
 # Import models from tasks app
 try:
     from tasks.models import Task, MonthlyGoal
+    from tasks.services.task_stats import TaskStatsService
 except ImportError:
     Task = None
     MonthlyGoal = None
@@ -182,13 +184,22 @@ def monthly_report_view(request):
             year=year
         )
     
-    # حساب الإحصائيات الشاملة
-    total_all_related = len(all_related_tasks)
-    total_created = len(tasks_created)
-    total_assigned_to_me = len(tasks_assigned_to_me)
-    total_completed = len(tasks_completed)
-    total_overdue = len(overdue_tasks)
-    total_assigned_to_others = len(tasks_assigned_to_others)
+    # حساب الإحصائيات الشاملة (استعلام تجميعي واحد بدلاً من تحميل جميع القوائم)
+    if Task:
+        month_counters = TaskStatsService(employee, request=request).get_month_counters(first_day, last_day)
+        total_all_related = month_counters['total_all_related']
+        total_created = month_counters['total_created']
+        total_assigned_to_me = month_counters['total_assigned_to_me']
+        total_completed = month_counters['total_completed']
+        total_overdue = month_counters['total_overdue']
+        total_assigned_to_others = month_counters['total_assigned_to_others']
+    else:
+        total_all_related = 0
+        total_created = 0
+        total_assigned_to_me = 0
+        total_completed = 0
+        total_overdue = 0
+        total_assigned_to_others = 0
     
     completion_rate = (total_completed / total_all_related * 100) if total_all_related > 0 else 0
     
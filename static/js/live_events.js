@@ -0,0 +1,68 @@
+// Live updates over Server-Sent Events (dashboard, my tasks)
+// The server pushes task-assigned, task-completed, task-status and task-deadline
+// events; EventSource reconnects by itself after network errors.
+const LiveEvents = {
+    source: null,
+
+    connect(url, handlers) {
+        if (!window.EventSource || this.source) {
+            return this.source;
+        }
+        this.source = new EventSource(url);
+        Object.entries(handlers).forEach(([eventType, handler]) => {
+            this.source.addEventListener(eventType, (e) => {
+                try {
+                    handler(JSON.parse(e.data));
+                } catch (error) {
+                    console.error('Live event handling failed:', eventType, error);
+                }
+            });
+        });
+        window.addEventListener('beforeunload', () => this.close());
+        return this.source;
+    },
+
+    close() {
+        if (this.source) {
+            this.source.close();
+            this.source = null;
+        }
+    },
+
+    // Add delta to a counter marked with data-live-counter="<name>"
+    adjustCounter(name, delta) {
+        document.querySelectorAll(`[data-live-counter="${name}"]`).forEach((element) => {
+            const value = parseInt(element.textContent, 10);
+            if (!isNaN(value)) {
+                element.textContent = Math.max(0, value + delta);
+            }
+        });
+    },
+
+    // Apply a task-status event to the page: a finished task leaves the open
+    // lists and the counters move; a reopened task is not on the page, so reload
+    applyTaskStatus(data, cardSelector) {
+        if (data.status !== 'finished') {
+            this.reloadSoon();
+            return;
+        }
+        document.querySelectorAll(cardSelector).forEach((card) => {
+            card.style.transition = 'opacity 0.3s';
+            card.style.opacity = '0';
+            setTimeout(() => card.remove(), 300);
+        });
+        this.adjustCounter('pending', -1);
+        this.adjustCounter('completed_today', 1);
+        if (data.past_due) {
+            this.adjustCounter('overdue', -1);
+        }
+    },
+
+    // Reload the page once a burst of events is over
+    reloadSoon(delay = 1500) {
+        clearTimeout(this._reloadTimer);
+        this._reloadTimer = setTimeout(() => window.location.reload(), delay);
+    }
+};
+
+window.LiveEvents = LiveEvents;
@@ -3,7 +3,11 @@ from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 from django.contrib.auth import get_user_model
-from .models import Project
+from .models import Project, Task
+from .notification_models import EmailNotificationLog
+from .pagination import EstimatedCountPaginator
+from .exports import PROJECT_EXPORT, TASK_EXPORT, export_response
+from .services.task_counters import set_tasks_status
 
 Employee = get_user_model()
 
@@ -87,7 +91,8 @@ class ProjectAdmin(admin.ModelAdmin):
         'mark_as_finished',
         'assign_to_team',
         'set_primary_employee',
-        'export_projects'
+        'export_projects',
+        'export_projects_xlsx'
     ]
     
     def status_display(self, obj):
@@ -314,54 +319,14 @@ class ProjectAdmin(admin.ModelAdmin):
     set_primary_employee.short_description = 'تحديد قائد الفريق'
     
     def export_projects(self, request, queryset):
-        """Export selected projects to CSV"""
-        import csv
-        from django.http import HttpResponse
-        from datetime import datetime
-        
-        response = HttpResponse(content_type='text/csv; charset=utf-8')
-        response['Content-Disposition'] = f'attachment; filename="projects_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-        
-        # Add BOM for proper Arabic display in Excel
-        response.write('\ufeff')
-        
-        writer = csv.writer(response)
-        
-        # Write header
-        writer.writerow([
-            'اسم المشروع',
-            'الوصف',
-            'الحالة',
-            'عدد أعضاء الفريق',
-            'فريق العمل',
-            'القائد',
-            'تاريخ الانتهاء',
-            'منشئ المشروع',
-            'تاريخ الإنشاء',
-            'التقدم (%)',
-            'متأخر؟'
-        ])
-        
-        # Write data
-        for project in queryset:
-            team_members = ', '.join([emp.name for emp in project.assigned_employees.all()])
-            primary_employee = project.primary_assigned_employee.name if project.primary_assigned_employee else 'غير محدد'
-            
-            writer.writerow([
-                project.name,
-                project.description,
-                project.get_status_display_arabic(),
-                project.assigned_employees_count,
-                team_members or 'لا يوجد فريق',
-                primary_employee,
-                project.due_date.strftime('%Y-%m-%d') if project.due_date else 'غير محدد',
-                project.created_by.name,
-                project.created_at.strftime('%Y-%m-%d %H:%M'),
-                project.progress_percentage(),
-                'نعم' if project.is_overdue() else 'لا'
-            ])
-        
-        return response
+        """Export selected projects to CSV (streamed)"""
+        return export_response(PROJECT_EXPORT, queryset, 'csv')
+    
+    def export_projects_xlsx(self, request, queryset):
+        """Export selected projects to Excel (streamed)"""
+        return export_response(PROJECT_EXPORT, queryset, 'xlsx')
+    export_projects_xlsx.short_description = 'تصدير المشاريع المحددة إلى Excel'
+    
     export_projects.short_description = 'تصدير المشاريع المحددة إلى CSV'
     
     def get_queryset(self, request):
@@ -475,4 +440,72 @@ class ProjectAdmin(admin.ModelAdmin):
         css = {
             'all': ('admin/css/project_admin.css',)
         }
-        js = ('admin/js/project_admin.js',)
\ No newline at end of file
+        js = ('admin/js/project_admin.js',)
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    """
+    Admin interface for Task model.
+    Bulk status actions go through set_tasks_status so the TaskCounter rollup stays in sync
+    and the tasks get the same notifications and feed items as when saved one by one.
+    """
+    
+    list_display = ('name', 'project', 'assigned_to', 'created_by', 'status', 'due_date', 'created_at')
+    list_filter = ('status', 'due_date', 'created_at')
+    search_fields = ('name', 'detail', 'assigned_to__name', 'created_by__name', 'project__name')
+    ordering = ('-created_at',)
+    list_per_page = 25
+    raw_id_fields = ('project', 'assigned_to', 'created_by')
+    readonly_fields = ('created_at', 'updated_at')
+    list_select_related = ('project', 'assigned_to', 'created_by')
+    
+    actions = ['mark_as_new', 'mark_as_finished', 'export_tasks', 'export_tasks_xlsx']
+    
+    def mark_as_new(self, request, queryset):
+        """Mark selected tasks as new"""
+        updated = set_tasks_status(queryset, 'new', changed_by_id=request.user.pk)
+        self.message_user(
+            request,
+            f'تم تحديث حالة {updated} مهمة إلى "جديد".'
+        )
+    mark_as_new.short_description = 'تحديد كـ "جديد"'
+    
+    def mark_as_finished(self, request, queryset):
+        """Mark selected tasks as finished"""
+        updated = set_tasks_status(queryset, 'finished', changed_by_id=request.user.pk)
+        self.message_user(
+            request,
+            f'تم تحديث حالة {updated} مهمة إلى "مكتمل".'
+        )
+    mark_as_finished.short_description = 'تحديد كـ "مكتمل"'
+    
+    def export_tasks(self, request, queryset):
+        """Export selected tasks to CSV (streamed)"""
+        return export_response(TASK_EXPORT, queryset, 'csv')
+    export_tasks.short_description = 'تصدير المهام المحددة إلى CSV'
+    
+    def export_tasks_xlsx(self, request, queryset):
+        """Export selected tasks to Excel (streamed)"""
+        return export_response(TASK_EXPORT, queryset, 'xlsx')
+    export_tasks_xlsx.short_description = 'تصدير المهام المحددة إلى Excel'
+
+
+@admin.register(EmailNotificationLog)
+class EmailNotificationLogAdmin(admin.ModelAdmin):
+    """
+    Admin interface for the email notification log.
+    The log grows without bound, so the unfiltered total comes from the planner
+    statistics instead of COUNT(*) and the list is ordered by (created_at, id).
+    """
+    
+    list_display = ('subject', 'recipient', 'notification_type', 'status', 'created_at', 'sent_at')
+    list_filter = ('status', 'notification_type')
+    search_fields = ('subject', 'recipient__name', 'recipient__email')
+    ordering = ('-created_at', '-id')
+    list_per_page = 50
+    list_select_related = ('recipient',)
+    raw_id_fields = ('recipient', 'sender', 'task', 'project')
+    readonly_fields = ('created_at', 'sent_at')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -44,20 +44,22 @@ def send_task_deadline_reminders():
     
     total_sent = 0
     
-    # إرسال تذكير للمهام التي تنتهي بعد 3 أيام
-    for task in tasks_3_days:
-        if send_deadline_reminder(task, days_remaining=3):
-            total_sent += 1
-    
-    # إرسال تذكير للمهام التي تنتهي غداً
-    for task in tasks_1_day:
-        if send_deadline_reminder(task, days_remaining=1):
-            total_sent += 1
-    
-    # إرسال تذكير للمهام المستحقة اليوم
-    for task in tasks_due_today:
-        if send_deadline_reminder(task, days_remaining=0):
-            total_sent += 1
+    # اتصال SMTP واحد لجميع التذكيرات
+    with notification_service.batch():
+        # إرسال تذكير للمهام التي تنتهي بعد 3 أيام
+        for task in tasks_3_days:
+            if send_deadline_reminder(task, days_remaining=3):
+                total_sent += 1
+        
+        # إرسال تذكير للمهام التي تنتهي غداً
+        for task in tasks_1_day:
+            if send_deadline_reminder(task, days_remaining=1):
+                total_sent += 1
+        
+        # إرسال تذكير للمهام المستحقة اليوم
+        for task in tasks_due_today:
+            if send_deadline_reminder(task, days_remaining=0):
+                total_sent += 1
     
     logger.info(f"تم إرسال {total_sent} تذكير لمواعيد انتهاء المهام")
     return total_sent
@@ -84,8 +86,8 @@ def send_deadline_reminder(task, days_remaining):
     for recipient in recipients:
         try:
             # التحقق من تفضيلات الإشعارات
-            from .notification_models import NotificationPreference
-            preferences = NotificationPreference.get_or_create_for_user(recipient)
+            from .services.preference_store import get_preference_store
+            preferences = get_preference_store().get(recipient)
             
             if not preferences.email_notifications_enabled or not preferences.task_deadline_reminders:
                 continue
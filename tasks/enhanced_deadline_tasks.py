@@ -15,59 +15,17 @@ logger = logging.getLogger('notifications')
 def send_enhanced_deadline_reminders():
     """
     إرسال تذكيرات محسّنة للمهام قريبة الانتهاء مع تتبع التكرار
-    """
-    from .models import Task
-    from .notification_models import TaskReminderTracker, NotificationPreference
-    from .services.notification_service import get_notification_service
-    
-    notification_service = get_notification_service()
-    today = timezone.now().date()
-    
-    # احصائيات الإرسال
-    stats = {
-        'total_tasks_checked': 0,
-        'reminders_sent': 0,
-        'reminders_skipped': 0,
-        'errors': 0
-    }
     
-    # المهام النشطة التي لها تاريخ انتهاء
-    active_tasks = Task.objects.filter(
-        status__in=['new', 'in_progress'],
-        due_date__isnull=False
-    ).select_related('created_by', 'assigned_to', 'project')
-    
-    stats['total_tasks_checked'] = active_tasks.count()
-    
-    for task in active_tasks:
-        try:
-            days_remaining = (task.due_date - today).days
-            
-            # تحديد نوع التذكير المطلوب
-            reminder_type = None
-            if days_remaining == 3:
-                reminder_type = 'three_days'
-            elif days_remaining == 1:
-                reminder_type = 'one_day'
-            elif days_remaining == 0:
-                reminder_type = 'same_day'
-            
-            if reminder_type:
-                # إرسال تذكيرات لمنشئ المهمة والمُسند إليه
-                recipients = get_task_recipients(task)
-                
-                for recipient in recipients:
-                    if send_deadline_reminder_to_user(task, recipient, reminder_type, days_remaining):
-                        stats['reminders_sent'] += 1
-                    else:
-                        stats['reminders_skipped'] += 1
-                        
-        except Exception as e:
-            logger.error(f"خطأ في معالجة المهمة {task.id}: {str(e)}")
-            stats['errors'] += 1
+    تُحدَّد المهام المستحقة اليوم أو غداً أو بعد 3 أيام في الاستعلام نفسه،
+    وتُحمَّل التفضيلات والمتتبعات دفعة واحدة، ثم تُحفظ النتائج عبر bulk_update/bulk_create
+    """
+    from .services.deadline_reminders import DeadlineReminderPlanner
     
-    logger.info(f"إحصائيات تذكيرات المواعيد: {stats}")
-    return stats
+    try:
+        return DeadlineReminderPlanner().run()
+    except Exception as e:
+        logger.error(f"خطأ في إرسال تذكيرات المواعيد: {str(e)}")
+        return {'error': str(e)}
 
 def get_task_recipients(task):
     """
@@ -89,12 +47,13 @@ def send_deadline_reminder_to_user(task, user, reminder_type, days_remaining):
     """
     إرسال تذكير مواعيد انتهاء مهمة لمستخدم محدد
     """
-    from .notification_models import TaskReminderTracker, NotificationPreference
+    from .notification_models import TaskReminderTracker
     from .services.notification_service import get_notification_service
+    from .services.preference_store import get_preference_store
     
     try:
         # فحص تفضيلات المستخدم
-        preferences = NotificationPreference.get_or_create_for_user(user)
+        preferences = get_preference_store().get(user)
         
         if not preferences.should_send_deadline_reminder(days_remaining):
             logger.debug(f"تذكير {reminder_type} معطل للمستخدم {user.email}")
@@ -640,7 +599,7 @@ def send_high_priority_reminders():
     إرسال تذكيرات إضافية للمهام عالية الأولوية
     """
     from .models import Task
-    from .notification_models import NotificationPreference
+    from .services.preference_store import get_preference_store
     
     today = timezone.now().date()
     
@@ -659,7 +618,7 @@ def send_high_priority_reminders():
         
         for recipient in recipients:
             # فحص تفضيلات المستخدم للمهام عالية الأولوية
-            preferences = NotificationPreference.get_or_create_for_user(recipient)
+            preferences = get_preference_store().get(recipient)
             
             if preferences.high_priority_task_reminders and preferences.email_notifications_enabled:
                 days_remaining = (task.due_date - today).days
@@ -0,0 +1,339 @@
+# tasks/exports.py
+# Streaming CSV/XLSX exports of projects, employees and tasks: rows are read
+# with iterator(chunk_size) and written out chunk by chunk, so memory stays
+# flat however many rows are exported
+
+import csv
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+# Rows fetched (and related objects prefetched) per database round trip
+EXPORT_CHUNK_SIZE = 2000
+
+# Bytes buffered before a chunk is handed to the response
+STREAM_BUFFER_SIZE = 64 * 1024
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+EXPORT_FORMATS = tuple(CONTENT_TYPES)
+
+# Control characters that are not allowed in XML
+ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _date(value):
+    return value.strftime('%Y-%m-%d') if value else 'غير محدد'
+
+
+def _datetime(value):
+    return timezone.localtime(value).strftime('%Y-%m-%d %H:%M') if value else ''
+
+
+def _yes_no(value):
+    return 'نعم' if value else 'لا'
+
+
+class Export:
+    """
+    Definition of an export: the columns (header, value function) and the
+    related objects each row needs, loaded per chunk instead of per row
+    """
+
+    def __init__(self, name, title, columns, select_related=(), prefetch_related=(), ordering=('pk',)):
+        self.name = name
+        self.title = title
+        self.columns = columns
+        self.select_related = select_related
+        self.prefetch_related = prefetch_related
+        self.ordering = ordering
+
+    @property
+    def headers(self):
+        return [header for header, _ in self.columns]
+
+    def prepare(self, queryset):
+        """
+        The queryset with the export's own related loading, replacing any
+        prefetches of the caller (e.g. an admin changelist)
+        """
+        queryset = queryset.prefetch_related(None)
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if not queryset.ordered:
+            queryset = queryset.order_by(*self.ordering)
+        return queryset
+
+    def iter_rows(self, queryset, chunk_size=EXPORT_CHUNK_SIZE):
+        for obj in self.prepare(queryset).iterator(chunk_size=chunk_size):
+            yield [value(obj) for _, value in self.columns]
+
+    def get_filename(self, file_format):
+        return f'{self.name}_{timezone.localtime().strftime("%Y%m%d_%H%M%S")}.{file_format}'
+
+
+PROJECT_EXPORT = Export(
+    name='projects',
+    title='المشاريع',
+    columns=[
+        ('اسم المشروع', lambda p: p.name),
+        ('الوصف', lambda p: p.description),
+        ('الحالة', lambda p: p.get_status_display_arabic()),
+        # assigned_employees is prefetched, so count() and all() do not query
+        ('عدد أعضاء الفريق', lambda p: p.assigned_employees_count),
+        ('فريق العمل', lambda p: ', '.join(emp.name for emp in p.assigned_employees.all()) or 'لا يوجد فريق'),
+        ('القائد', lambda p: p.primary_assigned_employee.name if p.primary_assigned_employee else 'غير محدد'),
+        ('تاريخ الانتهاء', lambda p: _date(p.due_date)),
+        ('منشئ المشروع', lambda p: p.created_by.name),
+        ('تاريخ الإنشاء', lambda p: _datetime(p.created_at)),
+        ('التقدم (%)', lambda p: p.progress_percentage()),
+        ('متأخر؟', lambda p: _yes_no(p.is_overdue())),
+    ],
+    select_related=('primary_assigned_employee', 'created_by'),
+    prefetch_related=('assigned_employees',),
+)
+
+EMPLOYEE_EXPORT = Export(
+    name='employees',
+    title='الموظفين',
+    columns=[
+        ('الاسم الكامل', lambda e: e.name),
+        ('اسم المستخدم', lambda e: e.username),
+        ('الرقم الوظيفي', lambda e: e.job_number),
+        ('المسمى الوظيفي', lambda e: e.job_title),
+        ('القسم', lambda e: e.get_section_display_arabic()),
+        ('البريد الإلكتروني', lambda e: e.email),
+        ('رقم الجوال', lambda e: e.mobile_number),
+        ('تاريخ التوظيف', lambda e: _date(e.date_joined)),
+        ('الحالة', lambda e: 'نشط' if e.is_active_employee else 'غير نشط'),
+        ('تاريخ آخر دخول', lambda e: _datetime(e.last_login) or 'لم يدخل'),
+    ],
+    ordering=('name', 'pk'),
+)
+
+TASK_EXPORT = Export(
+    name='tasks',
+    title='المهام',
+    columns=[
+        ('اسم المهمة', lambda t: t.name),
+        ('تفاصيل المهمة', lambda t: t.detail),
+        ('المشروع', lambda t: t.project.name if t.project else 'بدون مشروع'),
+        ('الحالة', lambda t: t.get_status_display_arabic()),
+        ('مُعيّن إلى', lambda t: t.assigned_to.name if t.assigned_to else 'غير معين'),
+        ('منشئ المهمة', lambda t: t.created_by.name),
+        ('تاريخ الانتهاء', lambda t: _date(t.due_date)),
+        ('تاريخ الإنشاء', lambda t: _datetime(t.created_at)),
+        ('آخر تحديث', lambda t: _datetime(t.updated_at)),
+        ('متأخرة؟', lambda t: _yes_no(t.is_overdue())),
+    ],
+    select_related=('project', 'assigned_to', 'created_by'),
+    ordering=('-created_at', '-pk'),
+)
+
+EXPORTS = {export.name: export for export in (PROJECT_EXPORT, EMPLOYEE_EXPORT, TASK_EXPORT)}
+
+
+def iter_csv(headers, rows):
+    """
+    CSV as UTF-8 byte chunks, starting with a BOM so Excel shows Arabic correctly
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(headers)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= STREAM_BUFFER_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+class _StreamBuffer:
+    """
+    Write-only file for ZipFile; without tell() the archive is written as a
+    stream (data descriptors after each member), drained as it grows
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        self.size = 0
+        return data
+
+
+XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# Style 1 is the bold header row
+XLSX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '</styleSheet>'
+)
+
+XLSX_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetViews><sheetView workbookViewId="0" rightToLeft="1">'
+    '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+    '</sheetView></sheetViews>'
+    '<sheetData>'
+)
+
+XLSX_SHEET_END = '</sheetData></worksheet>'
+
+
+def _column_letter(index):
+    """
+    Spreadsheet column name of a zero-based index (0 -> A, 26 -> AA)
+    """
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_row(number, values, letters, style=None):
+    style_attr = f' s="{style}"' if style else ''
+    cells = []
+    for letter, value in zip(letters, values):
+        ref = f'{letter}{number}'
+        if value is None or value == '':
+            continue
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f'<c r="{ref}"{style_attr}><v>{value}</v></c>')
+        else:
+            text = escape(ILLEGAL_XML_CHARS.sub('', str(value)))
+            cells.append(
+                f'<c r="{ref}" t="inlineStr"{style_attr}><is><t xml:space="preserve">{text}</t></is></c>'
+            )
+    return f'<row r="{number}">{"".join(cells)}</row>'
+
+
+def iter_xlsx(headers, rows, sheet_name='Sheet1'):
+    """
+    A single-sheet XLSX workbook as byte chunks. Strings are written inline
+    (no shared strings table) and the zip is streamed, so nothing grows with
+    the number of rows.
+    """
+    letters = [_column_letter(i) for i in range(len(headers))]
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', XLSX_CONTENT_TYPES)
+        archive.writestr('_rels/.rels', XLSX_ROOT_RELS)
+        archive.writestr('xl/workbook.xml', XLSX_WORKBOOK.format(name=escape(sheet_name[:31], {'"': '&quot;'})))
+        archive.writestr('xl/_rels/workbook.xml.rels', XLSX_WORKBOOK_RELS)
+        archive.writestr('xl/styles.xml', XLSX_STYLES)
+        yield buffer.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(XLSX_SHEET_START.encode('utf-8'))
+            sheet.write(_xlsx_row(1, headers, letters, style=1).encode('utf-8'))
+            for number, row in enumerate(rows, start=2):
+                sheet.write(_xlsx_row(number, row, letters).encode('utf-8'))
+                if buffer.size >= STREAM_BUFFER_SIZE:
+                    yield buffer.drain()
+            sheet.write(XLSX_SHEET_END.encode('utf-8'))
+    yield buffer.drain()
+
+
+def iter_export(export, queryset, file_format='csv', chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Byte chunks of an export of a queryset in the given format ('csv' or 'xlsx')
+    """
+    if isinstance(export, str):
+        export = EXPORTS[export]
+    rows = export.iter_rows(queryset, chunk_size=chunk_size)
+    if file_format == 'xlsx':
+        return iter_xlsx(export.headers, rows, sheet_name=export.title)
+    if file_format == 'csv':
+        return iter_csv(export.headers, rows)
+    raise ValueError(f'Unsupported export format: {file_format}')
+
+
+def export_response(export, queryset, file_format='csv', chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    StreamingHttpResponse downloading an export; for admin actions and views
+    """
+    if isinstance(export, str):
+        export = EXPORTS[export]
+    response = StreamingHttpResponse(
+        iter_export(export, queryset, file_format, chunk_size),
+        content_type=CONTENT_TYPES[file_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export.get_filename(file_format)}"'
+    return response
+
+
+def write_export(export, queryset, output, file_format='csv', chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Write an export to a binary file object, returns the number of bytes written
+    """
+    written = 0
+    for chunk in iter_export(export, queryset, file_format, chunk_size):
+        output.write(chunk)
+        written += len(chunk)
+    return written
@@ -0,0 +1,103 @@
+import time
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.template.loader import render_to_string
+from tasks.models import Task, Project
+from tasks.services.email_renderer import get_email_renderer
+from tasks.enhanced_deadline_tasks import create_deadline_content
+
+Employee = get_user_model()
+
+TEMPLATES = (
+    'task_assigned.html', 'task_assigned.txt',
+    'task_completed.html', 'task_completed.txt',
+    'task_overdue.html', 'task_overdue.txt',
+    'daily_digest.html', 'daily_digest.txt',
+)
+
+class Command(BaseCommand):
+    help = 'Measure email rendering throughput (single core, no database access)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=2000,
+            help='Emails rendered per template (default: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        count = options['count']
+        renderer = get_email_renderer()
+        renderer.clear()
+
+        for template_name in TEMPLATES:
+            contexts = [self._build_context(i) for i in range(count)]
+
+            # Same output as a full render_to_string
+            if renderer.render(template_name, contexts[0]) != render_to_string(f'emails/{template_name}', contexts[0]):
+                self.stdout.write(self.style.ERROR(f"{template_name}: output differs from render_to_string"))
+
+            baseline = self._measure(lambda context: render_to_string(f'emails/{template_name}', context), contexts)
+            optimized = self._measure(lambda context: renderer.render(template_name, context), contexts)
+            self.stdout.write(
+                f"{template_name:22} render_to_string: {baseline:8.0f}/s   "
+                f"renderer: {optimized:8.0f}/s   (x{optimized / baseline:.1f})"
+            )
+
+        contexts = [self._build_context(i) for i in range(count)]
+        for reminder_type, days_remaining in (('three_days', 3), ('one_day', 1), ('same_day', 0)):
+            rate = self._measure(
+                lambda context: create_deadline_content(reminder_type, context, days_remaining),
+                contexts
+            )
+            self.stdout.write(f"{'deadline ' + reminder_type:22} f-string builder: {rate:8.0f}/s")
+
+    def _measure(self, render, contexts):
+        started = time.perf_counter()
+        for context in contexts:
+            render(context)
+        elapsed = time.perf_counter() - started
+        return len(contexts) / elapsed if elapsed else 0
+
+    def _build_context(self, i):
+        notification_settings = getattr(settings, 'NOTIFICATION_SETTINGS', {})
+        user = Employee(name=f'موظف {i}', email=f'user{i}@example.com')
+        project = Project(name='مشروع تجريبي')
+        task = Task(
+            pk=i + 1,
+            name=f'مهمة تجريبية رقم {i}',
+            detail='تفاصيل المهمة ' * 10,
+            due_date=date.today() + timedelta(days=1),
+            project=project,
+            created_by=user,
+            assigned_to=user,
+        )
+        tasks = [task] * 5
+        return {
+            'task': task,
+            'user': user,
+            'recipient': user,
+            'site_name': notification_settings.get('SITE_NAME', 'نظام إدارة جمعية إعمار'),
+            'site_url': notification_settings.get('SITE_URL', ''),
+            'support_email': notification_settings.get('SUPPORT_EMAIL'),
+            'task_url': f"/tasks/{task.pk}/",
+            'task_name': task.name,
+            'user_name': user.name,
+            'assigner_name': user.name,
+            'completer_name': user.name,
+            'completion_date': date.today().strftime('%Y-%m-%d'),
+            'due_date': task.due_date.strftime('%Y-%m-%d'),
+            'due_date_formatted': task.due_date.strftime('%Y-%m-%d'),
+            'days_overdue': 2,
+            'days_remaining': 1,
+            'urgency_level': 'عاجل',
+            'project_name': project.name,
+            'today': date.today().strftime('%Y-%m-%d'),
+            'assigned_tasks': tasks,
+            'created_tasks': tasks,
+            'overdue_tasks': tasks,
+            'due_today_tasks': tasks,
+        }
@@ -2,9 +2,8 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta
-from tasks.models import Task
-from tasks.services.notification_service import get_notification_service
-from tasks.notification_models import EmailNotificationLog
+from tasks.services.notification_service import NOTIFICATION_SKIPPED, get_notification_service
+from tasks.services.overdue_notifications import get_overdue_tasks_to_notify
 
 class Command(BaseCommand):
     help = 'Check for overdue tasks and send notifications'
@@ -33,47 +32,40 @@ class Command(BaseCommand):
         # Calculate cutoff date
         cutoff_date = timezone.now().date() - timedelta(days=options['days_overdue'])
         
-        # Get overdue tasks
-        overdue_tasks = Task.objects.filter(
-            status='new',
-            due_date__lt=cutoff_date
-        ).select_related('created_by', 'assigned_to')
+        # Get overdue tasks; recently notified ones are excluded in the same query
+        # (NOT EXISTS) unless forced
+        overdue_tasks = get_overdue_tasks_to_notify(
+            cutoff_date=cutoff_date,
+            force=options['force']
+        ).select_related('project', 'created_by', 'assigned_to')
         
-        self.stdout.write(f"Found {overdue_tasks.count()} overdue tasks")
+        self.stdout.write(f"Found {overdue_tasks.count()} overdue tasks to notify")
         
         notifications_sent = 0
         notifications_skipped = 0
+        notifications_failed = 0
+        today = timezone.now().date()
         
-        for task in overdue_tasks:
-            task_name = task.name[:50] + "..." if len(task.name) > 50 else task.name
-            days_overdue = (timezone.now().date() - task.due_date).days
-            
-            # Check if we've already sent notification recently (unless forced)
-            if not options['force']:
-                yesterday = timezone.now() - timedelta(hours=24)
-                recent_notification = EmailNotificationLog.objects.filter(
-                    task=task,
-                    notification_type='task_overdue',
-                    created_at__gte=yesterday,
-                    status='sent'
-                ).exists()
+        # One pooled SMTP connection for the whole run
+        with notification_service.batch():
+            for task in overdue_tasks:
+                task_name = task.name[:50] + "..." if len(task.name) > 50 else task.name
+                days_overdue = (today - task.due_date).days
                 
-                if recent_notification:
-                    notifications_skipped += 1
-                    self.stdout.write(f"- Skipped {task_name} (recently notified)")
-                    continue
-            
-            if options['dry_run']:
-                self.stdout.write(f"Would notify for: {task_name} ({days_overdue} days overdue)")
-                notifications_sent += 1
-            else:
-                result = notification_service.send_task_overdue_notification(task)
-                if result:
+                if options['dry_run']:
+                    self.stdout.write(f"Would notify for: {task_name} ({days_overdue} days overdue)")
                     notifications_sent += 1
-                    self.stdout.write(f"✓ Notified for: {task_name} ({days_overdue} days overdue)")
                 else:
-                    notifications_skipped += 1
-                    self.stdout.write(f"✗ Failed to notify for: {task_name}")
+                    result = notification_service.send_task_overdue_notification(task)
+                    if result == NOTIFICATION_SKIPPED:
+                        notifications_skipped += 1
+                        self.stdout.write(f"- Skipped (notifications off): {task_name}")
+                    elif result:
+                        notifications_sent += 1
+                        self.stdout.write(f"✓ Notified for: {task_name} ({days_overdue} days overdue)")
+                    else:
+                        notifications_failed += 1
+                        self.stdout.write(f"✗ Failed to notify for: {task_name}")
         
         if options['dry_run']:
             self.stdout.write(
@@ -82,6 +74,7 @@ class Command(BaseCommand):
         else:
             self.stdout.write(
                 self.style.SUCCESS(
-                    f"Overdue check complete. Sent: {notifications_sent}, Skipped: {notifications_skipped}"
+                    f"Overdue check complete. Sent: {notifications_sent}, Skipped: {notifications_skipped}, "
+                    f"Failed: {notifications_failed}"
                 )
             )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from tasks.services.dashboard_snapshot import get_snapshot_metrics, reset_snapshot_metrics
+
+class Command(BaseCommand):
+    help = 'Show the hit rate of the per-user dashboard snapshot cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Reset the hit/miss counters after showing them',
+        )
+
+    def handle(self, *args, **options):
+        metrics = get_snapshot_metrics()
+        self.stdout.write(f"Hits:     {metrics['hits']}")
+        self.stdout.write(f"Misses:   {metrics['misses']}")
+        self.stdout.write(f"Hit rate: {metrics['hit_rate']:.1f}%")
+
+        if options['reset']:
+            reset_snapshot_metrics()
+            self.stdout.write(self.style.SUCCESS('✓ Counters reset'))
@@ -0,0 +1,140 @@
+import re
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from tasks.models import Task, Project
+from tasks.notification_models import ActivityFeedItem
+from tasks.pagination import KeysetPaginator
+from tasks.services.activity_feed import FEED_PAGE_SIZE
+from tasks.services.dashboard_snapshot import DASHBOARD_TASK_LIMIT
+
+Employee = get_user_model()
+
+def get_hot_queries(user, today):
+    """
+    Catalog of the hot Task/Project/activity feed query shapes used by
+    tasks.views, employees.views, dashboard.views (snapshot and feed),
+    reports.views and the Celery jobs: (label, queryset)
+    """
+    first_day = today.replace(day=1)
+    user_tasks = Q(created_by=user) | Q(assigned_to=user)
+    now = timezone.now()
+
+    finished_pages = KeysetPaginator(
+        Task.objects.filter(user_tasks, status='finished'), 15, ordering=('-updated_at', '-pk')
+    )
+    project_pages = KeysetPaginator(Project.objects.all(), 12)
+
+    return [
+        ('tasks.my_tasks: my unassigned tasks', Task.objects.filter(
+            created_by=user, assigned_to__isnull=True, status='new'
+        )),
+        ('tasks.my_tasks: assigned to me', Task.objects.filter(
+            assigned_to=user, status='new'
+        )),
+        ('tasks.my_tasks: assigned by me', Task.objects.filter(
+            created_by=user, assigned_to__isnull=False, status='new'
+        )),
+        ('tasks.finished_tasks: first page', finished_pages.get_page_queryset()),
+        ('tasks.finished_tasks: page after a cursor', finished_pages.get_page_queryset([now, 0])),
+        ('tasks.employee_tasks_detail: pending assigned', Task.objects.filter(
+            assigned_to=user, status='new'
+        ).order_by('-created_at')),
+        ('employees.index: overdue counts of the page', Task.objects.filter(
+            status='new', due_date__lt=today
+        ).filter(
+            Q(created_by_id__in=[user.pk]) | Q(assigned_to_id__in=[user.pk])
+        ).order_by().values('created_by_id', 'assigned_to_id').annotate(overdue=Count('pk'))),
+        ('dashboard snapshot: my open tasks', Task.objects.filter(
+            user_tasks, status='new'
+        ).order_by('due_date', '-created_at')[:DASHBOARD_TASK_LIMIT]),
+        ('dashboard snapshot: task counters', Task.objects.involving(user)),
+        ('dashboard feed: latest item (ETag)', ActivityFeedItem.objects.filter(
+            recipient=user
+        ).order_by('-id').values_list('id', flat=True)[:1]),
+        ('dashboard feed: items after the cursor', ActivityFeedItem.objects.filter(
+            recipient=user, id__gt=0
+        ).order_by('-id')[:FEED_PAGE_SIZE]),
+        ('reports: tasks created this month', Task.objects.filter(
+            created_by=user, created_at__date__gte=first_day, created_at__date__lte=today
+        ).order_by('created_at')),
+        ('reports: tasks completed this month', Task.objects.filter(
+            user_tasks, status='finished', updated_at__date__gte=first_day, updated_at__date__lte=today
+        ).order_by('updated_at')),
+        ('celery: overdue tasks', Task.objects.filter(
+            status='new', due_date__lt=today
+        ).values_list('pk', flat=True)),
+        ('celery: deadline reminders', Task.objects.filter(
+            status='new', due_date__in=[today, today + timedelta(days=1), today + timedelta(days=3)]
+        )),
+        ('projects: first page', project_pages.get_page_queryset()),
+        ('projects: page after a cursor', project_pages.get_page_queryset([now, 0])),
+        ('projects: overdue', Project.objects.filter(
+            status__in=['new', 'in_progress'], due_date__lt=today
+        )),
+    ]
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN over the hot task/project/activity feed queries and fail if any uses a sequential scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            help='Employee used for per-user queries (default: first employee)',
+        )
+        parser.add_argument(
+            '--show-plans',
+            action='store_true',
+            help='Print the full plan of every query',
+        )
+
+    def handle(self, *args, **options):
+        if options['user_id']:
+            user = Employee.objects.filter(pk=options['user_id']).first()
+        else:
+            user = Employee.objects.order_by('pk').first()
+        if user is None:
+            raise CommandError('No employee found to build the per-user queries')
+
+        tables = [Task._meta.db_table, Project._meta.db_table, ActivityFeedItem._meta.db_table]
+        seq_scan = self._get_seq_scan_pattern(tables)
+        failures = []
+
+        for label, queryset in get_hot_queries(user, timezone.now().date()):
+            plan = self._explain(queryset)
+            if seq_scan.search(plan):
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(f"✗ {label}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"✓ {label}"))
+            if options['show_plans'] or seq_scan.search(plan):
+                self.stdout.write(f"    {plan.replace(chr(10), chr(10) + '    ')}")
+
+        if failures:
+            raise CommandError(f"{len(failures)} hot queries use a sequential scan: {', '.join(failures)}")
+
+        self.stdout.write(self.style.SUCCESS('All hot queries use indexes'))
+
+    def _explain(self, queryset):
+        """
+        EXPLAIN the query; on PostgreSQL sequential scans are disabled for the
+        transaction, so a Seq Scan in the plan means no usable index exists
+        (small tables would otherwise always be scanned)
+        """
+        if connection.vendor != 'postgresql':
+            return queryset.explain()
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
+
+    def _get_seq_scan_pattern(self, tables):
+        names = '|'.join(re.escape(table) for table in tables)
+        if connection.vendor == 'postgresql':
+            return re.compile(rf'Seq Scan on "?({names})"?\b')
+        # SQLite: "SCAN table" without an index (SEARCH/USING INDEX are fine)
+        return re.compile(rf'\bSCAN ({names})\b(?! USING (COVERING )?INDEX)')
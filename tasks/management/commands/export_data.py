@@ -0,0 +1,53 @@
+import sys
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from tasks.models import Task, Project
+from tasks.exports import EXPORTS, EXPORT_FORMATS, EXPORT_CHUNK_SIZE, write_export
+
+Employee = get_user_model()
+
+MODELS = {
+    'tasks': Task,
+    'projects': Project,
+    'employees': Employee,
+}
+
+class Command(BaseCommand):
+    help = 'Export tasks, projects or employees to CSV or Excel, streamed row by row'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'model',
+            choices=sorted(EXPORTS),
+            help='What to export',
+        )
+        parser.add_argument(
+            '--format',
+            choices=EXPORT_FORMATS,
+            default='csv',
+            help='File format (default: csv)',
+        )
+        parser.add_argument(
+            '--output',
+            help='File to write (default: <model>_<timestamp>.<format>, "-" for stdout)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help=f'Rows fetched per query (default: {EXPORT_CHUNK_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        name = options['model']
+        file_format = options['format']
+        queryset = MODELS[name]._default_manager.all()
+
+        output = options['output'] or EXPORTS[name].get_filename(file_format)
+        if output == '-':
+            write_export(name, queryset, sys.stdout.buffer, file_format, options['chunk_size'])
+            return
+
+        with open(output, 'wb') as f:
+            written = write_export(name, queryset, f, file_format, options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"✓ {name} exported to {output} ({written} bytes)"))
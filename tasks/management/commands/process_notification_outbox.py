@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from tasks.notification_models import NotificationOutbox
+from tasks.services.notification_outbox import process_outbox_entries, requeue_stale_outbox_entries
+
+class Command(BaseCommand):
+    help = 'Send pending task notifications from the outbox (for deployments without Celery beat)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show how many notifications are waiting without sending them',
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            pending = NotificationOutbox.objects.filter(status='pending').count()
+            processing = NotificationOutbox.objects.filter(status='processing').count()
+            self.stdout.write(f"Pending: {pending}, processing: {processing}")
+            return
+
+        requeued = requeue_stale_outbox_entries()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Requeued {requeued} stale entries"))
+
+        # Retried entries are rescheduled in the future, so the loop ends once nothing is due
+        total = {}
+        while True:
+            results = process_outbox_entries()
+            if not results:
+                break
+            for status, count in results.items():
+                total[status] = total.get(status, 0) + count
+
+        if not total:
+            self.stdout.write('No pending notifications')
+            return
+
+        summary = ', '.join(f"{status}: {count}" for status, count in sorted(total.items()))
+        self.stdout.write(self.style.SUCCESS(f"Processed outbox notifications ({summary})"))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from tasks.models import Task, Project
+from tasks.search import rebuild_search_index
+
+Employee = get_user_model()
+
+MODELS = {
+    'tasks': Task,
+    'projects': Project,
+    'employees': Employee,
+}
+
+class Command(BaseCommand):
+    help = 'Recompute the search text and search vectors of tasks, projects and employees'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            choices=sorted(MODELS),
+            help='Rebuild only this model (default: all)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rows updated per query (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        names = [options['model']] if options['model'] else list(MODELS)
+        for name in names:
+            updated = rebuild_search_index(MODELS[name], batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"✓ {name}: {updated} rows indexed"))
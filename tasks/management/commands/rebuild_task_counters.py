@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from tasks.services.task_counters import rebuild_task_counters
+
+Employee = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized per-employee task counters and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drift without writing the recomputed counters',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No counters will be written'))
+
+        drift = rebuild_task_counters(dry_run=dry_run)
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Task counters are in sync, no drift found'))
+            return
+
+        names = dict(
+            Employee.objects.filter(pk__in=[entry['employee_id'] for entry in drift]).values_list('pk', 'name')
+        )
+
+        for entry in drift:
+            employee_name = names.get(entry['employee_id'], entry['employee_id'])
+            if entry['missing']:
+                self.stdout.write(f"  {employee_name}: missing counter row")
+            for field, (stored, actual) in entry['changes'].items():
+                self.stdout.write(f"  {employee_name}: {field} {stored} -> {actual}")
+
+        missing_count = sum(1 for entry in drift if entry['missing'])
+        action = 'Would fix' if dry_run else 'Fixed'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{action} counters of {len(drift)} employees ({missing_count} missing rows)"
+            )
+        )
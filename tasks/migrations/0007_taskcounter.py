@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-16 09:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_rename_tasks_email_recipie_48b7e4_idx_tasks_email_recipie_388802_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskCounter',
+            fields=[
+                ('employee', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='task_counter', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='الموظف')),
+                ('total_tasks', models.IntegerField(default=0, verbose_name='إجمالي المهام')),
+                ('created_tasks', models.IntegerField(default=0, verbose_name='المهام المُنشأة')),
+                ('assigned_tasks', models.IntegerField(default=0, verbose_name='المهام المُعيّنة')),
+                ('assigned_to_others', models.IntegerField(default=0, verbose_name='المهام المُعيّنة للآخرين')),
+                ('pending_tasks', models.IntegerField(default=0, verbose_name='المهام المعلقة')),
+                ('completed_tasks', models.IntegerField(default=0, verbose_name='المهام المكتملة')),
+                ('overdue_tasks', models.IntegerField(default=0, verbose_name='المهام المتأخرة')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ آخر تحديث')),
+            ],
+            options={
+                'verbose_name': 'عدادات مهام الموظف',
+                'verbose_name_plural': 'عدادات مهام الموظفين',
+            },
+        ),
+    ]
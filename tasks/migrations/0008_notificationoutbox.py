@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-16 10:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0007_taskcounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_type', models.CharField(choices=[('task_assigned', 'تكليف مهمة'), ('task_completed', 'إنجاز مهمة')], max_length=50, verbose_name='نوع الإشعار')),
+                ('status', models.CharField(choices=[('pending', 'في انتظار الإرسال'), ('processing', 'قيد الإرسال'), ('sent', 'تم الإرسال'), ('skipped', 'لم يُرسل حسب التفضيلات'), ('failed', 'فشل الإرسال')], default='pending', max_length=20, verbose_name='الحالة')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='عدد المحاولات')),
+                ('last_error', models.TextField(blank=True, verbose_name='آخر خطأ')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='موعد المحاولة التالية')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='وقت بدء المعالجة')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='وقت المعالجة')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='outbox_actions', to=settings.AUTH_USER_MODEL, verbose_name='منفذ الإجراء')),
+                ('recipient', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='outbox_notifications', to=settings.AUTH_USER_MODEL, verbose_name='المستلم')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outbox_notifications', to='tasks.task', verbose_name='المهمة')),
+            ],
+            options={
+                'verbose_name': 'إشعار صادر',
+                'verbose_name_plural': 'صندوق الإشعارات الصادرة',
+                'db_table': 'notification_outbox',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='notificatio_status_7f28bd_idx')],
+            },
+        ),
+    ]
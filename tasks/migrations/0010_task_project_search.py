@@ -0,0 +1,78 @@
+# Generated by Django 5.2.4 on 2026-10-16 14:00
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+from tasks.search import build_search_text, create_search_indexes, drop_search_indexes, fill_search_vectors
+
+
+def backfill_search_fields(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    Task = apps.get_model('tasks', 'Task')
+    Project = apps.get_model('tasks', 'Project')
+
+    tasks = list(Task.objects.using(alias).only('pk', 'name', 'detail'))
+    for task in tasks:
+        task.search_text = build_search_text([task.name, task.detail])
+    Task.objects.using(alias).bulk_update(tasks, ['search_text'], batch_size=500)
+
+    projects = list(
+        Project.objects.using(alias)
+        .select_related('created_by', 'primary_assigned_employee')
+        .prefetch_related('assigned_employees')
+    )
+    for project in projects:
+        project.search_text = build_search_text([
+            project.name,
+            project.description,
+            project.created_by.name if project.created_by_id else None,
+            project.primary_assigned_employee.name if project.primary_assigned_employee_id else None,
+            *(employee.name for employee in project.assigned_employees.all()),
+        ])
+    Project.objects.using(alias).bulk_update(projects, ['search_text'], batch_size=500)
+
+    fill_search_vectors(schema_editor, Task)
+    fill_search_vectors(schema_editor, Project)
+
+
+def add_search_indexes(apps, schema_editor):
+    create_search_indexes(schema_editor, 'tasks_task')
+    create_search_indexes(schema_editor, 'tasks_project')
+
+
+def remove_search_indexes(apps, schema_editor):
+    drop_search_indexes(schema_editor, 'tasks_task')
+    drop_search_indexes(schema_editor, 'tasks_project')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0009_task_project_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='project',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='نص البحث'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='فهرس البحث'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='نص البحث'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='فهرس البحث'),
+        ),
+        migrations.RunPython(backfill_search_fields, migrations.RunPython.noop),
+        migrations.RunPython(add_search_indexes, remove_search_indexes),
+    ]
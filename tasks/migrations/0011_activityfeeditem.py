@@ -0,0 +1,85 @@
+# Generated by Django 5.2.4 on 2026-10-16 15:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from datetime import timedelta
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_activity_feed(apps, schema_editor):
+    """
+    Seed the feed with what the dashboard used to compute on the fly: tasks
+    assigned in the last 7 days that are still open, and tasks assigned to
+    others that were completed in the last 3 days
+    """
+    alias = schema_editor.connection.alias
+    Task = apps.get_model('tasks', 'Task')
+    ActivityFeedItem = apps.get_model('tasks', 'ActivityFeedItem')
+    now = django.utils.timezone.now()
+
+    items = []
+    assigned = Task.objects.using(alias).filter(
+        assigned_to__isnull=False,
+        status='new',
+        created_at__gte=now - timedelta(days=7)
+    ).exclude(assigned_to=models.F('created_by'))
+    for task in assigned.order_by('created_at'):
+        items.append(ActivityFeedItem(
+            recipient_id=task.assigned_to_id,
+            activity_type='new-task',
+            task=task,
+            actor_id=task.created_by_id,
+            task_name=task.name,
+            created_at=task.created_at,
+        ))
+
+    completed = Task.objects.using(alias).filter(
+        assigned_to__isnull=False,
+        created_by__isnull=False,
+        status='finished',
+        updated_at__gte=now - timedelta(days=3)
+    ).exclude(assigned_to=models.F('created_by'))
+    for task in completed.order_by('updated_at'):
+        items.append(ActivityFeedItem(
+            recipient_id=task.created_by_id,
+            activity_type='completed-task',
+            task=task,
+            actor_id=task.assigned_to_id,
+            task_name=task.name,
+            created_at=task.updated_at,
+        ))
+
+    items.sort(key=lambda item: item.created_at)
+    ActivityFeedItem.objects.using(alias).bulk_create(items, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0010_task_project_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityFeedItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('activity_type', models.CharField(choices=[('new-task', 'مهمة جديدة مُعيّنة'), ('completed-task', 'تم إكمال مهمة')], max_length=30, verbose_name='نوع النشاط')),
+                ('task_name', models.CharField(max_length=200, verbose_name='اسم المهمة')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='تاريخ الإنشاء')),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='activity_actions', to=settings.AUTH_USER_MODEL, verbose_name='منفذ الإجراء')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_feed', to=settings.AUTH_USER_MODEL, verbose_name='المستلم')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_items', to='tasks.task', verbose_name='المهمة')),
+            ],
+            options={
+                'verbose_name': 'عنصر موجز النشاط',
+                'verbose_name_plural': 'موجز النشاط',
+                'db_table': 'activity_feed_items',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['recipient', '-id'], name='activity_recipient_id_idx'), models.Index(fields=['created_at'], name='activity_created_idx')],
+            },
+        ),
+        migrations.RunPython(seed_activity_feed, migrations.RunPython.noop),
+    ]
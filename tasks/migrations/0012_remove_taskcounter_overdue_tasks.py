@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-16 12:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0011_activityfeeditem'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='taskcounter',
+            name='overdue_tasks',
+        ),
+    ]
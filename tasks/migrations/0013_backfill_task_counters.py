@@ -0,0 +1,70 @@
+# Generated by Django 5.2.4 on 2026-10-16 12:30
+
+from collections import Counter
+from django.db import migrations
+from django.db.models import Count, Q
+
+COUNTER_FIELDS = (
+    'total_tasks',
+    'created_tasks',
+    'assigned_tasks',
+    'assigned_to_others',
+    'pending_tasks',
+    'completed_tasks',
+)
+
+
+def backfill_task_counters(apps, schema_editor):
+    """
+    Create the counters of every employee involved in a task, from one grouped
+    aggregation (same rules as TaskQuerySet.stats_for_employees), so pages
+    reading TaskCounter show the right numbers right after deploying
+    """
+    Task = apps.get_model('tasks', 'Task')
+    TaskCounter = apps.get_model('tasks', 'TaskCounter')
+
+    stats = {}
+    rows = Task.objects.order_by().values('created_by_id', 'assigned_to_id').annotate(
+        total=Count('pk'),
+        finished=Count('pk', filter=Q(status='finished')),
+        new=Count('pk', filter=Q(status='new')),
+    )
+    for row in rows:
+        creator_id = row['created_by_id']
+        assignee_id = row['assigned_to_id']
+
+        # A self-assigned task counts once towards the shared totals
+        for employee_id in {creator_id, assignee_id} - {None}:
+            counters = stats.setdefault(employee_id, Counter())
+            counters['total_tasks'] += row['total']
+            counters['completed_tasks'] += row['finished']
+            counters['pending_tasks'] += row['new']
+
+        if creator_id is not None:
+            stats[creator_id]['created_tasks'] += row['total']
+            if assignee_id is not None and assignee_id != creator_id:
+                stats[creator_id]['assigned_to_others'] += row['total']
+
+        if assignee_id is not None:
+            stats[assignee_id]['assigned_tasks'] += row['total']
+
+    existing = set(TaskCounter.objects.values_list('employee_id', flat=True))
+    TaskCounter.objects.bulk_create(
+        [
+            TaskCounter(employee_id=employee_id, **{field: counters[field] for field in COUNTER_FIELDS})
+            for employee_id, counters in stats.items()
+            if employee_id not in existing
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0012_remove_taskcounter_overdue_tasks'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_task_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,274 @@
+# Generated by Django 5.2.4 on 2026-10-16 23:58
+
+import datetime
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0013_backfill_task_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskReminderTracker',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('three_days_reminder_sent', models.BooleanField(default=False, verbose_name='تم إرسال تذكير 3 أيام')),
+                ('one_day_reminder_sent', models.BooleanField(default=False, verbose_name='تم إرسال تذكير يوم واحد')),
+                ('same_day_reminder_sent', models.BooleanField(default=False, verbose_name='تم إرسال تذكير نفس اليوم')),
+                ('three_days_reminder_date', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ تذكير 3 أيام')),
+                ('one_day_reminder_date', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ تذكير يوم واحد')),
+                ('same_day_reminder_date', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ تذكير نفس اليوم')),
+                ('daily_reminder_count', models.PositiveIntegerField(default=0, verbose_name='عدد التذكيرات اليومية')),
+                ('last_reminder_date', models.DateField(blank=True, null=True, verbose_name='تاريخ آخر تذكير')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'متتبع تذكيرات المهمة',
+                'verbose_name_plural': 'متتبعات تذكيرات المهام',
+                'db_table': 'task_reminder_trackers',
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='emailnotificationlog',
+            options={'ordering': ['-created_at'], 'verbose_name': 'سجل إشعار البريد الإلكتروني', 'verbose_name_plural': 'سجلات إشعارات البريد الإلكتروني'},
+        ),
+        migrations.AlterModelOptions(
+            name='notificationpreference',
+            options={'verbose_name': 'تفضيلات الإشعارات', 'verbose_name_plural': 'تفضيلات الإشعارات'},
+        ),
+        migrations.RemoveIndex(
+            model_name='emailnotificationlog',
+            name='tasks_email_status_f70351_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='emailnotificationlog',
+            new_name='email_notif_recipie_9498ca_idx',
+            old_name='tasks_email_recipie_388802_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='emailnotificationlog',
+            new_name='email_notif_task_id_f380ee_idx',
+            old_name='tasks_email_task_id_7ddcab_idx',
+        ),
+        migrations.RemoveField(
+            model_name='emailnotificationlog',
+            name='clicked_at',
+        ),
+        migrations.RemoveField(
+            model_name='emailnotificationlog',
+            name='content',
+        ),
+        migrations.RemoveField(
+            model_name='emailnotificationlog',
+            name='from_email',
+        ),
+        migrations.RemoveField(
+            model_name='emailnotificationlog',
+            name='read_at',
+        ),
+        migrations.RemoveField(
+            model_name='emailnotificationlog',
+            name='to_email',
+        ),
+        migrations.AddField(
+            model_name='emailnotificationlog',
+            name='email_provider_response',
+            field=models.TextField(blank=True, null=True, verbose_name='استجابة مزود البريد الإلكتروني'),
+        ),
+        migrations.AddField(
+            model_name='emailnotificationlog',
+            name='is_reminder',
+            field=models.BooleanField(default=False, verbose_name='هل هو تذكير'),
+        ),
+        migrations.AddField(
+            model_name='emailnotificationlog',
+            name='project',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notification_logs', to='tasks.project', verbose_name='المشروع المرتبط'),
+        ),
+        migrations.AddField(
+            model_name='emailnotificationlog',
+            name='reminder_sequence',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='تسلسل التذكير'),
+        ),
+        migrations.AddField(
+            model_name='emailnotificationlog',
+            name='retry_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='عدد محاولات الإعادة'),
+        ),
+        migrations.AddField(
+            model_name='notificationpreference',
+            name='deadline_1_day_reminder',
+            field=models.BooleanField(default=True, verbose_name='تذكير قبل يوم واحد من الانتهاء'),
+        ),
+        migrations.AddField(
+            model_name='notificationpreference',
+            name='deadline_3_days_reminder',
+            field=models.BooleanField(default=True, verbose_name='تذكير قبل 3 أيام من الانتهاء'),
+        ),
+        migrations.AddField(
+            model_name='notificationpreference',
+            name='deadline_same_day_reminder',
+            field=models.BooleanField(default=True, verbose_name='تذكير في نفس يوم الانتهاء'),
+        ),
+        migrations.AddField(
+            model_name='notificationpreference',
+            name='high_priority_task_reminders',
+            field=models.BooleanField(default=True, verbose_name='تذكيرات إضافية للمهام عالية الأولوية'),
+        ),
+        migrations.AddField(
+            model_name='notificationpreference',
+            name='max_reminders_per_task',
+            field=models.PositiveIntegerField(default=3, verbose_name='عدد التذكيرات القصوى لكل مهمة يومياً'),
+        ),
+        migrations.AddField(
+            model_name='notificationpreference',
+            name='preferred_reminder_time',
+            field=models.TimeField(default=datetime.time(9, 0), verbose_name='الوقت المفضل لاستلام التذكيرات'),
+        ),
+        migrations.AddField(
+            model_name='notificationpreference',
+            name='reminder_interval_hours',
+            field=models.PositiveIntegerField(default=4, verbose_name='الفاصل الزمني بين التذكيرات (ساعات)'),
+        ),
+        migrations.AddField(
+            model_name='notificationpreference',
+            name='task_deadline_reminders',
+            field=models.BooleanField(default=True, verbose_name='تذكيرات مواعيد انتهاء المهام'),
+        ),
+        migrations.AddField(
+            model_name='notificationpreference',
+            name='weekend_reminders_enabled',
+            field=models.BooleanField(default=False, verbose_name='إرسال التذكيرات في نهاية الأسبوع'),
+        ),
+        migrations.AlterField(
+            model_name='emailnotificationlog',
+            name='error_message',
+            field=models.TextField(blank=True, null=True, verbose_name='رسالة الخطأ'),
+        ),
+        migrations.AlterField(
+            model_name='emailnotificationlog',
+            name='notification_type',
+            field=models.CharField(choices=[('task_assigned', 'تكليف مهمة'), ('task_completed', 'إنجاز مهمة'), ('task_overdue', 'مهمة متأخرة'), ('task_due_in_3_days', 'مهمة تنتهي خلال 3 أيام'), ('task_due_tomorrow', 'مهمة تنتهي غداً'), ('task_due_today', 'مهمة تنتهي اليوم'), ('high_priority_reminder', 'تذكير مهمة عالية الأولوية'), ('project_assigned', 'تكليف مشروع'), ('daily_digest', 'الملخص اليومي'), ('weekly_report', 'التقرير الأسبوعي'), ('welcome', 'رسالة ترحيب')], max_length=50, verbose_name='نوع الإشعار'),
+        ),
+        migrations.AlterField(
+            model_name='emailnotificationlog',
+            name='recipient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_logs', to=settings.AUTH_USER_MODEL, verbose_name='المستلم'),
+        ),
+        migrations.AlterField(
+            model_name='emailnotificationlog',
+            name='sent_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='تاريخ الإرسال'),
+        ),
+        migrations.AlterField(
+            model_name='emailnotificationlog',
+            name='status',
+            field=models.CharField(choices=[('sent', 'تم الإرسال'), ('failed', 'فشل الإرسال'), ('pending', 'في انتظار الإرسال'), ('cancelled', 'ملغي')], default='pending', max_length=20, verbose_name='حالة الإرسال'),
+        ),
+        migrations.AlterField(
+            model_name='emailnotificationlog',
+            name='subject',
+            field=models.CharField(max_length=200, verbose_name='موضوع الرسالة'),
+        ),
+        migrations.AlterField(
+            model_name='emailnotificationlog',
+            name='task',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notification_logs', to='tasks.task', verbose_name='المهمة المرتبطة'),
+        ),
+        migrations.AlterField(
+            model_name='monthlygoal',
+            name='year',
+            field=models.IntegerField(default=2026, validators=[django.core.validators.MinValueValidator(2020), django.core.validators.MaxValueValidator(2050)], verbose_name='السنة'),
+        ),
+        migrations.AlterField(
+            model_name='notificationpreference',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء'),
+        ),
+        migrations.AlterField(
+            model_name='notificationpreference',
+            name='daily_digest_enabled',
+            field=models.BooleanField(default=True, verbose_name='تفعيل الملخص اليومي'),
+        ),
+        migrations.AlterField(
+            model_name='notificationpreference',
+            name='digest_time',
+            field=models.TimeField(default=datetime.time(8, 30), verbose_name='وقت إرسال الملخص اليومي'),
+        ),
+        migrations.AlterField(
+            model_name='notificationpreference',
+            name='email_notifications_enabled',
+            field=models.BooleanField(default=True, verbose_name='تفعيل إشعارات البريد الإلكتروني'),
+        ),
+        migrations.AlterField(
+            model_name='notificationpreference',
+            name='project_assigned_email',
+            field=models.BooleanField(default=True, verbose_name='إشعار تكليف مشروع جديد'),
+        ),
+        migrations.AlterField(
+            model_name='notificationpreference',
+            name='task_assigned_email',
+            field=models.BooleanField(default=True, verbose_name='إشعار تكليف مهمة جديدة'),
+        ),
+        migrations.AlterField(
+            model_name='notificationpreference',
+            name='task_completed_email',
+            field=models.BooleanField(default=True, verbose_name='إشعار إنجاز مهمة'),
+        ),
+        migrations.AlterField(
+            model_name='notificationpreference',
+            name='task_overdue_email',
+            field=models.BooleanField(default=True, verbose_name='إشعار المهام المتأخرة'),
+        ),
+        migrations.AlterField(
+            model_name='notificationpreference',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث'),
+        ),
+        migrations.AddIndex(
+            model_name='emailnotificationlog',
+            index=models.Index(fields=['created_at'], name='email_notif_created_9a4191_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emailnotificationlog',
+            index=models.Index(fields=['status'], name='email_notif_status_57590a_idx'),
+        ),
+        migrations.AlterModelTable(
+            name='emailnotificationlog',
+            table='email_notification_logs',
+        ),
+        migrations.AlterModelTable(
+            name='notificationpreference',
+            table='notification_preferences',
+        ),
+        migrations.AddField(
+            model_name='taskremindertracker',
+            name='task',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminder_trackers', to='tasks.task', verbose_name='المهمة'),
+        ),
+        migrations.AddField(
+            model_name='taskremindertracker',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_reminders', to=settings.AUTH_USER_MODEL, verbose_name='المستخدم'),
+        ),
+        migrations.AddIndex(
+            model_name='taskremindertracker',
+            index=models.Index(fields=['task', 'user'], name='task_remind_task_id_e448c3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskremindertracker',
+            index=models.Index(fields=['last_reminder_date'], name='task_remind_last_re_2fcab7_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='taskremindertracker',
+            unique_together={('task', 'user')},
+        ),
+    ]
@@ -1,15 +1,17 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q, Count, Case, When, Value, BooleanField
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 from datetime import datetime
+from .search import SearchIndexedModel
 
 
 
 Employee = get_user_model()
 
-class Project(models.Model):
+class Project(SearchIndexedModel):
     """
     Project model for managing projects in the association
     """
@@ -85,10 +87,21 @@ class Project(models.Model):
         verbose_name="تاريخ آخر تحديث"
     )
     
+    # Fields copied (normalized) into search_text for tasks.search.search()
+    SEARCH_FIELDS = (
+        'name', 'description', 'created_by__name',
+        'primary_assigned_employee__name', 'assigned_employees__name',
+    )
+    
     class Meta:
         verbose_name = "مشروع"
         verbose_name_plural = "المشاريع"
         ordering = ['-created_at']
+        indexes = [
+            # قائمة المشاريع وإحصائيات المشاريع المتأخرة
+            models.Index(fields=['status', 'due_date'], name='project_status_due_idx'),
+            models.Index(fields=['-created_at'], name='project_created_idx'),
+        ]
         
     def __str__(self):
         return self.name
@@ -200,7 +213,129 @@ class Project(models.Model):
         return self.primary_assigned_employee_name
 
 
-class Task(models.Model):
+class TaskQuerySet(models.QuerySet):
+    """
+    Custom queryset for Task with reusable filters and aggregations
+    """
+    
+    def involving(self, user):
+        """Tasks created by or assigned to the given user"""
+        return self.filter(Q(created_by=user) | Q(assigned_to=user))
+    
+    def with_permissions(self, user):
+        """
+        Annotate the permissions of the given user on each task, computed in SQL
+        for the rows actually fetched (same rules as Task.can_*_by):
+        user_can_edit, user_can_delete and user_can_change_status
+        """
+        def flag(condition):
+            return Case(When(condition, then=Value(True)), default=Value(False), output_field=BooleanField())
+        
+        is_creator = Q(created_by=user)
+        return self.annotate(
+            user_can_edit=flag(is_creator),
+            user_can_delete=flag(is_creator),
+            user_can_change_status=flag(is_creator | Q(assigned_to=user)),
+        )
+    
+    def stats_for_employees(self, employee_ids=None):
+        """
+        Compute task statistics for many employees in one grouped query.
+        
+        Tasks are grouped by (created_by, assigned_to) with conditional
+        counts per status, then folded in Python into per-employee totals.
+        Returns a dict mapping employee id to a stats dict. When employee_ids
+        is None, every employee involved in at least one task is returned.
+        """
+        today = timezone.now().date()
+        queryset = self
+        if employee_ids is not None:
+            employee_ids = set(employee_ids)
+            if not employee_ids:
+                return {}
+            queryset = queryset.filter(
+                Q(created_by_id__in=employee_ids) | Q(assigned_to_id__in=employee_ids)
+            )
+        stats = {pk: empty_task_stats() for pk in employee_ids or ()}
+        
+        rows = queryset.order_by().values('created_by_id', 'assigned_to_id').annotate(
+            total=Count('pk'),
+            finished=Count('pk', filter=Q(status='finished')),
+            new=Count('pk', filter=Q(status='new')),
+            overdue=Count('pk', filter=Q(status='new', due_date__lt=today)),
+        )
+        
+        for row in rows:
+            creator_id = row['created_by_id']
+            assignee_id = row['assigned_to_id']
+            involved = {creator_id, assignee_id} - {None}
+            if employee_ids is None:
+                for employee_id in involved - stats.keys():
+                    stats[employee_id] = empty_task_stats()
+            else:
+                involved &= employee_ids
+            
+            # A self-assigned task counts once towards the shared totals
+            for employee_id in involved:
+                employee_stats = stats[employee_id]
+                employee_stats['total_tasks'] += row['total']
+                employee_stats['completed_tasks'] += row['finished']
+                employee_stats['pending_tasks'] += row['new']
+                employee_stats['overdue_tasks'] += row['overdue']
+            
+            if creator_id in involved:
+                stats[creator_id]['created_tasks'] += row['total']
+                if assignee_id is not None and assignee_id != creator_id:
+                    stats[creator_id]['assigned_to_others'] += row['total']
+            
+            if assignee_id in involved:
+                stats[assignee_id]['assigned_tasks'] += row['total']
+        
+        for employee_stats in stats.values():
+            total = employee_stats['total_tasks']
+            completion_rate = (employee_stats['completed_tasks'] / total * 100) if total > 0 else 0
+            employee_stats['completion_rate'] = round(completion_rate, 1)
+        
+        return stats
+    
+    def overdue_counts_for_employees(self, employee_ids):
+        """
+        Number of open tasks past their due date per employee (created or
+        assigned, a self-assigned task counts once). Only open tasks are read,
+        through the partial index on their due date.
+        """
+        employee_ids = set(employee_ids)
+        counts = dict.fromkeys(employee_ids, 0)
+        if not employee_ids:
+            return counts
+        
+        rows = self.filter(
+            status='new', due_date__lt=timezone.now().date()
+        ).filter(
+            Q(created_by_id__in=employee_ids) | Q(assigned_to_id__in=employee_ids)
+        ).order_by().values('created_by_id', 'assigned_to_id').annotate(overdue=Count('pk'))
+        
+        for row in rows:
+            for employee_id in {row['created_by_id'], row['assigned_to_id']} & employee_ids:
+                counts[employee_id] += row['overdue']
+        return counts
+
+
+def empty_task_stats():
+    """Zeroed per-employee task statistics"""
+    return {
+        'total_tasks': 0,
+        'created_tasks': 0,
+        'assigned_tasks': 0,
+        'assigned_to_others': 0,
+        'completed_tasks': 0,
+        'pending_tasks': 0,
+        'overdue_tasks': 0,
+        'completion_rate': 0,
+    }
+
+
+class Task(SearchIndexedModel):
     """
     Task model for managing individual tasks
     """
@@ -275,14 +410,112 @@ class Task(models.Model):
         verbose_name="تاريخ آخر تحديث"
     )
     
+    objects = TaskQuerySet.as_manager()
+    
+    # Fields copied (normalized) into search_text for tasks.search.search()
+    SEARCH_FIELDS = ('name', 'detail')
+    
+    # Employee making the current change, set by views before saving (not stored);
+    # live events about the change are not sent back to them
+    changed_by_id = None
+    
+    # Fields (attnames) whose loaded values are tracked to detect changes on save
+    TRACKED_FIELDS = (
+        'name', 'detail', 'due_date', 'project_id',
+        'assigned_to_id', 'status', 'created_by_id',
+    )
+    
     class Meta:
         verbose_name = "مهمة"
         verbose_name_plural = "المهام"
         ordering = ['-created_at']
+        indexes = [
+            # مهامي / المهام المُسندة إليّ / المهام المنتهية مرتبة بالأحدث
+            models.Index(fields=['created_by', 'status', '-created_at'], name='task_creator_status_idx'),
+            models.Index(fields=['assigned_to', 'status', '-created_at'], name='task_assignee_status_idx'),
+            # المهام المنجزة حديثاً (الإشعارات والتقارير الشهرية)
+            models.Index(fields=['status', '-updated_at'], name='task_status_updated_idx'),
+            # المهام المفتوحة حسب تاريخ الاستحقاق (المتأخرة والتذكيرات)
+            models.Index(fields=['due_date'], name='task_open_due_idx', condition=models.Q(status='new')),
+            models.Index(fields=['-created_at'], name='task_created_idx'),
+        ]
         
     def __str__(self):
         return self.name
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Snapshot tracked field values as loaded, so saves can be diffed without a query"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values)
+            if name in cls.TRACKED_FIELDS and value is not models.DEFERRED
+        }
+        return instance
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        
+        # Tracked fields changed in memory but left out of update_fields are not written:
+        # show the receivers their stored values during the save
+        unsaved = {}
+        if update_fields is not None:
+            attnames = {field.name: field.attname for field in self._meta.concrete_fields}
+            written = {attnames.get(name, name) for name in update_fields}
+            unsaved = {name: getattr(self, name) for name in self.get_changed_fields() - written}
+            for name in unsaved:
+                setattr(self, name, self._loaded_values[name])
+        
+        # Keep post_save receivers (TaskCounter rollup) in the same transaction as the write
+        try:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+        finally:
+            for name, value in unsaved.items():
+                setattr(self, name, value)
+        
+        # The saved values become the new baseline for later saves of this instance
+        self._snapshot_tracked_fields(self.TRACKED_FIELDS if update_fields is None else update_fields)
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+    
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._snapshot_tracked_fields(self.TRACKED_FIELDS if fields is None else fields)
+    
+    def _snapshot_tracked_fields(self, field_names):
+        """Record the current values of the given fields (names or attnames) as loaded from the database"""
+        if getattr(self, '_loaded_values', None) is None:
+            self._loaded_values = {}
+        attnames = {field.name: field.attname for field in self._meta.concrete_fields}
+        deferred = self.get_deferred_fields()
+        for name in field_names:
+            attname = attnames.get(name, name)
+            if attname in self.TRACKED_FIELDS and attname not in deferred:
+                self._loaded_values[attname] = getattr(self, attname)
+    
+    @property
+    def has_loaded_values(self):
+        """Whether this instance holds a snapshot of its database values"""
+        return bool(getattr(self, '_loaded_values', None))
+    
+    def get_original_value(self, field_name):
+        """Value of a tracked field as loaded from the database (current value if unknown)"""
+        loaded_values = getattr(self, '_loaded_values', None) or {}
+        if field_name in loaded_values:
+            return loaded_values[field_name]
+        return getattr(self, field_name)
+    
+    def get_changed_fields(self):
+        """Set of tracked field attnames changed in memory since the task was loaded or saved"""
+        loaded_values = getattr(self, '_loaded_values', None) or {}
+        return {
+            name for name, value in loaded_values.items()
+            if getattr(self, name) != value
+        }
+    
     def get_absolute_url(self):
         return reverse('tasks:task_detail', kwargs={'pk': self.pk})
     
@@ -311,10 +544,11 @@ class Task(models.Model):
             return diff.days
         return None
     
+    # Permission rules; TaskQuerySet.with_permissions computes the same flags in SQL
     def can_be_edited_by(self, user):
         """Check if user can edit this task"""
         # Creator can always edit their own tasks
-        if self.created_by == user:
+        if self.created_by_id == user.pk:
             return True
         # Assigned user can only change status
         return False
@@ -322,12 +556,12 @@ class Task(models.Model):
     def can_be_deleted_by(self, user):
         """Check if user can delete this task"""
         # Only creator can delete the task
-        return self.created_by == user
+        return self.created_by_id == user.pk
     
     def can_change_status_by(self, user):
         """Check if user can change task status"""
         # Creator and assigned user can change status
-        return self.created_by == user or self.assigned_to == user
+        return self.created_by_id == user.pk or self.assigned_to_id == user.pk
     
     @property
     def is_assigned(self):
@@ -351,6 +585,70 @@ class Task(models.Model):
     
 
 
+class TaskCounter(models.Model):
+    """
+    Denormalized per-employee task counters.
+    
+    Kept up to date incrementally in the same transaction as every task
+    save/delete (see tasks.services.task_counters) so read-heavy pages can
+    show employee statistics without aggregating the task table. Counters
+    can be recomputed with `manage.py rebuild_task_counters`.
+    
+    Overdue tasks are not stored: a task becomes overdue when the date
+    changes, without any save, so they are counted when read
+    (TaskQuerySet.overdue_counts_for_employees).
+    """
+    
+    employee = models.OneToOneField(
+        Employee,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='task_counter',
+        verbose_name="الموظف"
+    )
+    
+    total_tasks = models.IntegerField(default=0, verbose_name="إجمالي المهام")
+    created_tasks = models.IntegerField(default=0, verbose_name="المهام المُنشأة")
+    assigned_tasks = models.IntegerField(default=0, verbose_name="المهام المُعيّنة")
+    assigned_to_others = models.IntegerField(default=0, verbose_name="المهام المُعيّنة للآخرين")
+    pending_tasks = models.IntegerField(default=0, verbose_name="المهام المعلقة")
+    completed_tasks = models.IntegerField(default=0, verbose_name="المهام المكتملة")
+    
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="تاريخ آخر تحديث"
+    )
+    
+    COUNTER_FIELDS = (
+        'total_tasks',
+        'created_tasks',
+        'assigned_tasks',
+        'assigned_to_others',
+        'pending_tasks',
+        'completed_tasks',
+    )
+    
+    class Meta:
+        verbose_name = "عدادات مهام الموظف"
+        verbose_name_plural = "عدادات مهام الموظفين"
+    
+    def __str__(self):
+        return f"{self.employee} - {self.total_tasks}"
+    
+    def as_stats(self, overdue_tasks=0):
+        """
+        Return the counters in the same shape as TaskQuerySet.stats_for_employees
+        (overdue_tasks is counted live by the caller)
+        """
+        stats = {field: getattr(self, field) for field in self.COUNTER_FIELDS}
+        stats['overdue_tasks'] = overdue_tasks
+        total = stats['total_tasks']
+        completion_rate = (stats['completed_tasks'] / total * 100) if total > 0 else 0
+        stats['completion_rate'] = round(completion_rate, 1)
+        return stats
+
+
+
 
 
 
@@ -4,6 +4,7 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from datetime import timedelta
 
 Employee = get_user_model()
 
@@ -115,6 +116,23 @@ class NotificationPreference(models.Model):
         verbose_name_plural = 'تفضيلات الإشعارات'
         db_table = 'notification_preferences'
     
+    DEFAULT_PREFERENCES = {
+        'email_notifications_enabled': True,
+        'task_assigned_email': True,
+        'task_completed_email': True,
+        'task_overdue_email': True,
+        'task_deadline_reminders': True,
+        'deadline_3_days_reminder': True,
+        'deadline_1_day_reminder': True,
+        'deadline_same_day_reminder': True,
+        'high_priority_task_reminders': True,
+        'weekend_reminders_enabled': False,
+        'project_assigned_email': True,
+        'daily_digest_enabled': True,
+        'max_reminders_per_task': 3,
+        'reminder_interval_hours': 4,
+    }
+    
     def __str__(self):
         return f'تفضيلات إشعارات {self.user.name}'
     
@@ -125,25 +143,35 @@ class NotificationPreference(models.Model):
         """
         preferences, created = cls.objects.get_or_create(
             user=user,
-            defaults={
-                'email_notifications_enabled': True,
-                'task_assigned_email': True,
-                'task_completed_email': True,
-                'task_overdue_email': True,
-                'task_deadline_reminders': True,
-                'deadline_3_days_reminder': True,
-                'deadline_1_day_reminder': True,
-                'deadline_same_day_reminder': True,
-                'high_priority_task_reminders': True,
-                'weekend_reminders_enabled': False,
-                'project_assigned_email': True,
-                'daily_digest_enabled': True,
-                'max_reminders_per_task': 3,
-                'reminder_interval_hours': 4,
-            }
+            defaults=cls.DEFAULT_PREFERENCES
         )
         return preferences
     
+    @classmethod
+    def get_or_create_for_users(cls, user_ids):
+        """
+        تفضيلات عدة مستخدمين دفعة واحدة: قاموس {user_id: التفضيلات}
+        مع إنشاء الناقص منها باستعلام واحد
+        """
+        user_ids = set(user_ids)
+        preferences = {
+            preference.user_id: preference
+            for preference in cls.objects.filter(user_id__in=user_ids)
+        }
+        
+        missing_ids = user_ids - preferences.keys()
+        if missing_ids:
+            cls.objects.bulk_create(
+                [cls(user_id=user_id, **cls.DEFAULT_PREFERENCES) for user_id in missing_ids],
+                ignore_conflicts=True
+            )
+            preferences.update({
+                preference.user_id: preference
+                for preference in cls.objects.filter(user_id__in=missing_ids)
+            })
+        
+        return preferences
+    
     def should_send_deadline_reminder(self, days_remaining):
         """
         تحديد ما إذا كان يجب إرسال تذكير حسب عدد الأيام المتبقية
@@ -167,6 +195,53 @@ class NotificationPreference(models.Model):
         return self.weekend_reminders_enabled
 
 
+class NotificationTemplate(models.Model):
+    """
+    قوالب رسائل الإشعارات بالبريد الإلكتروني
+    """
+    TEMPLATE_TYPES = [
+        ('task_assigned', 'تكليف مهمة'),
+        ('task_completed', 'إنجاز مهمة'),
+        ('task_overdue', 'مهمة متأخرة'),
+        ('project_assigned', 'تعيين في مشروع'),
+        ('daily_digest', 'ملخص يومي'),
+        ('welcome', 'ترحيب'),
+    ]
+    
+    name = models.CharField(max_length=100, verbose_name='اسم القالب')
+    template_type = models.CharField(
+        max_length=20,
+        choices=TEMPLATE_TYPES,
+        unique=True,
+        verbose_name='نوع القالب'
+    )
+    subject_template = models.CharField(
+        max_length=255,
+        verbose_name='قالب الموضوع',
+        help_text='يمكن استخدام متغيرات مثل {task_name}, {user_name}, {due_date}'
+    )
+    html_template = models.TextField(verbose_name='قالب HTML', help_text='قالب HTML للإيميل')
+    text_template = models.TextField(verbose_name='قالب النص', help_text='قالب النص العادي للإيميل')
+    is_active = models.BooleanField(default=True, verbose_name='نشط')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'قالب إشعار'
+        verbose_name_plural = 'قوالب الإشعارات'
+        ordering = ['template_type']
+    
+    def __str__(self):
+        return f'{self.name} ({self.get_template_type_display()})'
+    
+    def render_subject(self, context):
+        """تجهيز موضوع الرسالة من القالب مع المتغيرات"""
+        try:
+            return self.subject_template.format(**context)
+        except (KeyError, IndexError, ValueError):
+            return self.subject_template
+
+
 class EmailNotificationLog(models.Model):
     """
     سجل إرسال الإشعارات عبر البريد الإلكتروني
@@ -401,7 +476,7 @@ class TaskReminderTracker(models.Model):
     def __str__(self):
         return f'تتبع تذكيرات {self.task.name} - {self.user.name}'
     
-    def can_send_reminder(self, reminder_type, max_daily_reminders=3):
+    def can_send_reminder(self, reminder_type, max_daily_reminders=3, save=True):
         """
         تحديد ما إذا كان يمكن إرسال تذكير معين
         """
@@ -411,7 +486,8 @@ class TaskReminderTracker(models.Model):
         if self.last_reminder_date != today:
             self.daily_reminder_count = 0
             self.last_reminder_date = today
-            self.save(update_fields=['daily_reminder_count', 'last_reminder_date'])
+            if save:
+                self.save(update_fields=['daily_reminder_count', 'last_reminder_date'])
         
         # فحص الحد الأقصى للتذكيرات اليومية
         if self.daily_reminder_count >= max_daily_reminders:
@@ -427,9 +503,10 @@ class TaskReminderTracker(models.Model):
         
         return True
     
-    def mark_reminder_sent(self, reminder_type):
+    def mark_reminder_sent(self, reminder_type, save=True):
         """
         وضع علامة على إرسال تذكير معين
+        (save=False لتحديث المتتبع في الذاكرة فقط ثم حفظه مع غيره عبر bulk_update)
         """
         now = timezone.now()
         today = now.date()
@@ -451,7 +528,8 @@ class TaskReminderTracker(models.Model):
             self.daily_reminder_count += 1
         
         self.last_reminder_date = today
-        self.save()
+        if save:
+            self.save()
     
     @classmethod
     def get_or_create_tracker(cls, task, user):
@@ -465,4 +543,194 @@ class TaskReminderTracker(models.Model):
                 'daily_reminder_count': 0,
             }
         )
-        return tracker
\ No newline at end of file
+        return tracker
+
+class NotificationOutbox(models.Model):
+    """
+    صندوق الإشعارات الصادرة: يُكتب في نفس معاملة تعديل المهمة
+    ويُرسل بعد تأكيد المعاملة حتى لا تضيع الإشعارات عند تعطل الخادم
+    """
+    NOTIFICATION_TYPES = [
+        ('task_assigned', 'تكليف مهمة'),
+        ('task_completed', 'إنجاز مهمة'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'في انتظار الإرسال'),
+        ('processing', 'قيد الإرسال'),
+        ('sent', 'تم الإرسال'),
+        ('skipped', 'لم يُرسل حسب التفضيلات'),
+        ('failed', 'فشل الإرسال'),
+    ]
+    
+    notification_type = models.CharField(
+        max_length=50,
+        choices=NOTIFICATION_TYPES,
+        verbose_name='نوع الإشعار'
+    )
+    
+    task = models.ForeignKey(
+        'Task',
+        on_delete=models.CASCADE,
+        related_name='outbox_notifications',
+        verbose_name='المهمة'
+    )
+    
+    # المستلم (للتكليف) والموظف الذي قام بالإجراء (المُكلِّف أو المُنجز)
+    recipient = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='outbox_notifications',
+        verbose_name='المستلم'
+    )
+    
+    actor = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='outbox_actions',
+        verbose_name='منفذ الإجراء'
+    )
+    
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending',
+        verbose_name='الحالة'
+    )
+    
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='عدد المحاولات'
+    )
+    
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='آخر خطأ'
+    )
+    
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='موعد المحاولة التالية'
+    )
+    
+    locked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='وقت بدء المعالجة'
+    )
+    
+    processed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='وقت المعالجة'
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
+    
+    class Meta:
+        verbose_name = 'إشعار صادر'
+        verbose_name_plural = 'صندوق الإشعارات الصادرة'
+        db_table = 'notification_outbox'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+    
+    def __str__(self):
+        return f'{self.get_notification_type_display()} - {self.task_id} - {self.status}'
+    
+    def mark_as_sent(self):
+        """وضع علامة كمرسل بنجاح"""
+        self.status = 'sent'
+        self.processed_at = timezone.now()
+        self.save(update_fields=['status', 'processed_at'])
+    
+    def mark_as_skipped(self):
+        """وضع علامة كغير مرسل (الإشعارات معطلة أو حسب تفضيلات المستخدم)"""
+        self.status = 'skipped'
+        self.processed_at = timezone.now()
+        self.save(update_fields=['status', 'processed_at'])
+    
+    def mark_for_retry(self, error_message, max_attempts, retry_delay_seconds):
+        """
+        إعادة الإشعار للانتظار مع تأخير متزايد، أو وضع علامة كفاشل بعد استنفاد المحاولات
+        """
+        self.last_error = error_message
+        if self.attempts >= max_attempts:
+            self.status = 'failed'
+            self.processed_at = timezone.now()
+        else:
+            self.status = 'pending'
+            delay = retry_delay_seconds * (2 ** (self.attempts - 1))
+            self.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        self.save(update_fields=['status', 'last_error', 'next_attempt_at', 'processed_at'])
+
+
+class ActivityFeedItem(models.Model):
+    """
+    موجز نشاط الموظف: يُضاف عنصر عند تكليفه بمهمة أو إنجاز مهمة كلّف بها غيره،
+    ويقرأ الموجز العناصر الأحدث من مؤشر (since) بدلاً من إعادة حسابها في كل استطلاع
+    """
+    ACTIVITY_TYPES = [
+        ('new-task', 'مهمة جديدة مُعيّنة'),
+        ('completed-task', 'تم إكمال مهمة'),
+    ]
+    
+    recipient = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name='activity_feed',
+        verbose_name='المستلم'
+    )
+    
+    activity_type = models.CharField(
+        max_length=30,
+        choices=ACTIVITY_TYPES,
+        verbose_name='نوع النشاط'
+    )
+    
+    task = models.ForeignKey(
+        'Task',
+        on_delete=models.CASCADE,
+        related_name='activity_items',
+        verbose_name='المهمة'
+    )
+    
+    # الموظف الذي قام بالإجراء (المُكلِّف أو المُنجز)
+    actor = models.ForeignKey(
+        Employee,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='activity_actions',
+        verbose_name='منفذ الإجراء'
+    )
+    
+    # اسم المهمة وقت الحدث حتى لا يحتاج الموجز إلى ربط جدول المهام
+    task_name = models.CharField(
+        max_length=200,
+        verbose_name='اسم المهمة'
+    )
+    
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='تاريخ الإنشاء'
+    )
+    
+    class Meta:
+        verbose_name = 'عنصر موجز النشاط'
+        verbose_name_plural = 'موجز النشاط'
+        db_table = 'activity_feed_items'
+        ordering = ['-id']
+        indexes = [
+            # آخر العناصر لكل موظف وما بعد المؤشر (since)
+            models.Index(fields=['recipient', '-id'], name='activity_recipient_id_idx'),
+            models.Index(fields=['created_at'], name='activity_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.get_activity_type_display()} - {self.task_name} - {self.recipient_id}'
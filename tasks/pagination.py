@@ -0,0 +1,231 @@
+# tasks/pagination.py
+# Keyset (cursor) pagination: pages are read with WHERE (key) < (cursor) instead
+# of OFFSET, so a deep page costs the same as the first one
+
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.functional import cached_property
+
+# Tables smaller than this are counted exactly even when an estimate is allowed
+ESTIMATE_MIN_ROWS = 10000
+
+
+def encode_cursor(values, direction='next'):
+    """
+    Opaque cursor for the position after (or before) a row's key values
+    """
+    payload = {'d': direction, 'v': [_dump_value(value) for value in values]}
+    data = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    (values, direction) of a cursor, or None when it is missing or invalid
+    """
+    if not cursor:
+        return None
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(data)
+        direction = payload['d']
+        if not isinstance(payload['v'], list):
+            return None
+        values = [_load_value(value) for value in payload['v']]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        return None
+    if direction not in ('next', 'previous'):
+        return None
+    return values, direction
+
+
+def estimate_row_count(model, using='default'):
+    """
+    Planner estimate of the number of rows of a table (pg_class.reltuples),
+    or None when not on PostgreSQL or the table is too small to bother
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)',
+            [connection.ops.quote_name(model._meta.db_table)]
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < ESTIMATE_MIN_ROWS:
+        return None
+    return row[0]
+
+
+def count_queryset(queryset, estimate=False):
+    """
+    Number of rows of a queryset; unfiltered querysets of big tables use the
+    planner estimate when allowed instead of a full COUNT(*)
+    """
+    if estimate and not queryset.query.where and not queryset.query.distinct:
+        estimated = estimate_row_count(queryset.model, queryset.db)
+        if estimated is not None:
+            return estimated
+    return queryset.count()
+
+
+class KeysetPage:
+    """
+    One page of a KeysetPaginator, usable like a Django Page in templates
+    (iteration, has_next/has_previous, paginator.count)
+    """
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by a unique key, (created_at, id) by default.
+
+    ordering lists the key fields as in order_by(); the last one must make
+    the key unique (normally pk) and none of them may be NULL. Pages are
+    addressed by opaque cursors (page_obj.next_cursor / previous_cursor)
+    instead of page numbers. count is only queried when used, and with
+    estimate_count=True an unfiltered big table is counted from the
+    PostgreSQL planner statistics.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-created_at', '-pk'), estimate_count=False):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.estimate_count = estimate_count
+        self.keys = [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+
+    @cached_property
+    def count(self):
+        return count_queryset(self.queryset, estimate=self.estimate_count)
+
+    def get_page(self, cursor=None):
+        """
+        The page at a cursor; a missing or invalid cursor gives the first page
+        """
+        decoded = decode_cursor(cursor)
+        if decoded is None:
+            rows = list(self.get_page_queryset())
+            return self._build_page(rows, forward=True, has_before=False)
+
+        values, direction = decoded
+        if len(values) != len(self.keys):
+            return self.get_page()
+        forward = direction == 'next'
+        try:
+            queryset = self.get_page_queryset(values, forward)
+        except (ValueError, TypeError, ValidationError):
+            # Values of the wrong type for the key fields
+            return self.get_page()
+        rows = list(queryset)
+        return self._build_page(rows, forward, has_before=True)
+
+    def get_page_queryset(self, values=None, forward=True):
+        """
+        The query a page reads: per_page + 1 rows after the key values in the
+        reading direction (from the start when values is None)
+        """
+        queryset = self._ordered(forward)
+        if values is not None:
+            queryset = queryset.filter(self._after(values, forward))
+        return queryset[:self.per_page + 1]
+
+    def _ordered(self, forward):
+        return self.queryset.order_by(*(
+            f"{'-' if desc == forward else ''}{field}" for field, desc in self.keys
+        ))
+
+    def _after(self, values, forward):
+        """
+        Rows strictly after the key values in the reading direction:
+        (a < x) OR (a = x AND b < y) ... for descending keys
+        """
+        condition = Q()
+        for i, (field, desc) in enumerate(self.keys):
+            lookup = 'lt' if desc == forward else 'gt'
+            equal = {name: value for (name, _), value in zip(self.keys[:i], values[:i])}
+            condition |= Q(**equal, **{f'{field}__{lookup}': values[i]})
+        return condition
+
+    def _build_page(self, rows, forward, has_before):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        # Reading forward, more rows mean a next page; reading backward, a previous one
+        has_next = has_more if forward else has_before
+        has_previous = has_before if forward else has_more
+        next_cursor = encode_cursor(self._key_of(rows[-1]), 'next') if has_next and rows else None
+        previous_cursor = encode_cursor(self._key_of(rows[0]), 'previous') if has_previous and rows else None
+        return KeysetPage(rows, self, next_cursor, previous_cursor)
+
+    def _key_of(self, obj):
+        return [getattr(obj, field) for field, _ in self.keys]
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for admin changelists of big tables: the unfiltered total comes
+    from the planner statistics instead of COUNT(*)
+    """
+
+    @cached_property
+    def count(self):
+        return count_queryset(self.object_list, estimate=True)
+
+
+def _dump_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    return value
+
+
+def _load_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            parsed = parse_datetime(value['dt'])
+        else:
+            parsed = parse_date(value['d'])
+        if parsed is None:
+            raise ValueError('Invalid date in cursor')
+        return parsed
+    if isinstance(value, list):
+        raise ValueError('Invalid cursor value')
+    return value
@@ -0,0 +1,255 @@
+# tasks/search.py
+# Search for tasks, projects and employees: Arabic-normalized search text kept
+# on each row, full-text + trigram indexes on PostgreSQL, substring fallback elsewhere
+
+import re
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, SearchVectorField, TrigramSimilarity,
+)
+from django.db import connections, models
+from django.db.models import F, Q, Value
+
+# Text search configuration: no stemming, Arabic is normalized before indexing
+SEARCH_CONFIG = 'simple'
+
+# Tashkeel (fathatan .. sukun), superscript alef and tatweel
+ARABIC_DIACRITICS = re.compile('[\u064B-\u0652\u0670\u0640]')
+
+ARABIC_LETTER_VARIANTS = str.maketrans({
+    'أ': 'ا',
+    'إ': 'ا',
+    'آ': 'ا',
+    'ٱ': 'ا',
+    'ى': 'ي',
+    'ة': 'ه',
+})
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def normalize_search_text(text):
+    """
+    Normalize text for searching: drop Arabic diacritics and tatweel, unify
+    alef/ya/ta-marbuta variants, lowercase, and keep only the words
+    """
+    if not text:
+        return ''
+    text = ARABIC_DIACRITICS.sub('', str(text)).translate(ARABIC_LETTER_VARIANTS).lower()
+    return ' '.join(WORD_PATTERN.findall(text))
+
+
+def get_search_terms(query):
+    """
+    The normalized words of a search query
+    """
+    return normalize_search_text(query).split()
+
+
+def build_search_text(values):
+    """
+    Normalized search text of a row from the values of its searchable fields
+    """
+    return ' '.join(filter(None, (normalize_search_text(value) for value in values)))
+
+
+def is_postgresql(using):
+    return connections[using].vendor == 'postgresql'
+
+
+class SearchIndexedModel(models.Model):
+    """
+    Keeps a normalized copy of the searchable fields (search_text) and, on
+    PostgreSQL, its tsvector (search_vector) in the same write as the row.
+
+    SEARCH_FIELDS lists field paths (related paths use __). The GIN indexes on
+    search_vector and the trigram index on search_text only exist on
+    PostgreSQL, so they are created in the migrations rather than Meta.indexes.
+    """
+
+    SEARCH_FIELDS = ()
+
+    search_text = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name="نص البحث"
+    )
+
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name="فهرس البحث"
+    )
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def get_search_source_fields(cls):
+        """
+        Names of the fields whose change requires refreshing the search text
+        """
+        return {path.split('__')[0] for path in cls.SEARCH_FIELDS} | {'search_text'}
+
+    def get_search_values(self):
+        return [value for path in self.SEARCH_FIELDS for value in _resolve_path(self, path.split('__'))]
+
+    def update_search_fields(self, using=None):
+        """
+        Recompute search_text (and the tsvector expression on PostgreSQL)
+        """
+        self.search_text = build_search_text(self.get_search_values())
+        if is_postgresql(using or self._state.db or 'default'):
+            self.search_vector = SearchVector(Value(self.search_text), config=SEARCH_CONFIG)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or set(update_fields) & self.get_search_source_fields():
+            self.update_search_fields(kwargs.get('using'))
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'search_text', 'search_vector'}
+
+        super().save(*args, **kwargs)
+
+        # search_vector was written as an expression; load the stored value lazily if read
+        self.__dict__.pop('search_vector', None)
+
+
+def search(queryset, query, limit=None):
+    """
+    Filter a queryset of a SearchIndexedModel by a search query.
+
+    Every word of the query must appear in the row's search text (or, on
+    PostgreSQL, match the full-text index as a prefix). On PostgreSQL results
+    are ranked by full-text rank plus trigram similarity, ahead of the
+    queryset's own ordering. The limit is applied in the database.
+    """
+    terms = get_search_terms(query)
+    if terms:
+        matches = Q()
+        for term in terms:
+            matches &= Q(search_text__contains=term)
+
+        if is_postgresql(queryset.db):
+            ordering = queryset.query.order_by or queryset.model._meta.ordering
+            tsquery = SearchQuery(
+                ' & '.join(f'{term}:*' for term in terms),
+                config=SEARCH_CONFIG,
+                search_type='raw'
+            )
+            queryset = queryset.filter(matches | Q(search_vector=tsquery)).annotate(
+                search_rank=SearchRank(F('search_vector'), tsquery)
+                + TrigramSimilarity('search_text', ' '.join(terms))
+            ).order_by('-search_rank', *ordering)
+        else:
+            queryset = queryset.filter(matches)
+
+    if limit is not None:
+        queryset = queryset[:limit]
+    return queryset
+
+
+def rebuild_search_index(model, batch_size=500, queryset=None):
+    """
+    Recompute the search text and vector of every row of a SearchIndexedModel
+    (after adding searchable fields or renaming related objects), or only of
+    the rows of the given queryset
+    """
+    forward, many = [], []
+    for path in model.SEARCH_FIELDS:
+        if '__' not in path:
+            continue
+        relation = path.rsplit('__', 1)[0]
+        field = model._meta.get_field(relation.split('__')[0])
+        (many if field.many_to_many or field.one_to_many else forward).append(relation)
+
+    rows = model._default_manager.all() if queryset is None else queryset.distinct()
+    queryset = rows.select_related(*forward).prefetch_related(*many)
+    manager = model._default_manager
+    updated = 0
+    batch = []
+    for instance in queryset.iterator(chunk_size=batch_size):
+        instance.search_text = build_search_text(instance.get_search_values())
+        batch.append(instance)
+        if len(batch) >= batch_size:
+            updated += manager.bulk_update(batch, ['search_text'])
+            batch = []
+    if batch:
+        updated += manager.bulk_update(batch, ['search_text'])
+
+    if is_postgresql(queryset.db):
+        if rows.query.has_filters():
+            manager = manager.filter(pk__in=rows.values('pk'))
+        manager.update(search_vector=SearchVector('search_text', config=SEARCH_CONFIG))
+    return updated
+
+
+def related_search_filter(model, instance):
+    """
+    Q matching the rows of a SearchIndexedModel whose search text includes
+    fields of the given related object, or None when none of its search
+    fields go through that object's model
+    """
+    related_model = instance._meta.concrete_model
+    matches = None
+    for path in model.SEARCH_FIELDS:
+        relation = path.split('__')[:-1]
+        if not relation:
+            continue
+        opts = model._meta
+        for name in relation:
+            opts = opts.get_field(name).related_model._meta
+        if opts.concrete_model is related_model:
+            condition = Q(**{'__'.join(relation): instance})
+            matches = condition if matches is None else matches | condition
+    return matches
+
+
+def _resolve_path(obj, attrs):
+    """
+    Values at a field path, following foreign keys and to-many relations
+    (to-many relations of unsaved objects have no values yet)
+    """
+    if obj is None:
+        return []
+    if not attrs:
+        return [obj]
+    field = obj._meta.get_field(attrs[0]) if isinstance(obj, models.Model) else None
+    if field is not None and (field.many_to_many or field.one_to_many):
+        if obj.pk is None:
+            return []
+        value = getattr(obj, field.get_accessor_name() if field.auto_created else field.name)
+        return [item for related in value.all() for item in _resolve_path(related, attrs[1:])]
+    return _resolve_path(getattr(obj, attrs[0], None), attrs[1:])
+
+
+def create_search_indexes(schema_editor, table):
+    """
+    Migration helper: GIN index on search_vector and trigram index on
+    search_text (PostgreSQL only; other databases search without them)
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS "{table}_search_vector_idx" ON "{table}" USING gin ("search_vector")'
+    )
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS "{table}_search_trgm_idx" ON "{table}" USING gin ("search_text" gin_trgm_ops)'
+    )
+
+
+def drop_search_indexes(schema_editor, table):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS "{table}_search_vector_idx"')
+    schema_editor.execute(f'DROP INDEX IF EXISTS "{table}_search_trgm_idx"')
+
+
+def fill_search_vectors(schema_editor, model):
+    """
+    Migration helper: compute search_vector from the backfilled search_text
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        model._default_manager.using(schema_editor.connection.alias).update(
+            search_vector=SearchVector('search_text', config=SEARCH_CONFIG)
+        )
@@ -0,0 +1,92 @@
+# tasks/services/activity_feed.py
+# Persisted per-user activity feed, appended on task events and read incrementally
+
+import logging
+from datetime import timedelta
+from django.utils import timezone
+from ..notification_models import ActivityFeedItem
+
+logger = logging.getLogger('notifications')
+
+# Items returned when the client has no cursor yet (first load)
+FEED_PAGE_SIZE = 10
+
+# Days an activity item is kept
+FEED_RETENTION_DAYS = 30
+
+
+def record_task_activity(task, created, changed_fields=()):
+    """
+    Append the feed items caused by a task save:
+    a new assignment notifies the assignee, a completion notifies the creator
+    (when creator and assignee are different people)
+    """
+    items = []
+    assigned_to_other = task.assigned_to_id and task.assigned_to_id != task.created_by_id
+
+    if assigned_to_other and (created or 'assigned_to_id' in changed_fields):
+        items.append(ActivityFeedItem(
+            recipient_id=task.assigned_to_id,
+            activity_type='new-task',
+            task=task,
+            actor_id=task.created_by_id,
+            task_name=task.name,
+        ))
+
+    if (not created and 'status' in changed_fields and task.status == 'finished'
+            and assigned_to_other and task.created_by_id):
+        items.append(ActivityFeedItem(
+            recipient_id=task.created_by_id,
+            activity_type='completed-task',
+            task=task,
+            actor_id=task.assigned_to_id,
+            task_name=task.name,
+        ))
+
+    if items:
+        ActivityFeedItem.objects.bulk_create(items)
+    return items
+
+
+def get_latest_activity_id(user_id):
+    """
+    Id of the newest feed item of a user (0 when empty), a single index lookup
+    """
+    latest = ActivityFeedItem.objects.filter(
+        recipient_id=user_id
+    ).order_by('-id').values_list('id', flat=True).first()
+    return latest or 0
+
+
+def get_activity_items(user_id, since=None, limit=FEED_PAGE_SIZE):
+    """
+    Newest feed items of a user, only those after the since cursor when given
+    """
+    queryset = ActivityFeedItem.objects.filter(recipient_id=user_id)
+    if since:
+        queryset = queryset.filter(id__gt=since)
+    return list(queryset.select_related('actor').order_by('-id')[:limit])
+
+
+def serialize_activity_item(item):
+    actor = item.actor
+    # Employee has no picture field yet; templates already treat it as optional
+    picture = getattr(actor, 'profile_picture', None)
+    return {
+        'id': item.pk,
+        'type': item.activity_type,
+        'task_name': item.task_name,
+        'from_user_name': actor.name if actor else '',
+        'from_user_avatar': picture.url if picture else None,
+        'created_at': timezone.localtime(item.created_at).strftime('%Y-%m-%d %H:%M'),
+        'task_id': item.task_id,
+    }
+
+
+def prune_activity_feed(days=FEED_RETENTION_DAYS):
+    """
+    Delete feed items older than the retention period, returns the number deleted
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = ActivityFeedItem.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,189 @@
+# tasks/services/daily_digest.py
+# Batched daily digest pipeline: bulk load, partition in memory, send in chunks
+
+import logging
+import time
+from django.db.models import Q
+from django.utils import timezone
+from ..models import Task
+from ..notification_models import NotificationPreference
+
+logger = logging.getLogger('notifications')
+
+class DailyDigestPipeline:
+    """
+    Build and send the daily digests of many users at once.
+
+    Opted-in users are loaded with one query and every open task touching
+    any of them with a second one; tasks are then partitioned per recipient
+    in memory. Templates come from the shared email renderer and emails are
+    sent in chunks, each chunk over a single pooled SMTP connection.
+    """
+
+    def __init__(self, service=None, chunk_size=50, dry_run=False):
+        if service is None:
+            from .notification_service import EmailNotificationService
+            service = EmailNotificationService()
+        self.service = service
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.today = timezone.now().date()
+        self.stats = {
+            'recipients': 0,
+            'tasks_loaded': 0,
+            'emails_sent': 0,
+            'skipped': 0,
+            'failed': 0,
+        }
+
+    def run(self, users=None, window_minutes=None):
+        """
+        Send the digests of every opted-in user (or only the given users).
+        When window_minutes is set, only users whose preferred digest time is
+        within that many minutes of now are included.
+        Returns the run statistics.
+        """
+        started = time.monotonic()
+
+        if not self.service.enabled:
+            return self._finish(started)
+
+        recipients = self.load_recipients(users, window_minutes)
+        self.stats['recipients'] = len(recipients)
+
+        digests = self.partition_tasks(recipients, self.load_tasks(recipients))
+
+        for start in range(0, len(recipients), self.chunk_size):
+            chunk = recipients[start:start + self.chunk_size]
+            if self.dry_run:
+                self._count_chunk(chunk, digests)
+                continue
+            with self.service.batch():
+                for user in chunk:
+                    self._send_digest(user, digests[user.pk])
+
+        return self._finish(started)
+
+    def load_recipients(self, users=None, window_minutes=None):
+        """
+        Users with daily digest and email notifications enabled (one query)
+        """
+        preferences = NotificationPreference.objects.filter(
+            daily_digest_enabled=True,
+            email_notifications_enabled=True
+        ).select_related('user')
+        if users is not None:
+            preferences = preferences.filter(user__in=users)
+
+        if window_minutes is not None:
+            now = timezone.localtime().time()
+            now_minutes = now.hour * 60 + now.minute
+            preferences = [
+                preference for preference in preferences
+                if abs(now_minutes - (preference.digest_time.hour * 60 + preference.digest_time.minute))
+                <= window_minutes
+            ]
+
+        return [preference.user for preference in preferences]
+
+    def load_tasks(self, recipients):
+        """
+        Every open task created by or assigned to any of the recipients (one query)
+        """
+        user_ids = [user.pk for user in recipients]
+        if not user_ids:
+            return []
+        tasks = list(
+            Task.objects.filter(
+                Q(assigned_to_id__in=user_ids) | Q(created_by_id__in=user_ids),
+                status='new'
+            ).select_related('project', 'created_by', 'assigned_to')
+        )
+        self.stats['tasks_loaded'] = len(tasks)
+        return tasks
+
+    def partition_tasks(self, recipients, tasks):
+        """
+        Split the loaded tasks into the digest sections of each recipient
+        """
+        digests = {
+            user.pk: {
+                'assigned_tasks': [],
+                'created_tasks': [],
+                'overdue_tasks': [],
+                'due_today_tasks': [],
+            }
+            for user in recipients
+        }
+
+        for task in tasks:
+            for user_id in {task.assigned_to_id, task.created_by_id}:
+                digest = digests.get(user_id)
+                if digest is None:
+                    continue
+                if task.assigned_to_id == user_id:
+                    digest['assigned_tasks'].append(task)
+                if task.created_by_id == user_id:
+                    digest['created_tasks'].append(task)
+                if task.due_date and task.due_date < self.today:
+                    digest['overdue_tasks'].append(task)
+                elif task.due_date == self.today:
+                    digest['due_today_tasks'].append(task)
+
+        return digests
+
+    def _count_chunk(self, chunk, digests):
+        for user in chunk:
+            if any(digests[user.pk].values()):
+                self.stats['emails_sent'] += 1
+            else:
+                self.stats['skipped'] += 1
+
+    def _send_digest(self, user, digest):
+        """
+        Render and send the digest of one user; users without tasks are skipped
+        """
+        if not any(digest.values()):
+            self.stats['skipped'] += 1
+            return
+
+        context = {
+            'user': user,
+            **digest,
+            'site_name': self.service.site_name,
+            'site_url': self.service.site_url,
+            'user_name': user.name,
+            'today': self.today.strftime('%Y-%m-%d'),
+        }
+
+        try:
+            subject = self.service._render_subject('daily_digest', context)
+            html_content = self._render('daily_digest.html', context)
+            text_content = self._render('daily_digest.txt', context)
+
+            sent = self.service._send_email(
+                recipient=user,
+                subject=subject,
+                html_content=html_content,
+                text_content=text_content,
+                notification_type='daily_digest'
+            )
+        except Exception as e:
+            logger.error(f"Failed to send daily digest to {user.email}: {str(e)}")
+            sent = False
+
+        self.stats['emails_sent' if sent else 'failed'] += 1
+
+    def _render(self, template_name, context):
+        """
+        Render with the process-wide compiled template and pre-rendered layout
+        """
+        return self.service._render_email_template(template_name, context)
+
+    def _finish(self, started):
+        elapsed = time.monotonic() - started
+        self.stats['elapsed_seconds'] = round(elapsed, 3)
+        self.stats['tasks_per_second'] = round(self.stats['tasks_loaded'] / elapsed, 1) if elapsed else 0
+        self.stats['emails_per_second'] = round(self.stats['emails_sent'] / elapsed, 1) if elapsed else 0
+        logger.info(f"Daily digest run: {self.stats}")
+        return self.stats
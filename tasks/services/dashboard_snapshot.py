@@ -0,0 +1,136 @@
+# tasks/services/dashboard_snapshot.py
+# Per-user snapshot of the dashboard data (counters, next tasks, goals, feed) kept in the cache
+
+import logging
+from datetime import datetime
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from ..models import Task, MonthlyGoal
+from .task_stats import TaskStatsService
+from .activity_feed import get_activity_items
+
+logger = logging.getLogger('tasks')
+
+# Number of open tasks shown on the dashboard
+DASHBOARD_TASK_LIMIT = 8
+
+METRIC_KEYS = {
+    'hits': 'dashboard_snapshot:hits',
+    'misses': 'dashboard_snapshot:misses',
+}
+
+
+def get_snapshot_timeout():
+    """
+    Safety-net lifetime of a snapshot in seconds (TASK_SETTINGS); changes are
+    normally picked up at once through the version bump
+    """
+    return getattr(settings, 'TASK_SETTINGS', {}).get('DASHBOARD_CACHE_TIMEOUT', 60)
+
+
+def get_snapshot_version_key(user_id):
+    return f'dashboard_snapshot:version:{user_id}'
+
+
+def get_snapshot_version(user_id):
+    """
+    Current version of a user's dashboard; bumping it orphans the old snapshot
+    """
+    key = get_snapshot_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key, 1)
+    return version
+
+
+def get_snapshot_cache_key(user_id, version, day):
+    return f'dashboard_snapshot:{user_id}:{version}:{day.isoformat()}'
+
+
+def build_dashboard_snapshot(user, today=None):
+    """
+    Compute the dashboard data of a user from the database. Feed items are
+    only added on task saves, which also bump the user's version.
+    """
+    today = today or timezone.now().date()
+    my_tasks = Task.objects.filter(
+        Q(created_by=user) | Q(assigned_to=user)
+    ).filter(status='new').select_related(
+        'project', 'created_by', 'assigned_to'
+    ).with_permissions(user).order_by('due_date', '-created_at')[:DASHBOARD_TASK_LIMIT]
+
+    return {
+        'my_tasks': list(my_tasks),
+        'task_counters': TaskStatsService(user, cache_timeout=0).get_counters(),
+        'monthly_goals_count': MonthlyGoal.objects.filter(
+            employee=user,
+            year=datetime.now().year
+        ).count(),
+        'notifications': get_activity_items(user.pk),
+    }
+
+
+def get_dashboard_snapshot(user):
+    """
+    The dashboard data of a user, from the cache when its version is current
+    """
+    today = timezone.now().date()
+    key = get_snapshot_cache_key(user.pk, get_snapshot_version(user.pk), today)
+    snapshot = cache.get(key)
+    if snapshot is not None:
+        _count('hits')
+        return snapshot
+
+    _count('misses')
+    snapshot = build_dashboard_snapshot(user, today)
+    cache.set(key, snapshot, get_snapshot_timeout())
+    return snapshot
+
+
+def invalidate_dashboard_snapshot(*user_ids):
+    """
+    Bump the dashboard version of the given users so their next load rebuilds it
+    """
+    for user_id in set(user_ids):
+        if not user_id:
+            continue
+        key = get_snapshot_version_key(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # No version yet (or evicted): any new value differs from the cached snapshots'
+            cache.set(key, int(timezone.now().timestamp()), None)
+
+
+def get_snapshot_metrics():
+    """
+    Hit/miss counts of dashboard snapshots since the last reset, and the hit rate in percent
+    """
+    values = cache.get_many(METRIC_KEYS.values())
+    hits = values.get(METRIC_KEYS['hits'], 0)
+    misses = values.get(METRIC_KEYS['misses'], 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': (hits / total * 100) if total else 0,
+    }
+
+
+def reset_snapshot_metrics():
+    cache.delete_many(list(METRIC_KEYS.values()))
+
+
+def _count(metric):
+    key = METRIC_KEYS[metric]
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            logger.debug(f"Could not record dashboard snapshot {metric}")
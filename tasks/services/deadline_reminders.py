@@ -0,0 +1,233 @@
+# tasks/services/deadline_reminders.py
+# Set-based deadline reminder planner: select due tasks in SQL, plan in memory, write in bulk
+
+import logging
+from dataclasses import dataclass
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from ..models import Task
+from ..notification_models import EmailNotificationLog, TaskReminderTracker
+from .preference_store import get_preference_store
+from .live_events import publish_live_event
+from ..enhanced_deadline_tasks import (
+    create_deadline_content, create_deadline_context, get_task_recipients, is_weekend,
+)
+
+logger = logging.getLogger('notifications')
+
+# Days before the due date -> reminder type
+REMINDER_DAYS = {
+    3: 'three_days',
+    1: 'one_day',
+    0: 'same_day',
+}
+
+REMINDER_NOTIFICATION_TYPES = {
+    'three_days': 'task_due_in_3_days',
+    'one_day': 'task_due_tomorrow',
+    'same_day': 'task_due_today',
+}
+
+TRACKER_UPDATE_FIELDS = [
+    'three_days_reminder_sent', 'three_days_reminder_date',
+    'one_day_reminder_sent', 'one_day_reminder_date',
+    'same_day_reminder_sent', 'same_day_reminder_date',
+    'daily_reminder_count', 'last_reminder_date', 'updated_at',
+]
+
+
+@dataclass
+class PlannedReminder:
+    task: Task
+    user: object
+    tracker: TaskReminderTracker
+    reminder_type: str
+    days_remaining: int
+
+
+class DeadlineReminderPlanner:
+    """
+    Plan and send the 3-day / 1-day / same-day deadline reminders of a run.
+
+    Only tasks due today, tomorrow or in three days are loaded; preferences
+    and reminder trackers of every recipient are then loaded with one query
+    each and the whole plan is built in memory. After sending, trackers are
+    written with bulk_create/bulk_update and log rows with one bulk_create,
+    so the query count of a run does not grow with tasks x recipients.
+    """
+
+    def __init__(self, service=None, dry_run=False):
+        if service is None:
+            # The synchronous service: its batch() holds one pooled SMTP connection
+            # for the whole run (the Celery one sends each email in its own task)
+            from .notification_service import EmailNotificationService
+            service = EmailNotificationService()
+        self.service = service
+        self.dry_run = dry_run
+        self.today = timezone.now().date()
+        self.stats = {
+            'total_tasks_checked': 0,
+            'reminders_sent': 0,
+            'reminders_skipped': 0,
+            'reminders_failed': 0,
+            'errors': 0,
+        }
+
+    def run(self):
+        """
+        Build the reminder plan and send it (only count it on dry runs).
+        Returns the run statistics.
+        """
+        tasks = self.load_tasks()
+        self.stats['total_tasks_checked'] = len(tasks)
+
+        plan = self.build_plan(tasks)
+        if self.dry_run:
+            self.stats['reminders_sent'] = len(plan)
+        else:
+            self.execute(plan)
+
+        logger.info(f"إحصائيات تذكيرات المواعيد: {self.stats}")
+        return self.stats
+
+    def load_tasks(self):
+        """
+        Open tasks due in exactly 3, 1 or 0 days (one query on the open-tasks
+        partial index; Task has no in-progress status)
+        """
+        due_dates = [self.today + timedelta(days=days) for days in REMINDER_DAYS]
+        return list(
+            Task.objects.filter(
+                status='new',
+                due_date__in=due_dates
+            ).select_related('created_by', 'assigned_to', 'project')
+        )
+
+    def load_trackers(self, tasks):
+        """
+        Existing reminder trackers of the tasks keyed by (task_id, user_id) (one query)
+        """
+        trackers = TaskReminderTracker.objects.filter(task__in=tasks)
+        return {(tracker.task_id, tracker.user_id): tracker for tracker in trackers}
+
+    def build_plan(self, tasks):
+        """
+        Apply preferences, the weekend rule and tracker limits in memory and
+        return the reminders to send
+        """
+        recipients = {task.pk: get_task_recipients(task) for task in tasks}
+        user_ids = {user.pk for users in recipients.values() for user in users}
+        if not user_ids:
+            return []
+
+        preferences = get_preference_store().get_many(user_ids)
+        trackers = self.load_trackers(tasks)
+        weekend = is_weekend()
+
+        plan = []
+        for task in tasks:
+            days_remaining = (task.due_date - self.today).days
+            reminder_type = REMINDER_DAYS[days_remaining]
+
+            for user in recipients[task.pk]:
+                preference = preferences[user.pk]
+                if not preference.should_send_deadline_reminder(days_remaining):
+                    self.stats['reminders_skipped'] += 1
+                    continue
+                if weekend and not preference.is_weekend_reminder_allowed():
+                    self.stats['reminders_skipped'] += 1
+                    continue
+
+                tracker = trackers.get((task.pk, user.pk))
+                if tracker is None:
+                    tracker = TaskReminderTracker(task=task, user=user, daily_reminder_count=0)
+                if not tracker.can_send_reminder(
+                    reminder_type, preference.max_reminders_per_task, save=False
+                ):
+                    logger.debug(f"تم تجاوز حد التذكيرات للمستخدم {user.email} والمهمة {task.id}")
+                    self.stats['reminders_skipped'] += 1
+                    continue
+
+                plan.append(PlannedReminder(task, user, tracker, reminder_type, days_remaining))
+
+        return plan
+
+    def execute(self, plan):
+        """
+        Send the planned reminders over one pooled connection, then write
+        trackers and logs in bulk
+        """
+        sent_trackers = []
+        logs = []
+
+        with self.service.batch():
+            for item in plan:
+                log = self._send(item)
+                logs.append(log)
+                if log.status == 'sent':
+                    item.tracker.mark_reminder_sent(item.reminder_type, save=False)
+                    sent_trackers.append(item.tracker)
+
+        self.save_results(sent_trackers, logs)
+
+        for item, log in zip(plan, logs):
+            if log.status == 'sent':
+                publish_live_event([item.user.pk], 'task-deadline', {
+                    'task_id': item.task.pk,
+                    'task_name': item.task.name,
+                    'reminder_type': item.reminder_type,
+                    'days_remaining': item.days_remaining,
+                })
+
+    def save_results(self, trackers, logs):
+        """
+        Persist updated trackers and log rows (a constant number of queries)
+        """
+        now = timezone.now()
+        new_trackers = [tracker for tracker in trackers if tracker.pk is None]
+        changed_trackers = [tracker for tracker in trackers if tracker.pk is not None]
+        for tracker in changed_trackers:
+            tracker.updated_at = now
+
+        with transaction.atomic():
+            if new_trackers:
+                TaskReminderTracker.objects.bulk_create(new_trackers, ignore_conflicts=True)
+            if changed_trackers:
+                TaskReminderTracker.objects.bulk_update(changed_trackers, TRACKER_UPDATE_FIELDS)
+            if logs:
+                EmailNotificationLog.objects.bulk_create(logs)
+
+    def _send(self, item):
+        """
+        Render and send one reminder; returns its (unsaved) log row
+        """
+        task, user = item.task, item.user
+        log = EmailNotificationLog(
+            recipient=user,
+            sender=task.created_by,
+            notification_type=REMINDER_NOTIFICATION_TYPES[item.reminder_type],
+            subject=f"تذكير مهمة - {task.name}",
+            task=task,
+            is_reminder=True,
+        )
+
+        try:
+            context = create_deadline_context(task, user, item.days_remaining)
+            subject, html_content, text_content = create_deadline_content(
+                item.reminder_type, context, item.days_remaining
+            )
+            log.subject = subject[:log._meta.get_field('subject').max_length]
+            self.service._deliver_email(user, subject, html_content, text_content)
+        except Exception as e:
+            logger.error(f"خطأ في إرسال تذكير للمستخدم {user.email} للمهمة {task.id}: {str(e)}")
+            log.status = 'failed'
+            log.error_message = str(e)
+            self.stats['reminders_failed'] += 1
+            return log
+
+        log.status = 'sent'
+        log.sent_at = timezone.now()
+        self.stats['reminders_sent'] += 1
+        logger.info(f"تم إرسال تذكير {item.reminder_type} للمستخدم {user.email} للمهمة {task.id}")
+        return log
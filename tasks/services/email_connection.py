@@ -0,0 +1,263 @@
+# tasks/services/email_connection.py
+# Pooled, persistent email backend connections shared by the notification services
+
+import atexit
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.mail import get_connection
+
+logger = logging.getLogger('notifications')
+
+# SMTP reply code of a successful NOOP
+SMTP_OK = 250
+
+_pool = None
+_pool_lock = threading.Lock()
+_batch_state = threading.local()
+
+
+def get_email_pool_settings():
+    """
+    Connection pool settings from EMAIL_CONNECTION_POOL with defaults
+    """
+    pool_settings = getattr(settings, 'EMAIL_CONNECTION_POOL', {})
+    return {
+        'max_connections': pool_settings.get('MAX_CONNECTIONS', 2),
+        'idle_timeout': pool_settings.get('IDLE_TIMEOUT', 60),
+        'max_messages': pool_settings.get('MAX_MESSAGES_PER_CONNECTION', 100),
+        'acquire_timeout': pool_settings.get('ACQUIRE_TIMEOUT', 30),
+        'check_after_idle': pool_settings.get('CHECK_AFTER_IDLE', 10),
+    }
+
+
+class PooledConnection:
+    """
+    An open email backend connection with usage bookkeeping
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.last_used = time.monotonic()
+        self.message_count = 0
+        # Whether the connection is held by an email_batch (counted in the batch slots)
+        self.batch = False
+
+    def is_usable(self, idle_timeout, max_messages, check_after_idle=0):
+        """
+        Check the connection is fresh enough and still answers (NOOP for SMTP,
+        only once it has been idle for check_after_idle seconds)
+        """
+        idle = time.monotonic() - self.last_used
+        if idle > idle_timeout:
+            return False
+        if self.message_count >= max_messages:
+            return False
+
+        if not hasattr(self.backend, 'connection'):
+            # Non-SMTP backends (console, locmem) have nothing to check
+            return True
+        smtp = self.backend.connection
+        if smtp is None:
+            return False
+        if idle < check_after_idle:
+            # Used moments ago (e.g. by the previous message of a batch): skip the round trip
+            return True
+        if hasattr(smtp, 'noop'):
+            try:
+                return smtp.noop()[0] == SMTP_OK
+            except Exception:
+                return False
+        return True
+
+    def close(self):
+        try:
+            self.backend.close()
+        except Exception as e:
+            logger.debug(f"Error closing email connection: {str(e)}")
+
+
+class EmailConnectionPool:
+    """
+    Bounded pool of persistent email backend connections for one worker process.
+
+    Idle connections are reused (most recently used first), checked before
+    reuse and reopened after IDLE_TIMEOUT seconds or MAX_MESSAGES_PER_CONNECTION
+    messages, so a burst of emails pays the TLS handshake only once. Batches
+    hold their connection for the whole loop, so they may take all the
+    connections but one: single sends never wait for a batch to finish.
+    """
+
+    def __init__(self, max_connections, idle_timeout, max_messages, acquire_timeout, check_after_idle=0):
+        self.idle_timeout = idle_timeout
+        self.max_messages = max_messages
+        self.acquire_timeout = acquire_timeout
+        self.check_after_idle = check_after_idle
+        self.pid = os.getpid()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._batch_slots = threading.BoundedSemaphore(max(max_connections - 1, 1))
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self, batch=False):
+        """
+        Get an open connection, waiting for a free slot when the pool is exhausted
+        (batch connections also wait for one of the batch slots)
+        """
+        deadline = time.monotonic() + self.acquire_timeout
+        if batch and not self._batch_slots.acquire(timeout=self.acquire_timeout):
+            raise TimeoutError('No email connection available in the pool for a batch')
+        if not self._slots.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            if batch:
+                self._batch_slots.release()
+            raise TimeoutError('No email connection available in the pool')
+
+        try:
+            pooled = None
+            while pooled is None:
+                with self._lock:
+                    idle = self._idle.pop() if self._idle else None
+                if idle is None:
+                    backend = get_connection(fail_silently=False)
+                    backend.open()
+                    pooled = PooledConnection(backend)
+                elif idle.is_usable(self.idle_timeout, self.max_messages, self.check_after_idle):
+                    pooled = idle
+                else:
+                    idle.close()
+            pooled.batch = batch
+            return pooled
+        except Exception:
+            self._slots.release()
+            if batch:
+                self._batch_slots.release()
+            raise
+
+    def release(self, pooled, discard=False):
+        """
+        Return a connection to the pool (closing it when discard is set)
+        """
+        batch, pooled.batch = pooled.batch, False
+        try:
+            if discard:
+                pooled.close()
+            else:
+                pooled.last_used = time.monotonic()
+                with self._lock:
+                    self._idle.append(pooled)
+        finally:
+            self._slots.release()
+            if batch:
+                self._batch_slots.release()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for the duration of the block; broken connections are discarded
+        """
+        pooled = self.acquire()
+        try:
+            yield pooled
+        except Exception:
+            self.release(pooled, discard=True)
+            raise
+        else:
+            self.release(pooled)
+
+    def close_all(self):
+        """
+        Close every idle connection
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            pooled.close()
+
+
+def get_email_connection_pool():
+    """
+    Get the connection pool of the current process (recreated after a fork)
+    """
+    global _pool
+    if _pool is None or _pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool.pid != os.getpid():
+                _pool = EmailConnectionPool(**get_email_pool_settings())
+    return _pool
+
+
+@contextmanager
+def email_batch():
+    """
+    Send every email of the block (in this thread) through one pooled connection,
+    acquired on the first send. Batch senders wrap their loops with it; nested
+    batches share the outer connection.
+    """
+    if getattr(_batch_state, 'depth', 0):
+        _batch_state.depth += 1
+        try:
+            yield
+        finally:
+            _batch_state.depth -= 1
+        return
+
+    _batch_state.depth = 1
+    _batch_state.connection = None
+    try:
+        yield
+    finally:
+        pooled = _batch_state.connection
+        _batch_state.connection = None
+        _batch_state.depth = 0
+        if pooled is not None:
+            get_email_connection_pool().release(pooled)
+
+
+def send_email_message(message):
+    """
+    Send an EmailMessage through the current batch connection or a pooled one
+    """
+    if not getattr(_batch_state, 'depth', 0):
+        with get_email_connection_pool().connection() as pooled:
+            return _send_with(pooled, message)
+
+    pool = get_email_connection_pool()
+    pooled = _batch_state.connection
+    if pooled is None:
+        pooled = _batch_state.connection = pool.acquire(batch=True)
+    elif not pooled.is_usable(pool.idle_timeout, pool.max_messages, pool.check_after_idle):
+        # Recycle the batch connection (server dropped it or message limit reached)
+        _reopen(pooled)
+    try:
+        return _send_with(pooled, message)
+    except Exception:
+        # Reconnect so the rest of the batch can continue, then report this failure
+        try:
+            _reopen(pooled)
+        except Exception as e:
+            logger.warning(f"Could not reopen email connection: {str(e)}")
+        raise
+
+
+def _reopen(pooled):
+    pooled.close()
+    pooled.backend.open()
+    pooled.message_count = 0
+    pooled.last_used = time.monotonic()
+
+
+def _send_with(pooled, message):
+    message.connection = pooled.backend
+    sent = message.send()
+    pooled.message_count += 1
+    pooled.last_used = time.monotonic()
+    return sent
+
+
+@atexit.register
+def _close_email_connections():
+    if _pool is not None and _pool.pid == os.getpid():
+        _pool.close_all()
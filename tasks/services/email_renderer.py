@@ -0,0 +1,139 @@
+# tasks/services/email_renderer.py
+# Email rendering with templates compiled once per process and the base layout pre-rendered
+
+import logging
+import threading
+from django.template import Context, engines
+from django.template.loader import get_template
+from django.template.loader_tags import ExtendsNode
+
+logger = logging.getLogger('notifications')
+
+# Context keys read by the static layout (base_email.html); the pre-rendered
+# layout is keyed by their values
+CHROME_CONTEXT_KEYS = (
+    'site_name', 'logo_url', 'company_name', 'company_address', 'support_email',
+)
+
+TITLE_MARKER = '<!--email-title-->'
+CONTENT_MARKER = '<!--email-content-->'
+
+_LAYOUT_PROBE = (
+    "{% extends parent %}"
+    "{% block title %}" + TITLE_MARKER + "{% endblock %}"
+    "{% block content %}" + CONTENT_MARKER + "{% endblock %}"
+)
+
+
+class CompiledEmail:
+    """
+    One email template compiled once.
+
+    For templates extending a layout, only their title and content blocks are
+    rendered per recipient and spliced into the layout rendered beforehand.
+    Other templates (plain text) are rendered as a whole.
+    """
+
+    def __init__(self, template):
+        self.template = template
+        self.parent_name = None
+        self.blocks = {}
+
+        extends = template.template.nodelist.get_nodes_by_type(ExtendsNode)
+        if extends and extends[0].parent_name.var is not None:
+            self.parent_name = extends[0].parent_name.resolve(Context())
+            self.blocks = extends[0].blocks
+
+    def render_block(self, name, context):
+        block = self.blocks.get(name)
+        if block is None:
+            return None
+        engine = self.template.template.engine
+        ctx = Context(context, autoescape=engine.autoescape)
+        with ctx.render_context.push_state(self.template.template), ctx.bind_template(self.template.template):
+            return block.nodelist.render(ctx)
+
+
+class EmailRenderer:
+    """
+    Render notification emails at bulk speed.
+
+    Templates are looked up and compiled once per process; the layout
+    (CSS, header, footer of base_email.html) is rendered once per distinct
+    set of layout values, split around its title/content blocks and reused,
+    so each email only renders its own fragment.
+    """
+
+    def __init__(self):
+        self._compiled = {}
+        self._layouts = {}
+        self._lock = threading.Lock()
+
+    def render(self, template_name, context):
+        """
+        Render emails/<template_name> with the given context dict
+        """
+        compiled = self.get_compiled(template_name)
+        if compiled.parent_name is None:
+            return compiled.template.render(context)
+
+        layout = self.get_layout(compiled.parent_name, context)
+        if layout is None:
+            return compiled.template.render(context)
+
+        head, middle, tail = layout
+        title = compiled.render_block('title', context)
+        content = compiled.render_block('content', context)
+        if title is None or content is None:
+            return compiled.template.render(context)
+        return ''.join((head, title, middle, content, tail))
+
+    def get_compiled(self, template_name):
+        compiled = self._compiled.get(template_name)
+        if compiled is None:
+            compiled = CompiledEmail(get_template(f'emails/{template_name}'))
+            with self._lock:
+                self._compiled[template_name] = compiled
+        return compiled
+
+    def get_layout(self, parent_name, context):
+        """
+        The layout rendered around markers and split into (head, middle, tail),
+        or None when the layout cannot be split
+        """
+        chrome = tuple(context.get(key) for key in CHROME_CONTEXT_KEYS)
+        key = (parent_name, chrome)
+        if key in self._layouts:
+            return self._layouts[key]
+
+        probe = engines['django'].from_string(_LAYOUT_PROBE)
+        chrome_context = {name: value for name, value in zip(CHROME_CONTEXT_KEYS, chrome) if value is not None}
+        rendered = probe.render({**chrome_context, 'parent': parent_name})
+
+        head, title_marker, rest = rendered.partition(TITLE_MARKER)
+        middle, content_marker, tail = rest.partition(CONTENT_MARKER)
+        layout = (head, middle, tail) if title_marker and content_marker else None
+        if layout is None:
+            logger.warning(f"Email layout {parent_name} has no title/content blocks, rendering in full")
+
+        with self._lock:
+            self._layouts[key] = layout
+        return layout
+
+    def clear(self):
+        """
+        Forget compiled templates and layouts (after templates changed on disk)
+        """
+        with self._lock:
+            self._compiled = {}
+            self._layouts = {}
+
+
+email_renderer = EmailRenderer()
+
+
+def get_email_renderer():
+    """
+    Get the email renderer of the current process
+    """
+    return email_renderer
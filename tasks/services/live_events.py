@@ -0,0 +1,264 @@
+# tasks/services/live_events.py
+# Live task/notification events for the Server-Sent Events stream: an in-process
+# pub/sub hub, relayed between processes over Redis or Postgres LISTEN/NOTIFY
+
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger('notifications')
+
+# Channel used by the Redis and Postgres relays
+CHANNEL = 'live_events'
+
+
+def get_live_events_settings():
+    return getattr(settings, 'LIVE_EVENTS_SETTINGS', {})
+
+
+class RedisRelay:
+    """
+    Relay events between processes with Redis pub/sub
+    """
+
+    name = 'redis'
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    def publish(self, message):
+        self.client.publish(CHANNEL, message)
+
+    def listen(self, callback):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(CHANNEL)
+        try:
+            for message in pubsub.listen():
+                callback(message['data'])
+        finally:
+            pubsub.close()
+
+
+class PostgresRelay:
+    """
+    Relay events between processes with Postgres LISTEN/NOTIFY
+    (payloads are limited to 8000 bytes, events stay small)
+    """
+
+    name = 'postgres'
+
+    def publish(self, message):
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, message])
+
+    def listen(self, callback):
+        # A dedicated connection outside Django's per-thread connection handling
+        wrapper = connections.create_connection(DEFAULT_DB_ALIAS)
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        raw.autocommit = True
+        try:
+            with raw.cursor() as cursor:
+                cursor.execute(f'LISTEN {CHANNEL}')
+            while True:
+                if select.select([raw], [], [], 30) == ([], [], []):
+                    continue
+                raw.poll()
+                while raw.notifies:
+                    callback(raw.notifies.pop(0).payload)
+        finally:
+            wrapper.close()
+
+
+def get_relay(allow_redis=True):
+    """
+    The cross-process relay configured by LIVE_EVENTS_SETTINGS['BACKEND']:
+    'redis', 'postgres', 'memory' (this process only) or 'auto' (Redis in
+    production when LIVE_EVENTS_SETTINGS['REDIS_URL'] is set and the client
+    library is installed, else Postgres when it is the database, else memory)
+    """
+    live_settings = get_live_events_settings()
+    backend = live_settings.get('BACKEND', 'auto')
+    if backend == 'redis':
+        redis_url = live_settings.get('REDIS_URL') or getattr(settings, 'REDIS_URL', None)
+    else:
+        # settings.REDIS_URL has a localhost default; auto only uses an explicit URL
+        redis_url = live_settings.get('REDIS_URL') if not settings.DEBUG else None
+
+    if allow_redis and redis_url and backend in ('redis', 'auto'):
+        try:
+            return RedisRelay(redis_url)
+        except ImportError:
+            if backend == 'redis':
+                logger.warning("Live events: redis is not installed, falling back to in-process delivery")
+
+    if backend in ('postgres', 'auto') and connections[DEFAULT_DB_ALIAS].vendor == 'postgresql':
+        return PostgresRelay()
+
+    return None
+
+
+class LiveEventHub:
+    """
+    Deliver events to the SSE streams of this process.
+
+    Each open stream subscribes an asyncio queue for its user. Events are
+    published from synchronous code (signals, Celery tasks); with a relay they
+    go through Redis/Postgres and a listener thread hands them to the local
+    queues, without a relay they are handed over directly (single process).
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self._relay = None
+        self._relay_loaded = False
+        self._listener = None
+
+    @property
+    def relay(self):
+        if not self._relay_loaded:
+            self._relay = get_relay()
+            self._relay_loaded = True
+        return self._relay
+
+    def publish(self, user_id, event_type, data):
+        """
+        Send an event to every open stream of a user (in any process)
+        """
+        if not user_id:
+            return
+        message = json.dumps({'user_id': user_id, 'type': event_type, 'data': data}, default=str)
+        relay = self.relay
+        if relay is None:
+            self._dispatch(message)
+            return
+        try:
+            relay.publish(message)
+        except Exception as e:
+            logger.error(f"Live events: could not publish {event_type} over {relay.name}: {str(e)}")
+            if self._fall_back(relay):
+                self.publish(user_id, event_type, data)
+
+    def _fall_back(self, relay):
+        """
+        Replace an unreachable Redis chosen by 'auto' with the next relay
+        (Postgres or in-process); returns True when the relay changed
+        """
+        if relay.name != 'redis' or get_live_events_settings().get('BACKEND', 'auto') != 'auto':
+            return False
+        with self._lock:
+            if self._relay is relay:
+                self._relay = get_relay(allow_redis=False)
+                logger.warning(
+                    "Live events: Redis is unreachable, falling back to "
+                    f"{self._relay.name if self._relay else 'in-process delivery'}"
+                )
+        return True
+
+    def subscribe(self, user_id):
+        """
+        Open a queue receiving the events of a user; call from the stream's event loop
+        """
+        queue = asyncio.Queue(maxsize=get_live_events_settings().get('QUEUE_SIZE', 100))
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers[user_id].add(subscriber)
+        self._ensure_listener()
+        return subscriber
+
+    def unsubscribe(self, user_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def _dispatch(self, message):
+        try:
+            event = json.loads(message)
+            user_id = event.pop('user_id')
+        except (TypeError, ValueError, KeyError):
+            logger.warning("Live events: ignoring malformed message")
+            return
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:
+                # The stream's loop is closed; it unsubscribes on its way out
+                pass
+
+    def _ensure_listener(self):
+        if self.relay is None or (self._listener is not None and self._listener.is_alive()):
+            return
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(
+                target=self._listen_forever, name='live-events-listener', daemon=True
+            )
+            self._listener.start()
+
+    def _listen_forever(self):
+        delay = 1
+        while True:
+            relay = self.relay
+            if relay is None:
+                # Fell back to in-process delivery, nothing to listen to
+                return
+            try:
+                relay.listen(self._dispatch)
+                delay = 1
+            except Exception as e:
+                if self._fall_back(relay):
+                    continue
+                logger.error(f"Live events: {relay.name} listener failed, retrying in {delay}s: {str(e)}")
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+
+
+def _offer(queue, event):
+    """
+    Put an event on a stream queue, dropping the oldest one if the client is too slow
+    """
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+live_event_hub = LiveEventHub()
+
+
+def get_live_event_hub():
+    """
+    Get the live event hub of the current process
+    """
+    return live_event_hub
+
+
+def format_sse(event):
+    """
+    One Server-Sent Events frame for an event
+    """
+    data = json.dumps(event['data'], ensure_ascii=False, default=str)
+    return f"event: {event['type']}\ndata: {data}\n\n"
+
+
+def publish_live_event(user_ids, event_type, data):
+    """
+    Publish an event to each of the given users (duplicates and empty ids are skipped)
+    """
+    hub = get_live_event_hub()
+    for user_id in dict.fromkeys(user_ids):
+        if user_id:
+            hub.publish(user_id, event_type, data)
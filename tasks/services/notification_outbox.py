@@ -0,0 +1,178 @@
+# tasks/services/notification_outbox.py
+# Transactional outbox for task notifications, drained after commit
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from ..notification_models import NotificationOutbox
+from .notification_service import EmailNotificationService
+
+logger = logging.getLogger('notifications')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_outbox_settings():
+    """
+    Outbox settings from NOTIFICATION_SETTINGS with defaults
+    """
+    notification_settings = getattr(settings, 'NOTIFICATION_SETTINGS', {})
+    return {
+        'max_attempts': notification_settings.get('OUTBOX_MAX_ATTEMPTS', 5),
+        'retry_delay_seconds': notification_settings.get('OUTBOX_RETRY_DELAY_SECONDS', 60),
+        'stale_minutes': notification_settings.get('OUTBOX_STALE_MINUTES', 10),
+        'batch_size': notification_settings.get('OUTBOX_BATCH_SIZE', 100),
+        'thread_workers': notification_settings.get('OUTBOX_THREAD_WORKERS', 2),
+    }
+
+
+def enqueue_task_notification(notification_type, task, recipient_id=None, actor_id=None):
+    """
+    Write a notification to the outbox in the current transaction and
+    dispatch it once the transaction commits
+    """
+    entry = NotificationOutbox.objects.create(
+        notification_type=notification_type,
+        task=task,
+        recipient_id=recipient_id,
+        actor_id=actor_id,
+    )
+    transaction.on_commit(lambda: dispatch_outbox_entries([entry.pk]))
+    return entry
+
+
+def dispatch_outbox_entries(entry_ids):
+    """
+    Hand committed outbox entries to a Celery worker, or to the local
+    thread pool when Celery is not used (or the broker is unreachable).
+    Entries that are never dispatched stay pending for the periodic drain.
+    """
+    if getattr(settings, 'USE_CELERY_FOR_EMAILS', False):
+        try:
+            from ..tasks import process_notification_outbox_task
+            process_notification_outbox_task.delay(entry_ids)
+            return
+        except Exception as e:
+            logger.warning(f"Celery unavailable for outbox dispatch, using local workers: {str(e)}")
+
+    _get_executor().submit(_process_in_thread, entry_ids)
+
+
+def _get_executor():
+    """
+    Lazily create the process-wide thread pool used to send notifications
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=get_outbox_settings()['thread_workers'],
+                    thread_name_prefix='notification-outbox',
+                )
+    return _executor
+
+
+def _process_in_thread(entry_ids):
+    """
+    Thread pool entry point: process entries then release this thread's DB connections
+    """
+    try:
+        process_outbox_entries(entry_ids)
+    except Exception as e:
+        logger.error(f"Error processing notification outbox: {str(e)}")
+    finally:
+        connections.close_all()
+
+
+def requeue_stale_outbox_entries():
+    """
+    Put back entries left in processing by a crashed worker
+    """
+    stale_before = timezone.now() - timedelta(minutes=get_outbox_settings()['stale_minutes'])
+    requeued = NotificationOutbox.objects.filter(
+        status='processing',
+        locked_at__lt=stale_before,
+    ).update(status='pending', locked_at=None)
+    if requeued:
+        logger.warning(f"Requeued {requeued} stale notification outbox entries")
+    return requeued
+
+
+def process_outbox_entries(entry_ids=None):
+    """
+    Send pending outbox entries (all due entries when entry_ids is None).
+    Each entry is claimed with a conditional UPDATE so concurrent workers
+    never send the same notification twice.
+    Returns a dict of counts per resulting status.
+    """
+    outbox_settings = get_outbox_settings()
+    queryset = NotificationOutbox.objects.filter(status='pending', next_attempt_at__lte=timezone.now())
+    if entry_ids is not None:
+        queryset = queryset.filter(pk__in=entry_ids)
+    pending_ids = list(queryset.values_list('pk', flat=True)[:outbox_settings['batch_size']])
+
+    results = {}
+    if not pending_ids:
+        return results
+
+    service = EmailNotificationService(raise_on_error=True)
+
+    with service.batch():
+        for entry_id in pending_ids:
+            claimed = NotificationOutbox.objects.filter(pk=entry_id, status='pending').update(
+                status='processing',
+                attempts=F('attempts') + 1,
+                locked_at=timezone.now(),
+            )
+            if not claimed:
+                continue
+
+            entry = NotificationOutbox.objects.select_related(
+                'task__project', 'task__created_by', 'task__assigned_to', 'recipient', 'actor'
+            ).get(pk=entry_id)
+            status = _deliver(entry, service, outbox_settings)
+            results[status] = results.get(status, 0) + 1
+
+    logger.info(f"Processed notification outbox: {results}")
+    return results
+
+
+def _deliver(entry, service, outbox_settings):
+    """
+    Send one outbox entry and record the outcome on it
+    """
+    try:
+        if entry.notification_type == 'task_assigned':
+            sent = service.send_task_assigned_notification(
+                task=entry.task,
+                assignee=entry.recipient,
+                assigner=entry.actor
+            )
+        elif entry.notification_type == 'task_completed':
+            sent = service.send_task_completed_notification(
+                task=entry.task,
+                completer=entry.actor
+            )
+        else:
+            raise ValueError(f"Unknown outbox notification type {entry.notification_type}")
+    except Exception as e:
+        logger.error(f"Failed to send outbox notification {entry.pk}: {str(e)}")
+        entry.mark_for_retry(
+            str(e),
+            outbox_settings['max_attempts'],
+            outbox_settings['retry_delay_seconds']
+        )
+        return entry.status
+
+    if sent:
+        entry.mark_as_sent()
+    else:
+        entry.mark_as_skipped()
+    return entry.status
@@ -2,9 +2,9 @@
 # Create this new file for email notification services
 
 import logging
+from contextlib import nullcontext
 from datetime import datetime, timedelta
 from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
 from django.conf import settings
 from django.utils import timezone
 from django.contrib.auth import get_user_model
@@ -14,21 +14,38 @@ from ..notification_models import (
     NotificationTemplate
 )
 from ..models import Task
+from .email_connection import email_batch, send_email_message
+from .template_registry import get_template_registry
+from .preference_store import get_preference_store
+from .email_renderer import get_email_renderer
 
 Employee = get_user_model()
 logger = logging.getLogger('notifications')
 
+# Returned by send_task_overdue_notification when nothing had to be sent
+# (notifications disabled or every recipient opted out), as opposed to a failure
+NOTIFICATION_SKIPPED = 'skipped'
+
 class EmailNotificationService:
     """
     Service class for handling email notifications
     """
     
-    def __init__(self):
+    def __init__(self, raise_on_error=False):
+        # When raise_on_error is set, send failures are raised (after being logged)
+        # instead of returning False, so callers such as the outbox can retry
+        self.raise_on_error = raise_on_error
         self.from_email = getattr(settings, 'TASK_NOTIFICATION_FROM_EMAIL', settings.DEFAULT_FROM_EMAIL)
         self.enabled = getattr(settings, 'TASK_NOTIFICATION_ENABLED', True)
         self.site_url = getattr(settings, 'SITE_URL', 'http://localhost:8000')
         self.site_name = getattr(settings, 'SITE_NAME', 'نظام إدارة جمعية إعمار')
     
+    def batch(self):
+        """
+        Context manager sending every email of a loop through one pooled SMTP connection
+        """
+        return email_batch()
+    
     def send_task_assigned_notification(self, task, assignee, assigner):
         """
         Send notification when a task is assigned to someone
@@ -38,7 +55,7 @@ class EmailNotificationService:
             return False
         
         # Check user preferences
-        preferences = NotificationPreference.get_or_create_for_user(assignee)
+        preferences = get_preference_store().get(assignee)
         if not preferences.task_assigned_email or not preferences.email_notifications_enabled:
             logger.info(f"Task assigned email disabled for user {assignee.email}")
             return False
@@ -58,11 +75,8 @@ class EmailNotificationService:
             'project_name': task.project.name if task.project else 'غير محدد',
         }
         
-        # Get or create template
-        template = self._get_or_create_template('task_assigned')
-        
-        # Render email content
-        subject = template.render_subject(context)
+        # Render email content (templates come from the in-process registry)
+        subject = self._render_subject('task_assigned', context)
         html_content = self._render_email_template('task_assigned.html', context)
         text_content = self._render_email_template('task_assigned.txt', context)
         
@@ -92,7 +106,7 @@ class EmailNotificationService:
             return False
         
         # Check user preferences
-        preferences = NotificationPreference.get_or_create_for_user(task_creator)
+        preferences = get_preference_store().get(task_creator)
         if not preferences.task_completed_email or not preferences.email_notifications_enabled:
             logger.info(f"Task completed email disabled for user {task_creator.email}")
             return False
@@ -112,11 +126,8 @@ class EmailNotificationService:
             'project_name': task.project.name if task.project else 'غير محدد',
         }
         
-        # Get or create template
-        template = self._get_or_create_template('task_completed')
-        
-        # Render email content
-        subject = template.render_subject(context)
+        # Render email content (templates come from the in-process registry)
+        subject = self._render_subject('task_completed', context)
         html_content = self._render_email_template('task_completed.html', context)
         text_content = self._render_email_template('task_completed.txt', context)
         
@@ -133,10 +144,11 @@ class EmailNotificationService:
     
     def send_task_overdue_notification(self, task):
         """
-        Send notification when a task is overdue
+        Send notification when a task is overdue.
+        Returns NOTIFICATION_SKIPPED when no recipient wants the email.
         """
         if not self.enabled:
-            return False
+            return NOTIFICATION_SKIPPED
         
         # Send to both creator and assignee
         recipients = []
@@ -148,7 +160,7 @@ class EmailNotificationService:
         results = []
         for recipient in recipients:
             # Check user preferences
-            preferences = NotificationPreference.get_or_create_for_user(recipient)
+            preferences = get_preference_store().get(recipient)
             if not preferences.task_overdue_email or not preferences.email_notifications_enabled:
                 continue
             
@@ -166,11 +178,8 @@ class EmailNotificationService:
                 'project_name': task.project.name if task.project else 'غير محدد',
             }
             
-            # Get or create template
-            template = self._get_or_create_template('task_overdue')
-            
-            # Render email content
-            subject = template.render_subject(context)
+            # Render email content (templates come from the in-process registry)
+            subject = self._render_subject('task_overdue', context)
             html_content = self._render_email_template('task_overdue.html', context)
             text_content = self._render_email_template('task_overdue.txt', context)
             
@@ -185,82 +194,25 @@ class EmailNotificationService:
             )
             results.append(result)
         
+        if not results:
+            return NOTIFICATION_SKIPPED
         return all(results)
     
     def send_daily_digest(self, user):
         """
         Send daily digest of tasks to user
+        (single-user run of the batched DailyDigestPipeline)
         """
-        if not self.enabled:
-            return False
-        
-        # Check user preferences
-        preferences = NotificationPreference.get_or_create_for_user(user)
-        if not preferences.daily_digest_enabled or not preferences.email_notifications_enabled:
-            return False
+        from .daily_digest import DailyDigestPipeline
         
-        # Get user's tasks
-        today = timezone.now().date()
-        
-        # Tasks assigned to user
-        assigned_tasks = Task.objects.filter(
-            assigned_to=user,
-            status='new'
-        ).select_related('project', 'created_by')
-        
-        # Tasks created by user
-        created_tasks = Task.objects.filter(
-            created_by=user,
-            status='new'
-        ).select_related('project', 'assigned_to')
-        
-        # Overdue tasks
-        overdue_tasks = Task.objects.filter(
-            models.Q(assigned_to=user) | models.Q(created_by=user),
-            status='new',
-            due_date__lt=today
-        ).select_related('project', 'created_by', 'assigned_to')
-        
-        # Due today tasks
-        due_today_tasks = Task.objects.filter(
-            models.Q(assigned_to=user) | models.Q(created_by=user),
-            status='new',
-            due_date=today
-        ).select_related('project', 'created_by', 'assigned_to')
-        
-        # If no tasks, don't send digest
-        if not any([assigned_tasks, created_tasks, overdue_tasks, due_today_tasks]):
+        if not self.enabled:
             return False
         
-        # Prepare context
-        context = {
-            'user': user,
-            'assigned_tasks': assigned_tasks,
-            'created_tasks': created_tasks,
-            'overdue_tasks': overdue_tasks,
-            'due_today_tasks': due_today_tasks,
-            'site_name': self.site_name,
-            'site_url': self.site_url,
-            'user_name': user.name,
-            'today': today.strftime('%Y-%m-%d'),
-        }
-        
-        # Get or create template
-        template = self._get_or_create_template('daily_digest')
+        # Make sure the user has preferences before the pipeline filters on them
+        get_preference_store().get(user)
         
-        # Render email content
-        subject = template.render_subject(context)
-        html_content = self._render_email_template('daily_digest.html', context)
-        text_content = self._render_email_template('daily_digest.txt', context)
-        
-        # Send email
-        return self._send_email(
-            recipient=user,
-            subject=subject,
-            html_content=html_content,
-            text_content=text_content,
-            notification_type='daily_digest'
-        )
+        stats = DailyDigestPipeline(service=self).run(users=[user])
+        return stats['emails_sent'] > 0
     
     def _send_email(self, recipient, subject, html_content, text_content, 
                    notification_type, task=None, sender=None):
@@ -274,26 +226,11 @@ class EmailNotificationService:
                 sender=sender,
                 notification_type=notification_type,
                 subject=subject,
-                content=text_content,
                 task=task,
-                to_email=recipient.email,
-                from_email=self.from_email,
                 status='pending'
             )
             
-            # Create email message
-            email = EmailMultiAlternatives(
-                subject=subject,
-                body=text_content,
-                from_email=self.from_email,
-                to=[recipient.email],
-            )
-            
-            # Attach HTML version
-            email.attach_alternative(html_content, "text/html")
-            
-            # Send email
-            email.send()
+            self._deliver_email(recipient, subject, html_content, text_content)
             
             # Mark as sent
             log_entry.mark_as_sent()
@@ -305,14 +242,34 @@ class EmailNotificationService:
             logger.error(f"Failed to send email to {recipient.email}: {str(e)}")
             if 'log_entry' in locals():
                 log_entry.mark_as_failed(str(e))
+            if self.raise_on_error:
+                raise
             return False
     
+    def _deliver_email(self, recipient, subject, html_content, text_content):
+        """
+        Build and send the email without logging it (raises on failure).
+        Batch senders that write their logs in bulk call this directly.
+        """
+        email = EmailMultiAlternatives(
+            subject=subject,
+            body=text_content,
+            from_email=self.from_email,
+            to=[recipient.email],
+        )
+        
+        # Attach HTML version
+        email.attach_alternative(html_content, "text/html")
+        
+        # Send email through the pooled connection (or the current batch connection)
+        send_email_message(email)
+    
     def _render_email_template(self, template_name, context):
         """
-        Render email template with context
+        Render email template with context (compiled once, layout pre-rendered)
         """
         try:
-            return render_to_string(f'emails/{template_name}', context)
+            return get_email_renderer().render(template_name, context)
         except Exception as e:
             logger.error(f"Failed to render template {template_name}: {str(e)}")
             # Return a basic template as fallback
@@ -334,15 +291,20 @@ class EmailNotificationService:
     
     def _get_or_create_template(self, template_type):
         """
-        Get or create notification template
+        Get notification template from the in-process registry
+        (created with the default content on a miss)
         """
-        try:
-            return NotificationTemplate.objects.get(
-                template_type=template_type,
-                is_active=True
-            )
-        except NotificationTemplate.DoesNotExist:
-            return self._create_default_template(template_type)
+        template = get_template_registry().get(template_type)
+        if template is None:
+            template = self._create_default_template(template_type)
+        return template
+    
+    def _render_subject(self, template_type, context):
+        """
+        Render the subject of a template type with its compiled subject template
+        """
+        template = self._get_or_create_template(template_type)
+        return get_template_registry().render_subject(template, context)
     
     def _create_default_template(self, template_type):
         """
@@ -508,6 +470,10 @@ class AsyncEmailNotificationService(EmailNotificationService):
     Async version of email notification service using Celery
     """
     
+    def batch(self):
+        """Emails are sent by Celery workers, which use their own pooled connections"""
+        return nullcontext()
+    
     def send_task_assigned_notification(self, task, assignee, assigner):
         """Send async task assigned notification"""
         from .tasks import send_task_assigned_email_task
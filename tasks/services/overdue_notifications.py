@@ -0,0 +1,120 @@
+# tasks/services/overdue_notifications.py
+# Set-based selection and chunked sending of overdue task notifications
+
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from ..models import Task
+from ..notification_models import EmailNotificationLog
+from .preference_store import get_preference_store
+from .live_events import publish_live_event
+
+logger = logging.getLogger('notifications')
+
+
+def get_overdue_chunk_size():
+    """
+    Number of overdue tasks handled by one worker task (NOTIFICATION_SETTINGS)
+    """
+    return getattr(settings, 'NOTIFICATION_SETTINGS', {}).get('OVERDUE_CHUNK_SIZE', 100)
+
+
+def get_overdue_tasks_to_notify(cutoff_date=None, force=False, renotify_hours=24):
+    """
+    Open tasks due before cutoff_date (today by default) without a sent
+    overdue notification in the last renotify_hours.
+    The "already notified" test is a single NOT EXISTS anti-join, so the
+    query cost does not grow with one extra lookup per overdue task.
+    """
+    if cutoff_date is None:
+        cutoff_date = timezone.now().date()
+
+    queryset = Task.objects.filter(status='new', due_date__lt=cutoff_date)
+
+    if not force:
+        recently_notified = EmailNotificationLog.objects.filter(
+            task=OuterRef('pk'),
+            notification_type='task_overdue',
+            status='sent',
+            created_at__gte=timezone.now() - timedelta(hours=renotify_hours)
+        )
+        queryset = queryset.filter(~Exists(recently_notified))
+
+    return queryset.order_by('pk')
+
+
+def iter_overdue_task_id_chunks(chunk_size=None, **filters):
+    """
+    Stream the ids of the tasks to notify in lists of chunk_size
+    """
+    chunk_size = chunk_size or get_overdue_chunk_size()
+    chunk = []
+    ids = get_overdue_tasks_to_notify(**filters).values_list('pk', flat=True)
+    for task_id in ids.iterator(chunk_size=2000):
+        chunk.append(task_id)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def send_overdue_notifications(task_ids, service=None):
+    """
+    Load one chunk of overdue tasks with a single query and send their
+    notifications over one pooled SMTP connection.
+    Tasks completed since the chunk was queued, and tasks whose recipients
+    all opted out, are skipped.
+    Returns a dict with sent, skipped and failed counts.
+    """
+    from .notification_service import NOTIFICATION_SKIPPED
+    if service is None:
+        from .notification_service import EmailNotificationService
+        service = EmailNotificationService()
+
+    tasks = list(
+        Task.objects.filter(
+            pk__in=task_ids,
+            status='new'
+        ).select_related('project', 'created_by', 'assigned_to')
+    )
+
+    # Preferences of every recipient in the chunk with one query
+    preferences = get_preference_store().get_many(
+        user_id for task in tasks for user_id in (task.created_by_id, task.assigned_to_id)
+    )
+
+    results = {'sent': 0, 'skipped': len(task_ids), 'failed': 0}
+    with service.batch():
+        for task in tasks:
+            results['skipped'] -= 1
+            try:
+                sent = service.send_task_overdue_notification(task)
+            except Exception as e:
+                logger.error(f"Failed to send overdue notification for task {task.pk}: {str(e)}")
+                sent = False
+            if sent == NOTIFICATION_SKIPPED:
+                results['skipped'] += 1
+                continue
+            if not sent:
+                results['failed'] += 1
+                continue
+            results['sent'] += 1
+
+            # Only the recipients who were emailed get the live toast
+            recipient_ids = [
+                user_id for user_id in {task.created_by_id, task.assigned_to_id}
+                if user_id is not None
+                and preferences[user_id].task_overdue_email
+                and preferences[user_id].email_notifications_enabled
+            ]
+            publish_live_event(recipient_ids, 'task-deadline', {
+                'task_id': task.pk,
+                'task_name': task.name,
+                'reminder_type': 'overdue',
+                'days_remaining': (task.due_date - timezone.now().date()).days,
+            })
+
+    return results
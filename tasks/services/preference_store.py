@@ -0,0 +1,168 @@
+# tasks/services/preference_store.py
+# Process-wide cache of NotificationPreference rows, bulk loaded and invalidated through signals
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from ..notification_models import NotificationPreference
+
+logger = logging.getLogger('notifications')
+
+PREFERENCE_VERSION_CACHE_KEY = 'notification_preferences:version'
+
+
+def get_user_version_key(user_id):
+    return f'{PREFERENCE_VERSION_CACHE_KEY}:{user_id}'
+
+
+class PreferenceStore:
+    """
+    Notification preferences of many users, loaded with one query per batch.
+
+    Missing rows are created with the defaults in one bulk_create. Loaded
+    preferences stay cached in the process, at most max_size users (least
+    recently used dropped first). Saving or deleting a preference drops it
+    locally and bumps that user's version key in the shared cache; the other
+    workers re-check the versions of the users they serve at most every
+    PREFERENCE_VERSION_CHECK_SECONDS (one get_many per batch) and reload only
+    the users whose version changed. Returned objects are shared: read them,
+    and save changes through a fresh instance.
+    """
+
+    def __init__(self, version_check_seconds=None, max_size=None):
+        notification_settings = getattr(settings, 'NOTIFICATION_SETTINGS', {})
+        if version_check_seconds is None:
+            version_check_seconds = notification_settings.get('PREFERENCE_VERSION_CHECK_SECONDS', 5)
+        if max_size is None:
+            max_size = notification_settings.get('PREFERENCE_CACHE_SIZE', 5000)
+        self.version_check_seconds = version_check_seconds
+        self.max_size = max_size
+        # user_id -> (preferences, version, checked_at), least recently used first
+        self._preferences = OrderedDict()
+        self._version = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    def get(self, user):
+        """
+        Preferences of one user (accepts a user or a user id)
+        """
+        user_id = getattr(user, 'pk', user)
+        return self.get_many([user_id])[user_id]
+
+    def get_many(self, user_ids):
+        """
+        Preferences of several users as {user_id: preferences}, loading the
+        ones not cached (or changed in another worker) with one query, plus
+        one bulk insert for new rows
+        """
+        self._check_version()
+        user_ids = {user_id for user_id in user_ids if user_id is not None}
+        now = time.monotonic()
+
+        with self._lock:
+            entries = {user_id: self._preferences.get(user_id) for user_id in user_ids}
+
+        # Versions are read before loading, so a change made meanwhile is seen on the next check
+        to_check = [
+            user_id for user_id, entry in entries.items()
+            if entry is None or now - entry[2] >= self.version_check_seconds
+        ]
+        versions = self._get_user_versions(to_check, entries)
+
+        result = {}
+        missing_ids = set()
+        for user_id, entry in entries.items():
+            if entry is None or (user_id in versions and versions[user_id] != entry[1]):
+                missing_ids.add(user_id)
+            else:
+                result[user_id] = entry[0]
+        if missing_ids:
+            result.update(NotificationPreference.get_or_create_for_users(missing_ids))
+
+        with self._lock:
+            for user_id in user_ids:
+                if user_id in versions:
+                    self._preferences[user_id] = (result[user_id], versions[user_id], now)
+                elif user_id not in self._preferences:
+                    # Dropped by an invalidation meanwhile
+                    continue
+                self._preferences.move_to_end(user_id)
+            while len(self._preferences) > self.max_size:
+                self._preferences.popitem(last=False)
+
+        return result
+
+    def load(self, users):
+        """
+        Warm the store for a batch of users (or user ids) before a bulk job
+        """
+        self.get_many(getattr(user, 'pk', user) for user in users)
+
+    def invalidate(self, user_id=None):
+        """
+        Drop one user's cached preferences (all when user_id is None) here and
+        in the other workers
+        """
+        with self._lock:
+            if user_id is None:
+                self._preferences.clear()
+            else:
+                self._preferences.pop(user_id, None)
+
+        key = PREFERENCE_VERSION_CACHE_KEY if user_id is None else get_user_version_key(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # No version yet (or evicted): any new value differs from the ones read before
+            cache.set(key, time.time_ns(), None)
+        except Exception as e:
+            logger.warning(f"Could not bump notification preference version: {str(e)}")
+
+    def _get_user_versions(self, user_ids, entries):
+        """
+        Shared versions of the given users (0 when never bumped), one cache
+        round trip; when the cache is unreachable the cached entries are kept
+        """
+        if not user_ids:
+            return {}
+        keys = {get_user_version_key(user_id): user_id for user_id in user_ids}
+        try:
+            values = cache.get_many(keys.keys())
+        except Exception as e:
+            logger.warning(f"Could not read notification preference versions: {str(e)}")
+            return {
+                user_id: entries[user_id][1] if entries[user_id] else None
+                for user_id in user_ids
+            }
+        return {user_id: values.get(key, 0) for key, user_id in keys.items()}
+
+    def _check_version(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.version_check_seconds:
+            return
+
+        try:
+            version = cache.get(PREFERENCE_VERSION_CACHE_KEY, 0)
+        except Exception as e:
+            logger.warning(f"Could not read notification preference version: {str(e)}")
+            version = self._version
+
+        with self._lock:
+            if version != self._version:
+                self._preferences.clear()
+                self._version = version
+            self._checked_at = now
+
+
+preference_store = PreferenceStore()
+
+
+def get_preference_store():
+    """
+    Get the preference store of the current process
+    """
+    return preference_store
@@ -0,0 +1,236 @@
+# tasks/services/task_counters.py
+# Incremental maintenance of the denormalized TaskCounter rollup
+
+from collections import Counter
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from ..models import Task, TaskCounter
+from .task_stats import invalidate_task_stats
+import logging
+
+Employee = get_user_model()
+logger = logging.getLogger('tasks')
+
+
+def get_task_counter_state(task):
+    """
+    Snapshot of the task fields the counters depend on
+    """
+    return {
+        'created_by_id': task.created_by_id,
+        'assigned_to_id': task.assigned_to_id,
+        'status': task.status,
+    }
+
+
+def get_original_task_counter_state(task):
+    """
+    Snapshot of the counter fields as the task was loaded from the database
+    """
+    return {
+        field: task.get_original_value(field)
+        for field in ('created_by_id', 'assigned_to_id', 'status')
+    }
+
+
+def get_task_counter_contributions(state):
+    """
+    Return {employee_id: Counter} of what a task in the given state adds to each counter.
+    A self-assigned task counts once towards the shared totals.
+    """
+    if not state:
+        return {}
+
+    creator_id = state['created_by_id']
+    assignee_id = state['assigned_to_id']
+    status = state['status']
+
+    contributions = {}
+    for employee_id in {creator_id, assignee_id} - {None}:
+        counters = contributions.setdefault(employee_id, Counter())
+        counters['total_tasks'] += 1
+        if status == 'finished':
+            counters['completed_tasks'] += 1
+        elif status == 'new':
+            counters['pending_tasks'] += 1
+
+    if creator_id is not None:
+        contributions[creator_id]['created_tasks'] += 1
+        if assignee_id is not None and assignee_id != creator_id:
+            contributions[creator_id]['assigned_to_others'] += 1
+
+    if assignee_id is not None:
+        contributions[assignee_id]['assigned_tasks'] += 1
+
+    return contributions
+
+
+def get_task_counter_deltas(old_state, new_state):
+    """
+    Return {employee_id: {field: delta}} to move the counters from old_state to new_state
+    """
+    old = get_task_counter_contributions(old_state)
+    new = get_task_counter_contributions(new_state)
+
+    deltas = {}
+    for employee_id in old.keys() | new.keys():
+        before = old.get(employee_id, Counter())
+        after = new.get(employee_id, Counter())
+        changes = {
+            field: after[field] - before[field]
+            for field in TaskCounter.COUNTER_FIELDS
+            if after[field] != before[field]
+        }
+        if changes:
+            deltas[employee_id] = changes
+    return deltas
+
+
+def merge_task_counter_deltas(target, deltas):
+    """
+    Add deltas into target in place (used to batch many task changes)
+    """
+    for employee_id, changes in deltas.items():
+        employee_changes = target.setdefault(employee_id, {})
+        for field, delta in changes.items():
+            employee_changes[field] = employee_changes.get(field, 0) + delta
+    return target
+
+
+def apply_task_counter_deltas(deltas, create_missing=True):
+    """
+    Apply counter deltas with atomic F() updates.
+
+    Must be called after the task rows are written: when an employee has no
+    counter row yet, it is created from a fresh aggregate of their tasks
+    (only when create_missing, so deletes never resurrect rows of employees
+    being deleted themselves).
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        for employee_id, changes in deltas.items():
+            updates = {field: F(field) + delta for field, delta in changes.items() if delta}
+            if not updates:
+                continue
+
+            updated = TaskCounter.objects.filter(employee_id=employee_id).update(
+                updated_at=now, **updates
+            )
+            if not updated and create_missing:
+                stats = Task.objects.stats_for_employees([employee_id])[employee_id]
+                TaskCounter.objects.get_or_create(
+                    employee_id=employee_id,
+                    defaults={field: stats[field] for field in TaskCounter.COUNTER_FIELDS},
+                )
+
+
+def record_task_change(old_state, new_state):
+    """
+    Update the counters after a task moved from old_state to new_state
+    (old_state None for a created task, new_state None for a deleted one)
+    """
+    deltas = get_task_counter_deltas(old_state, new_state)
+    if deltas:
+        apply_task_counter_deltas(deltas, create_missing=new_state is not None)
+
+
+def set_tasks_status(queryset, status, changed_by_id=None):
+    """
+    Change the status of many tasks with one UPDATE, keeping the counters in sync
+    in the same transaction. The UPDATE sends no post_save, so the tasks are then
+    run through the same notification, activity feed, live event and dashboard
+    handlers as Task.save. Returns the number of tasks changed.
+    """
+    # signals imports this module
+    from ..signals import handle_bulk_task_changes
+
+    with transaction.atomic():
+        rows = list(
+            queryset.exclude(status=status).select_for_update().order_by().values(
+                'pk', 'created_by_id', 'assigned_to_id', 'status'
+            )
+        )
+        if not rows:
+            return 0
+
+        updated = Task.objects.filter(pk__in=[row['pk'] for row in rows]).update(
+            status=status, updated_at=timezone.now()
+        )
+
+        deltas = {}
+        for row in rows:
+            merge_task_counter_deltas(deltas, get_task_counter_deltas(
+                row, dict(row, status=status)
+            ))
+        apply_task_counter_deltas(deltas)
+
+        # Reload the tasks as if they were changed in memory from their old status
+        old_statuses = {row['pk']: row['status'] for row in rows}
+        tasks = list(Task.objects.filter(pk__in=old_statuses))
+        for task in tasks:
+            task._loaded_values['status'] = old_statuses[task.pk]
+            task.changed_by_id = changed_by_id
+        handle_bulk_task_changes(tasks)
+
+    invalidate_task_stats(*deltas.keys())
+    return updated
+
+
+def rebuild_task_counters(dry_run=False):
+    """
+    Recompute every counter with one grouped aggregation and write the differences
+    in bulk. Every employee gets a row so pages never fall back to aggregating.
+    Returns the drift found as a list of
+    {'employee_id', 'missing', 'changes': {field: (stored, actual)}}.
+    """
+    actual = Task.objects.stats_for_employees()
+    employee_ids = set(Employee.objects.values_list('pk', flat=True))
+
+    with transaction.atomic():
+        stored = {
+            counter.employee_id: counter
+            for counter in TaskCounter.objects.select_for_update()
+        }
+
+        drift = []
+        to_create = []
+        to_update = []
+        now = timezone.now()
+
+        for employee_id in employee_ids | stored.keys():
+            stats = actual.get(employee_id)
+            counter = stored.get(employee_id)
+
+            if counter is None:
+                counter = TaskCounter(employee_id=employee_id)
+                to_create.append(counter)
+                missing = True
+            else:
+                missing = False
+
+            changes = {}
+            for field in TaskCounter.COUNTER_FIELDS:
+                value = stats[field] if stats else 0
+                if getattr(counter, field) != value:
+                    changes[field] = (getattr(counter, field), value)
+                    setattr(counter, field, value)
+
+            if missing or changes:
+                drift.append({'employee_id': employee_id, 'missing': missing, 'changes': changes})
+            if changes and not missing:
+                counter.updated_at = now
+                to_update.append(counter)
+
+        if not dry_run:
+            TaskCounter.objects.bulk_create(to_create, batch_size=500)
+            TaskCounter.objects.bulk_update(
+                to_update, list(TaskCounter.COUNTER_FIELDS) + ['updated_at'], batch_size=500
+            )
+
+    if drift:
+        logger.info(f"Task counters drift: {len(drift)} employees{' (dry run)' if dry_run else ''}")
+        if not dry_run:
+            invalidate_task_stats(*[entry['employee_id'] for entry in drift])
+    return drift
@@ -0,0 +1,149 @@
+# tasks/services/task_stats.py
+# Per-user task counters shared by the dashboard, profile, my_tasks and reports
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, Count
+from django.utils import timezone
+from ..models import Task
+
+# Attribute used to memoize counters on the current request
+REQUEST_MEMO_ATTR = '_task_stats_memo'
+
+
+class TaskStatsService:
+    """
+    Service class returning every per-user task counter from a single aggregate query.
+
+    Results are memoized on the request (when given) so several callers in the
+    same request share one query, and optionally cached across requests in the
+    configured cache backend (TASK_SETTINGS['STATS_CACHE_TIMEOUT'] seconds, 0 disables).
+    """
+
+    def __init__(self, user, request=None, cache_timeout=None):
+        self.user = user
+        self.request = request
+        if cache_timeout is None:
+            cache_timeout = getattr(settings, 'TASK_SETTINGS', {}).get('STATS_CACHE_TIMEOUT', 0)
+        self.cache_timeout = cache_timeout
+
+    def get_counters(self):
+        """
+        Return the current counters for the user:
+        total, created, assigned_to_me, assigned_to_others, pending, overdue,
+        completed_today and completed_this_month
+        """
+        today = timezone.now().date()
+        memo = self._get_memo()
+        memo_key = ('counters', today)
+        if memo_key in memo:
+            return memo[memo_key]
+
+        counters = None
+        cache_key = get_task_stats_cache_key(self.user.pk, today)
+        if self.cache_timeout:
+            counters = cache.get(cache_key)
+
+        if counters is None:
+            counters = self._compute_counters(today)
+            if self.cache_timeout:
+                cache.set(cache_key, counters, self.cache_timeout)
+
+        memo[memo_key] = counters
+        return counters
+
+    def get_month_counters(self, first_day, last_day):
+        """
+        Return the counters of a monthly report between first_day and last_day (inclusive)
+        """
+        memo = self._get_memo()
+        memo_key = ('month', first_day, last_day)
+        if memo_key in memo:
+            return memo[memo_key]
+
+        user = self.user
+        created_in_month = Q(created_at__date__gte=first_day, created_at__date__lte=last_day)
+
+        counters = Task.objects.involving(user).aggregate(
+            total_all_related=Count('pk', filter=created_in_month),
+            total_created=Count('pk', filter=created_in_month & Q(created_by=user)),
+            total_assigned_to_me=Count('pk', filter=created_in_month & Q(assigned_to=user)),
+            total_completed=Count('pk', filter=Q(
+                status='finished',
+                updated_at__date__gte=first_day,
+                updated_at__date__lte=last_day,
+            )),
+            total_overdue=Count('pk', filter=Q(
+                status='new',
+                due_date__gte=first_day,
+                due_date__lte=last_day,
+            )),
+            total_assigned_to_others=Count('pk', filter=(
+                created_in_month & Q(created_by=user, assigned_to__isnull=False) & ~Q(assigned_to=user)
+            )),
+        )
+
+        memo[memo_key] = counters
+        return counters
+
+    def _compute_counters(self, today):
+        """
+        Compute all counters with one conditional aggregation query
+        """
+        user = self.user
+        return Task.objects.involving(user).aggregate(
+            total=Count('pk'),
+            created=Count('pk', filter=Q(created_by=user)),
+            assigned_to_me=Count('pk', filter=Q(assigned_to=user)),
+            assigned_to_others=Count('pk', filter=(
+                Q(created_by=user, assigned_to__isnull=False) & ~Q(assigned_to=user)
+            )),
+            pending=Count('pk', filter=Q(status='new')),
+            overdue=Count('pk', filter=Q(status='new', due_date__lt=today)),
+            completed_today=Count('pk', filter=Q(status='finished', updated_at__date=today)),
+            completed_this_month=Count('pk', filter=Q(
+                status='finished',
+                updated_at__month=today.month,
+                updated_at__year=today.year,
+            )),
+        )
+
+    def _get_memo(self):
+        """
+        Get the memo dict for this user, stored on the request when available
+        """
+        if self.request is None:
+            if not hasattr(self, '_memo'):
+                self._memo = {}
+            return self._memo
+
+        request_memo = getattr(self.request, REQUEST_MEMO_ATTR, None)
+        if request_memo is None:
+            request_memo = {}
+            setattr(self.request, REQUEST_MEMO_ATTR, request_memo)
+        return request_memo.setdefault(self.user.pk, {})
+
+
+# Utility functions
+def get_task_stats_cache_key(user_id, day):
+    """
+    Cache key of the cross-request counters of a user for a given day
+    """
+    return f'task_stats_{user_id}_{day.isoformat()}'
+
+
+def get_task_stats(request, user=None):
+    """
+    Get the current task counters for the request user (or the given user)
+    """
+    return TaskStatsService(user or request.user, request=request).get_counters()
+
+
+def invalidate_task_stats(*user_ids):
+    """
+    Drop the cached counters of the given users after their tasks changed
+    """
+    today = timezone.now().date()
+    keys = [get_task_stats_cache_key(user_id, today) for user_id in set(user_ids) if user_id]
+    if keys:
+        cache.delete_many(keys)
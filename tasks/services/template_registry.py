@@ -0,0 +1,135 @@
+# tasks/services/template_registry.py
+# Process-local registry of active notification templates, invalidated through a shared version key
+
+import logging
+import threading
+import time
+from string import Formatter
+from django.conf import settings
+from django.core.cache import cache
+from ..notification_models import NotificationTemplate
+
+logger = logging.getLogger('notifications')
+
+TEMPLATE_VERSION_CACHE_KEY = 'notification_templates:version'
+
+_formatter = Formatter()
+
+
+class CompiledSubject:
+    """
+    A subject template parsed once and rendered with str.format semantics.
+    Rendering falls back to the raw template on missing keys or bad syntax,
+    like NotificationTemplate.render_subject.
+    """
+
+    def __init__(self, subject_template):
+        self.subject_template = subject_template
+        try:
+            self.parts = list(_formatter.parse(subject_template))
+        except ValueError:
+            self.parts = None
+
+    def render(self, context):
+        if self.parts is None:
+            return self.subject_template
+        try:
+            rendered = []
+            for literal, field_name, format_spec, conversion in self.parts:
+                rendered.append(literal)
+                if field_name is None:
+                    continue
+                value, _ = _formatter.get_field(field_name, (), context)
+                value = _formatter.convert_field(value, conversion)
+                rendered.append(_formatter.format_field(value, format_spec or ''))
+            return ''.join(rendered)
+        except (KeyError, IndexError, AttributeError, ValueError):
+            return self.subject_template
+
+
+class NotificationTemplateRegistry:
+    """
+    All active NotificationTemplate rows of this process, loaded with one query.
+
+    Saving or deleting a template clears the local copy and bumps a version
+    number in the shared cache; other workers compare that version at most
+    every VERSION_CHECK_SECONDS and reload when it changed, so bulk jobs do
+    no template queries at all.
+    """
+
+    def __init__(self, version_check_seconds=None):
+        if version_check_seconds is None:
+            version_check_seconds = getattr(settings, 'NOTIFICATION_SETTINGS', {}).get(
+                'TEMPLATE_VERSION_CHECK_SECONDS', 5
+            )
+        self.version_check_seconds = version_check_seconds
+        self._templates = None
+        self._subjects = {}
+        self._version = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    def get(self, template_type):
+        """
+        The active template of the given type, or None
+        """
+        return self._get_templates().get(template_type)
+
+    def render_subject(self, template, context):
+        """
+        Render a template subject with its compiled (cached) form
+        """
+        compiled = self._subjects.get(template.subject_template)
+        if compiled is None:
+            compiled = self._subjects[template.subject_template] = CompiledSubject(template.subject_template)
+        return compiled.render(context)
+
+    def invalidate(self):
+        """
+        Drop this process's templates and tell the other workers to reload theirs
+        """
+        with self._lock:
+            self._templates = None
+            self._subjects = {}
+        try:
+            cache.incr(TEMPLATE_VERSION_CACHE_KEY)
+        except ValueError:
+            cache.set(TEMPLATE_VERSION_CACHE_KEY, 1, None)
+        except Exception as e:
+            logger.warning(f"Could not bump notification template version: {str(e)}")
+
+    def _get_templates(self):
+        now = time.monotonic()
+        if self._templates is not None and now - self._checked_at < self.version_check_seconds:
+            return self._templates
+
+        version = self._get_shared_version()
+        with self._lock:
+            if self._templates is None or version != self._version:
+                self._load(version)
+            self._checked_at = now
+            return self._templates
+
+    def _load(self, version):
+        templates = NotificationTemplate.objects.filter(is_active=True)
+        self._templates = {template.template_type: template for template in templates}
+        self._subjects = {}
+        self._version = version
+        logger.debug(f"Loaded {len(self._templates)} notification templates (version {version})")
+
+    def _get_shared_version(self):
+        try:
+            return cache.get(TEMPLATE_VERSION_CACHE_KEY, 0)
+        except Exception as e:
+            logger.warning(f"Could not read notification template version: {str(e)}")
+            return self._version
+
+
+template_registry = NotificationTemplateRegistry()
+
+
+def get_template_registry():
+    """
+    Get the template registry of the current process
+    """
+    return template_registry
@@ -1,103 +1,206 @@
 # tasks/signals.py
 # Create this new file for handling task signals
 
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.db import transaction
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from .models import Task
+from django.utils import timezone
+from .models import Task, Project, MonthlyGoal
+from .notification_models import NotificationPreference, NotificationTemplate
 from .services.notification_service import get_notification_service
+from .services.task_stats import invalidate_task_stats
+from .services.dashboard_snapshot import invalidate_dashboard_snapshot
+from .services.activity_feed import record_task_activity, prune_activity_feed, serialize_activity_item
+from .services.live_events import publish_live_event
+from .services.notification_outbox import enqueue_task_notification
+from .services.template_registry import get_template_registry
+from .services.preference_store import get_preference_store
+from .search import rebuild_search_index, related_search_filter
+from .services.task_counters import (
+    get_task_counter_state, get_original_task_counter_state, record_task_change
+)
 import logging
 
 Employee = get_user_model()
 logger = logging.getLogger('notifications')
 
-# Store original task state for comparison
-_task_original_state = {}
+@receiver(post_save, sender=Task)
+def update_task_counters_on_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Apply the change of this task to the TaskCounter rollup (same transaction as the save)
+    """
+    if raw:
+        return
+    if created:
+        record_task_change(None, get_task_counter_state(instance))
+    elif instance.has_loaded_values:
+        record_task_change(
+            get_original_task_counter_state(instance),
+            get_task_counter_state(instance)
+        )
+    else:
+        # Saved without being loaded from the database: the previous state is unknown,
+        # rebuild_task_counters will fix the counters
+        logger.warning(f"Task {instance.pk} saved without loaded values, counters not updated")
 
-@receiver(pre_save, sender=Task)
-def store_original_task_state(sender, instance, **kwargs):
+@receiver(post_delete, sender=Task)
+def update_task_counters_on_delete(sender, instance, **kwargs):
     """
-    Store original task state before saving
+    Remove a deleted task from the TaskCounter rollup
     """
-    if instance.pk:
-        try:
-            original = Task.objects.get(pk=instance.pk)
-            _task_original_state[instance.pk] = {
-                'assigned_to': original.assigned_to,
-                'status': original.status,
-                'created_by': original.created_by,
-            }
-        except Task.DoesNotExist:
-            _task_original_state[instance.pk] = None
+    record_task_change(get_original_task_counter_state(instance), None)
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_task_stats_cache(sender, instance, **kwargs):
+    """
+    Drop cached task counters of everyone involved in the task
+    """
+    invalidate_task_stats(
+        instance.created_by_id,
+        instance.assigned_to_id,
+        instance.get_original_value('assigned_to_id'),
+    )
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_task_dashboards(sender, instance, **kwargs):
+    """
+    Expire the dashboard snapshots of everyone involved in the task, before
+    and after the change, once it is committed
+    """
+    user_ids = (
+        instance.created_by_id,
+        instance.get_original_value('created_by_id'),
+        instance.assigned_to_id,
+        instance.get_original_value('assigned_to_id'),
+    )
+    transaction.on_commit(lambda: invalidate_dashboard_snapshot(*user_ids))
+
+@receiver(post_save, sender=MonthlyGoal)
+@receiver(post_delete, sender=MonthlyGoal)
+def invalidate_goal_dashboard(sender, instance, **kwargs):
+    """
+    Expire the dashboard snapshot of the goal's employee once the change is committed
+    """
+    transaction.on_commit(lambda: invalidate_dashboard_snapshot(instance.employee_id))
+
+@receiver(post_save, sender=Task)
+def handle_task_notifications(sender, instance, created, raw=False, **kwargs):
+    """
+    Queue email notifications when tasks are created or updated.
+    Notifications are written to the outbox in the same transaction as the
+    task and sent after commit, so the request never waits on SMTP.
+    """
+    if raw:
+        return
+    
+    if created:
+        # New task created
+        handle_new_task_created(instance)
     else:
-        _task_original_state[instance.pk] = None
+        # Existing task updated
+        handle_task_updated(instance, instance.get_changed_fields())
+
+# Live stream event type of each activity feed item type
+LIVE_ACTIVITY_EVENTS = {
+    'new-task': 'task-assigned',
+    'completed-task': 'task-completed',
+}
 
 @receiver(post_save, sender=Task)
-def handle_task_notifications(sender, instance, created, **kwargs):
+def record_task_activity_on_save(sender, instance, created, raw=False, **kwargs):
     """
-    Handle email notifications when tasks are created or updated
+    Append assignment/completion items to the activity feed of the people
+    concerned, in the same transaction as the task
     """
-    try:
-        notification_service = get_notification_service()
-        
-        if created:
-            # New task created
-            handle_new_task_created(instance, notification_service)
-        else:
-            # Existing task updated
-            handle_task_updated(instance, notification_service)
-            
-    except Exception as e:
-        logger.error(f"Error in task notification handling: {str(e)}")
-    finally:
-        # Clean up stored state
-        if instance.pk in _task_original_state:
-            del _task_original_state[instance.pk]
+    if raw:
+        return
+    changed_fields = instance.get_changed_fields()
+    items = record_task_activity(instance, created, changed_fields)
+    
+    # Push the same items, and status changes, to the open live streams once committed.
+    # The employee who made the change already sees it on their page.
+    actor_id = instance.changed_by_id
+    events = [
+        (item.recipient_id, LIVE_ACTIVITY_EVENTS[item.activity_type], item)
+        for item in items
+        if item.recipient_id != actor_id
+    ]
+    status_changed = not created and 'status' in changed_fields
+    task_data = {
+        'task_id': instance.pk,
+        'task_name': instance.name,
+        'status': instance.status,
+        'past_due': bool(instance.due_date and instance.due_date < timezone.now().date()),
+    }
+    user_ids = [
+        user_id for user_id in (instance.created_by_id, instance.assigned_to_id)
+        if user_id != actor_id
+    ]
+    status_changed = status_changed and bool(user_ids)
+    
+    def publish():
+        for user_id, event_type, item in events:
+            publish_live_event([user_id], event_type, serialize_activity_item(item))
+        if status_changed:
+            publish_live_event(user_ids, 'task-status', task_data)
+    
+    if events or status_changed:
+        transaction.on_commit(publish)
 
-def handle_new_task_created(task, notification_service):
+def handle_bulk_task_changes(tasks):
+    """
+    Run the post_save side effects of Task for tasks changed with a bulk UPDATE,
+    which sends no signals: notifications, activity feed, live events and
+    dashboard snapshots. The caller keeps the counters and stats in sync.
+    """
+    for task in tasks:
+        handle_task_notifications(Task, task, created=False)
+        record_task_activity_on_save(Task, task, created=False)
+        invalidate_task_dashboards(Task, task)
+
+def handle_new_task_created(task):
     """
     Handle notifications for newly created tasks
     """
-    # Send notification if task is assigned to someone other than creator
-    if task.assigned_to and task.assigned_to != task.created_by:
-        logger.info(f"Sending task assignment notification for task {task.id}")
-        notification_service.send_task_assigned_notification(
-            task=task,
-            assignee=task.assigned_to,
-            assigner=task.created_by
+    # Notify if task is assigned to someone other than creator
+    if task.assigned_to_id and task.assigned_to_id != task.created_by_id:
+        logger.info(f"Queueing task assignment notification for task {task.id}")
+        enqueue_task_notification(
+            'task_assigned', task,
+            recipient_id=task.assigned_to_id,
+            actor_id=task.created_by_id
         )
 
-def handle_task_updated(task, notification_service):
+def handle_task_updated(task, changed_fields):
     """
-    Handle notifications for updated tasks
+    Handle notifications for updated tasks.
+    changed_fields is the set of field attnames changed since the task was loaded.
     """
-    original_state = _task_original_state.get(task.pk)
-    if not original_state:
-        return
-    
     # Check if task was assigned to someone new
-    if (task.assigned_to != original_state['assigned_to'] and 
-        task.assigned_to and task.assigned_to != task.created_by):
+    if ('assigned_to_id' in changed_fields and
+        task.assigned_to_id and task.assigned_to_id != task.created_by_id):
         
-        logger.info(f"Sending task assignment notification for task {task.id} (reassigned)")
-        notification_service.send_task_assigned_notification(
-            task=task,
-            assignee=task.assigned_to,
-            assigner=task.created_by
+        logger.info(f"Queueing task assignment notification for task {task.id} (reassigned)")
+        enqueue_task_notification(
+            'task_assigned', task,
+            recipient_id=task.assigned_to_id,
+            actor_id=task.created_by_id
         )
     
     # Check if task status changed to finished
-    if (task.status == 'finished' and 
-        original_state['status'] != 'finished'):
+    if 'status' in changed_fields and task.status == 'finished':
         
         # Determine who completed the task
         # For now, we'll assume it was the assigned person or creator
-        completer = task.assigned_to if task.assigned_to else task.created_by
+        completer_id = task.assigned_to_id or task.created_by_id
         
-        logger.info(f"Sending task completion notification for task {task.id}")
-        notification_service.send_task_completed_notification(
-            task=task,
-            completer=completer
+        logger.info(f"Queueing task completion notification for task {task.id}")
+        enqueue_task_notification(
+            'task_completed', task,
+            actor_id=completer_id
         )
 
 # Optional: Signal for when employees are created
@@ -122,12 +225,73 @@ def create_notification_preferences(sender, instance, created, **kwargs):
     """
     if created:
         try:
-            from .notification_models import NotificationPreference
-            NotificationPreference.get_or_create_for_user(instance)
+            get_preference_store().get(instance)
             logger.info(f"Created notification preferences for {instance.email}")
         except Exception as e:
             logger.error(f"Failed to create notification preferences for {instance.email}: {str(e)}")
 
+# Keep every worker's notification template registry up to date
+@receiver(post_save, sender=NotificationTemplate)
+@receiver(post_delete, sender=NotificationTemplate)
+def invalidate_notification_templates(sender, instance, **kwargs):
+    """
+    Reload templates in this process and bump the shared version for the other
+    workers, once the change is committed (so nobody reloads the old rows)
+    """
+    transaction.on_commit(get_template_registry().invalidate)
+
+@receiver(post_save, sender=NotificationPreference)
+@receiver(post_delete, sender=NotificationPreference)
+def invalidate_notification_preferences(sender, instance, **kwargs):
+    """
+    Drop the cached preferences of this user in every worker once the change is committed
+    """
+    transaction.on_commit(lambda: get_preference_store().invalidate(instance.user_id))
+
+# Keep the project search text in step with its assigned employees
+@receiver(m2m_changed, sender=Project.assigned_employees.through)
+def update_project_search_on_assignment(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Refresh the search text of the projects whose assigned employees changed
+    """
+    if reverse and action == 'pre_clear':
+        # Remember the employee's projects, they are gone after the clear
+        instance._search_cleared_project_ids = list(instance.assigned_projects.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        instance.save(update_fields=['search_text'])
+        return
+    if action == 'post_clear':
+        pk_set = instance.__dict__.pop('_search_cleared_project_ids', [])
+    for project in Project.objects.filter(pk__in=pk_set or []):
+        project.save(update_fields=['search_text'])
+
+# Keep project and task search text in step with renamed employees
+@receiver(pre_save, sender=Employee)
+def remember_employee_rename(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Note whether the employee's name changes, comparing with the stored name
+    """
+    instance._search_renamed = False
+    if raw or instance.pk is None or (update_fields is not None and 'name' not in update_fields):
+        return
+    stored_name = Employee.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+    instance._search_renamed = stored_name is not None and stored_name != instance.name
+
+@receiver(post_save, sender=Employee)
+def update_search_on_employee_rename(sender, instance, created, raw=False, **kwargs):
+    """
+    Refresh the search text of the projects and tasks that include the employee's name
+    """
+    if created or raw or not instance.__dict__.pop('_search_renamed', False):
+        return
+    for model in (Project, Task):
+        matches = related_search_filter(model, instance)
+        if matches is not None:
+            rebuild_search_index(model, queryset=model._default_manager.filter(matches))
+
 # Additional signal for handling task updates via API or admin
 def send_task_assignment_notification_manual(task_id, assignee_id, assigner_id):
     """
@@ -176,8 +340,7 @@ def should_send_notification(user, notification_type):
     Check if notification should be sent to user
     """
     try:
-        from .notification_models import NotificationPreference
-        preferences = NotificationPreference.get_or_create_for_user(user)
+        preferences = get_preference_store().get(user)
         
         if not preferences.email_notifications_enabled:
             return False
@@ -261,6 +424,10 @@ def cleanup_old_notification_logs():
         ).delete()
         
         logger.info(f"Cleaned up {deleted_count[0]} old notification logs")
+        
+        # Activity feed items are only needed for recent activity
+        pruned_count = prune_activity_feed()
+        logger.info(f"Pruned {pruned_count} old activity feed items")
         return deleted_count[0]
     
     except Exception as e:
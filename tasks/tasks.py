@@ -1,7 +1,7 @@
 # tasks/tasks.py
 # Create this file for Celery async tasks (optional)
 
-from celery import shared_task
+from celery import group, shared_task
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from datetime import timedelta
@@ -87,13 +87,16 @@ def send_task_overdue_email_task(self, task_id):
     """
     try:
         from .models import Task
-        from .services.notification_service import EmailNotificationService
+        from .services.notification_service import NOTIFICATION_SKIPPED, EmailNotificationService
         
         task = Task.objects.get(id=task_id)
         
         service = EmailNotificationService()
         result = service.send_task_overdue_notification(task=task)
         
+        if result == NOTIFICATION_SKIPPED:
+            logger.info(f"Task overdue email skipped for task {task_id} (no recipient wants it)")
+            return {'status': 'skipped', 'task_id': task_id}
         if result:
             logger.info(f"Task overdue email sent successfully for task {task_id}")
             return {'status': 'success', 'task_id': task_id}
@@ -140,47 +143,44 @@ def send_daily_digest_task(self, user_id):
             max_retries=3
         )
 
+@shared_task
+def process_notification_outbox_task(entry_ids=None):
+    """
+    Send pending task notifications from the outbox
+    Called after commit with the new entry ids, and periodically with no ids
+    to drain anything left behind (retries, crashed workers, broker outages)
+    """
+    try:
+        from .services.notification_outbox import process_outbox_entries, requeue_stale_outbox_entries
+        
+        if entry_ids is None:
+            requeue_stale_outbox_entries()
+        return process_outbox_entries(entry_ids)
+        
+    except Exception as e:
+        logger.error(f"Failed to process notification outbox: {str(e)}")
+        return {'error': str(e)}
+
 @shared_task
 def send_daily_digests_to_all_users():
     """
     Send daily digest emails to all users who have it enabled
     Run this task once per day via cron job or Celery beat
-    """
-    from .notification_models import NotificationPreference
     
+    Users whose preferred digest time is within an hour of now are sent
+    their digest in one batched run (bulk task load, chunked pooled sends)
+    """
     try:
-        # Get all users with daily digest enabled
-        preferences = NotificationPreference.objects.filter(
-            daily_digest_enabled=True,
-            email_notifications_enabled=True
-        ).select_related('user')
-        
-        total_sent = 0
-        total_skipped = 0
-        
-        for preference in preferences:
-            try:
-                # Check if it's time to send digest based on user's preferred time
-                current_time = timezone.now().time()
-                user_digest_time = preference.digest_time
-                
-                # Send if current time is within 1 hour of preferred time
-                time_diff = abs(
-                    (current_time.hour * 60 + current_time.minute) - 
-                    (user_digest_time.hour * 60 + user_digest_time.minute)
-                )
-                
-                if time_diff <= 60:  # Within 1 hour
-                    send_daily_digest_task.delay(preference.user.id)
-                    total_sent += 1
-                else:
-                    total_skipped += 1
-                    
-            except Exception as e:
-                logger.error(f"Failed to queue daily digest for user {preference.user.id}: {str(e)}")
-        
-        logger.info(f"Daily digest: {total_sent} queued, {total_skipped} skipped")
-        return {'queued': total_sent, 'skipped': total_skipped}
+        from .services.daily_digest import DailyDigestPipeline
+        
+        stats = DailyDigestPipeline().run(window_minutes=60)
+        
+        logger.info(
+            f"Daily digest: {stats['emails_sent']} sent, {stats['skipped']} skipped, "
+            f"{stats['failed']} failed ({stats['tasks_per_second']} tasks/s, "
+            f"{stats['emails_per_second']} emails/s)"
+        )
+        return stats
         
     except Exception as e:
         logger.error(f"Failed to send daily digests: {str(e)}")
@@ -191,42 +191,51 @@ def check_overdue_tasks_and_notify():
     """
     Check for overdue tasks and send notifications
     Run this task daily via cron job or Celery beat
+    
+    Tasks already notified in the last 24 hours are excluded in the same
+    query (NOT EXISTS), and the remaining ids are sent to the workers as
+    one Celery group of fixed-size chunks
     """
-    from .models import Task
-    from .notification_models import EmailNotificationLog
+    from .services.overdue_notifications import iter_overdue_task_id_chunks
     
     try:
-        # Get overdue tasks that haven't been notified about recently
-        today = timezone.now().date()
-        yesterday = today - timedelta(days=1)
-        
-        overdue_tasks = Task.objects.filter(
-            status='new',
-            due_date__lt=today
-        ).select_related('created_by', 'assigned_to')
-        
-        notifications_sent = 0
-        
-        for task in overdue_tasks:
-            # Check if we've already sent an overdue notification in the last 24 hours
-            recent_notification = EmailNotificationLog.objects.filter(
-                task=task,
-                notification_type='task_overdue',
-                created_at__gte=yesterday,
-                status='sent'
-            ).exists()
-            
-            if not recent_notification:
-                send_task_overdue_email_task.delay(task.id)
-                notifications_sent += 1
+        chunks = list(iter_overdue_task_id_chunks())
+        notifications_queued = sum(len(chunk) for chunk in chunks)
         
-        logger.info(f"Overdue tasks check: {notifications_sent} notifications queued")
-        return {'notifications_queued': notifications_sent}
+        if chunks:
+            group(send_overdue_notifications_chunk_task.s(chunk) for chunk in chunks).apply_async()
+        
+        logger.info(
+            f"Overdue tasks check: {notifications_queued} notifications queued "
+            f"in {len(chunks)} chunks"
+        )
+        return {'notifications_queued': notifications_queued, 'chunks': len(chunks)}
         
     except Exception as e:
         logger.error(f"Failed to check overdue tasks: {str(e)}")
         return {'error': str(e)}
 
+@shared_task(bind=True, max_retries=3)
+def send_overdue_notifications_chunk_task(self, task_ids):
+    """
+    Send the overdue notifications of one chunk of tasks
+    over a single pooled SMTP connection
+    """
+    try:
+        from .services.overdue_notifications import send_overdue_notifications
+        
+        results = send_overdue_notifications(task_ids)
+        logger.info(f"Overdue notifications chunk ({len(task_ids)} tasks): {results}")
+        return results
+        
+    except Exception as exc:
+        logger.error(f"Failed to send overdue notifications chunk: {str(exc)}")
+        raise self.retry(
+            exc=exc,
+            countdown=60 * (2 ** self.request.retries),
+            max_retries=3
+        )
+
 @shared_task
 def cleanup_old_notification_logs():
     """
@@ -244,6 +253,23 @@ def cleanup_old_notification_logs():
         logger.error(f"Failed to cleanup notification logs: {str(e)}")
         return {'error': str(e)}
 
+@shared_task
+def rebuild_task_counters_task():
+    """
+    Recompute the denormalized task counters and repair any drift
+    (overdue tasks are counted when read, not stored in the counters)
+    """
+    try:
+        from .services.task_counters import rebuild_task_counters
+        drift = rebuild_task_counters()
+        
+        logger.info(f"Rebuilt task counters, fixed drift for {len(drift)} employees")
+        return {'drift_count': len(drift)}
+        
+    except Exception as e:
+        logger.error(f"Failed to rebuild task counters: {str(e)}")
+        return {'error': str(e)}
+
 @shared_task
 def send_weekly_summary_reports():
     """
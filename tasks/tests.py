@@ -1,3 +1,1023 @@
-from django.test import TestCase
+import base64
+import csv
+import io
+import re
+import zipfile
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from smtplib import SMTPException
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.db import transaction
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.template.loader import render_to_string
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from .exports import PROJECT_EXPORT, TASK_EXPORT, export_response
+from .models import Project, Task, TaskCounter
+from .notification_models import (
+    ActivityFeedItem, EmailNotificationLog, NotificationOutbox, NotificationPreference, NotificationTemplate,
+    TaskReminderTracker,
+)
+from .pagination import KeysetPaginator, decode_cursor, encode_cursor
+from .search import normalize_search_text, search
+from .services.daily_digest import DailyDigestPipeline
+from .services.deadline_reminders import DeadlineReminderPlanner
+from .services.dashboard_snapshot import get_dashboard_snapshot, get_snapshot_metrics
+from .services.email_connection import EmailConnectionPool
+from .services.email_renderer import EmailRenderer
+from .services.notification_outbox import process_outbox_entries
+from .services.notification_service import EmailNotificationService
+from .services.overdue_notifications import send_overdue_notifications
+from .services.preference_store import PreferenceStore, get_preference_store
+from .services.template_registry import NotificationTemplateRegistry, get_template_registry
+from .services.task_counters import rebuild_task_counters, set_tasks_status
 
-# Create your tests here.
+Employee = get_user_model()
+
+
+def create_employee(number):
+    return Employee.objects.create_user(
+        username=f'employee{number}',
+        name=f'موظف {number}',
+        email=f'employee{number}@example.com',
+        job_number=f'J{number}',
+        mobile_number='0500000000',
+        section='admin',
+    )
+
+
+class TaskCounterTests(TestCase):
+    """The TaskCounter rollup follows task saves and deletes"""
+
+    def setUp(self):
+        self.creator = create_employee(1)
+        self.assignee = create_employee(2)
+        self.other = create_employee(3)
+
+    def counters(self, employee):
+        counter = TaskCounter.objects.filter(employee=employee).first()
+        if counter is None:
+            return {field: 0 for field in TaskCounter.COUNTER_FIELDS}
+        return {field: getattr(counter, field) for field in TaskCounter.COUNTER_FIELDS}
+
+    def assert_counters_match_tasks(self):
+        actual = Task.objects.stats_for_employees([self.creator.pk, self.assignee.pk, self.other.pk])
+        for employee in (self.creator, self.assignee, self.other):
+            expected = {field: actual[employee.pk][field] for field in TaskCounter.COUNTER_FIELDS}
+            self.assertEqual(self.counters(employee), expected, employee.username)
+
+    def create_task(self, **kwargs):
+        kwargs.setdefault('name', 'مهمة')
+        kwargs.setdefault('created_by', self.creator)
+        return Task.objects.create(**kwargs)
+
+    def test_create_counts_creator_and_assignee(self):
+        self.create_task(assigned_to=self.assignee)
+
+        creator = self.counters(self.creator)
+        self.assertEqual(creator['total_tasks'], 1)
+        self.assertEqual(creator['created_tasks'], 1)
+        self.assertEqual(creator['assigned_to_others'], 1)
+        self.assertEqual(creator['pending_tasks'], 1)
+        assignee = self.counters(self.assignee)
+        self.assertEqual(assignee['total_tasks'], 1)
+        self.assertEqual(assignee['assigned_tasks'], 1)
+        self.assert_counters_match_tasks()
+
+    def test_self_assigned_task_counts_once(self):
+        self.create_task(assigned_to=self.creator)
+
+        creator = self.counters(self.creator)
+        self.assertEqual(creator['total_tasks'], 1)
+        self.assertEqual(creator['assigned_tasks'], 1)
+        self.assertEqual(creator['assigned_to_others'], 0)
+        self.assert_counters_match_tasks()
+
+    def test_finish_moves_pending_to_completed(self):
+        task = self.create_task(assigned_to=self.assignee)
+        task = Task.objects.get(pk=task.pk)
+        task.status = 'finished'
+        task.save()
+
+        assignee = self.counters(self.assignee)
+        self.assertEqual(assignee['pending_tasks'], 0)
+        self.assertEqual(assignee['completed_tasks'], 1)
+        self.assert_counters_match_tasks()
+
+    def test_reassignment_moves_counts(self):
+        task = self.create_task(assigned_to=self.assignee)
+        task = Task.objects.get(pk=task.pk)
+        task.assigned_to = self.other
+        task.save()
+
+        self.assertEqual(self.counters(self.assignee)['total_tasks'], 0)
+        self.assertEqual(self.counters(self.other)['assigned_tasks'], 1)
+        self.assert_counters_match_tasks()
+
+    def test_delete_removes_counts(self):
+        task = self.create_task(assigned_to=self.assignee)
+        Task.objects.get(pk=task.pk).delete()
+
+        self.assertEqual(self.counters(self.creator)['total_tasks'], 0)
+        self.assertEqual(self.counters(self.assignee)['total_tasks'], 0)
+        self.assert_counters_match_tasks()
+
+    def test_task_going_overdue_then_finished_or_deleted(self):
+        tomorrow = timezone.now().date() + timedelta(days=1)
+        finished = self.create_task(assigned_to=self.assignee, due_date=tomorrow)
+        deleted = self.create_task(assigned_to=self.assignee, due_date=tomorrow)
+
+        later = timezone.now() + timedelta(days=3)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            overdue = Task.objects.overdue_counts_for_employees([self.assignee.pk])
+            self.assertEqual(overdue[self.assignee.pk], 2)
+
+            finished = Task.objects.get(pk=finished.pk)
+            finished.status = 'finished'
+            finished.save()
+            Task.objects.get(pk=deleted.pk).delete()
+
+            overdue = Task.objects.overdue_counts_for_employees([self.assignee.pk])
+            self.assertEqual(overdue[self.assignee.pk], 0)
+            self.assert_counters_match_tasks()
+            self.assertTrue(all(value >= 0 for value in self.counters(self.assignee).values()))
+
+    def test_bulk_status_change(self):
+        self.create_task(assigned_to=self.assignee)
+        self.create_task(assigned_to=self.other)
+
+        changed = set_tasks_status(Task.objects.all(), 'finished')
+
+        self.assertEqual(changed, 2)
+        self.assertEqual(self.counters(self.creator)['completed_tasks'], 2)
+        self.assert_counters_match_tasks()
+
+    def test_rebuild_repairs_drift(self):
+        self.create_task(assigned_to=self.assignee)
+        TaskCounter.objects.filter(employee=self.assignee).update(total_tasks=5)
+
+        drift = rebuild_task_counters()
+
+        self.assertIn(self.assignee.pk, [entry['employee_id'] for entry in drift])
+        self.assert_counters_match_tasks()
+        self.assertEqual(rebuild_task_counters(), [])
+
+
+class TaskChangeTrackingTests(TestCase):
+    """Task saves are diffed against the values loaded from the database"""
+
+    def setUp(self):
+        self.creator = create_employee(1)
+        self.assignee = create_employee(2)
+        self.other = create_employee(3)
+        task = Task.objects.create(name='مهمة', created_by=self.creator, assigned_to=self.assignee)
+        self.task = Task.objects.get(pk=task.pk)
+
+    def outbox_entries(self, notification_type):
+        return NotificationOutbox.objects.filter(task=self.task, notification_type=notification_type)
+
+    def test_finishing_queues_completion_notification(self):
+        self.task.status = 'finished'
+        self.assertEqual(self.task.get_changed_fields(), {'status'})
+        self.task.save()
+
+        self.assertEqual(self.outbox_entries('task_completed').count(), 1)
+        self.assertEqual(self.task.get_changed_fields(), set())
+
+    def test_reassignment_notifies_new_assignee(self):
+        self.task.assigned_to = self.other
+        self.task.save()
+
+        entries = self.outbox_entries('task_assigned')
+        self.assertEqual(list(entries.values_list('recipient_id', flat=True)), [self.assignee.pk, self.other.pk])
+        self.assertFalse(self.outbox_entries('task_completed').exists())
+
+    def test_update_fields_refresh_only_their_snapshot(self):
+        self.task.name = 'مهمة معدلة'
+        self.task.status = 'finished'
+        self.task.save(update_fields=['name'])
+
+        self.assertEqual(self.task.get_changed_fields(), {'status'})
+        self.assertEqual(self.task.get_original_value('status'), 'new')
+        self.assertEqual(self.task.get_original_value('name'), 'مهمة معدلة')
+        # The unsaved status change is not acted on
+        self.assertFalse(self.outbox_entries('task_completed').exists())
+        self.assertEqual(TaskCounter.objects.get(employee=self.assignee).completed_tasks, 0)
+
+    def test_deferred_fields_report_no_phantom_changes(self):
+        task = Task.objects.only('pk', 'status').get(pk=self.task.pk)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(task.get_changed_fields(), set())
+            self.assertEqual(task.get_original_value('status'), 'new')
+
+        task.status = 'finished'
+        self.assertEqual(task.get_changed_fields(), {'status'})
+        task.save()
+
+        self.assertEqual(self.outbox_entries('task_assigned').count(), 1)
+        self.assertEqual(self.outbox_entries('task_completed').count(), 1)
+
+
+class DashboardSnapshotTests(TestCase):
+    """Task saves and deletes expire the cached dashboards once committed"""
+
+    def setUp(self):
+        cache.clear()
+        self.creator = create_employee(1)
+        self.assignee = create_employee(2)
+        self.other = create_employee(3)
+        task = Task.objects.create(name='مهمة', created_by=self.creator, assigned_to=self.assignee)
+        self.task = Task.objects.get(pk=task.pk)
+
+    def open_task_ids(self, user):
+        return [task.pk for task in get_dashboard_snapshot(user)['my_tasks']]
+
+    def assert_cached(self, *users):
+        for user in users:
+            with self.assertNumQueries(0):
+                get_dashboard_snapshot(user)
+
+    def test_snapshot_is_cached(self):
+        self.assertEqual(self.open_task_ids(self.creator), [self.task.pk])
+        self.assert_cached(self.creator)
+        self.assertEqual(get_snapshot_metrics()['hits'], 1)
+
+    def test_save_evicts_creator_and_assignee_on_commit(self):
+        for user in (self.creator, self.assignee):
+            self.assertEqual(self.open_task_ids(user), [self.task.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.status = 'finished'
+            self.task.save()
+            # Not before the commit
+            self.assert_cached(self.creator, self.assignee)
+
+        for user in (self.creator, self.assignee):
+            self.assertEqual(self.open_task_ids(user), [])
+            self.assertEqual(get_dashboard_snapshot(user)['task_counters']['pending'], 0)
+
+    def test_reassignment_evicts_previous_assignee(self):
+        for user in (self.creator, self.assignee, self.other):
+            self.open_task_ids(user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.assigned_to = self.other
+            self.task.save()
+
+        self.assertEqual(self.open_task_ids(self.assignee), [])
+        self.assertEqual(self.open_task_ids(self.other), [self.task.pk])
+
+    def test_delete_evicts_creator_and_assignee(self):
+        for user in (self.creator, self.assignee):
+            self.open_task_ids(user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.delete()
+
+        for user in (self.creator, self.assignee):
+            self.assertEqual(self.open_task_ids(user), [])
+
+
+class NotificationOutboxTests(TestCase):
+    """Task notifications go through the outbox and are retried with backoff"""
+
+    def setUp(self):
+        self.creator = create_employee(1)
+        self.assignee = create_employee(2)
+        # Drop the welcome emails of the new employees
+        mail.outbox = []
+
+    def create_assigned_task(self):
+        return Task.objects.create(name='مهمة', created_by=self.creator, assigned_to=self.assignee)
+
+    def test_entry_written_in_transaction_and_dispatched_on_commit(self):
+        with mock.patch('tasks.services.notification_outbox.dispatch_outbox_entries') as dispatch:
+            with self.captureOnCommitCallbacks(execute=True):
+                task = self.create_assigned_task()
+                entry = NotificationOutbox.objects.get(task=task)
+                self.assertEqual(entry.notification_type, 'task_assigned')
+                self.assertEqual(entry.status, 'pending')
+                dispatch.assert_not_called()
+
+        dispatch.assert_called_once_with([entry.pk])
+
+    def test_no_entry_when_transaction_rolls_back(self):
+        with mock.patch('tasks.services.notification_outbox.dispatch_outbox_entries') as dispatch:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                try:
+                    with transaction.atomic():
+                        self.create_assigned_task()
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+
+        self.assertEqual(callbacks, [])
+        dispatch.assert_not_called()
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_sent_entry(self):
+        entry = NotificationOutbox.objects.get(task=self.create_assigned_task())
+
+        results = process_outbox_entries([entry.pk])
+
+        entry.refresh_from_db()
+        self.assertEqual(results, {'sent': 1})
+        self.assertEqual(entry.status, 'sent')
+        self.assertEqual(entry.attempts, 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.assignee.email])
+
+    @override_settings(NOTIFICATION_SETTINGS={'OUTBOX_MAX_ATTEMPTS': 3, 'OUTBOX_RETRY_DELAY_SECONDS': 60})
+    def test_failed_send_is_retried_with_backoff_then_failed(self):
+        entry = NotificationOutbox.objects.get(task=self.create_assigned_task())
+        failing = mock.patch(
+            'tasks.services.notification_service.EmailNotificationService.send_task_assigned_notification',
+            side_effect=SMTPException('connection lost'),
+        )
+
+        with failing:
+            for attempt, delay in ((1, 60), (2, 120)):
+                before = timezone.now()
+                self.assertEqual(process_outbox_entries([entry.pk]), {'pending': 1})
+                entry.refresh_from_db()
+                self.assertEqual(entry.attempts, attempt)
+                self.assertEqual(entry.last_error, 'connection lost')
+                self.assertGreaterEqual(entry.next_attempt_at, before + timedelta(seconds=delay))
+                self.assertLess(entry.next_attempt_at, before + timedelta(seconds=delay + 5))
+
+                # Not due yet
+                self.assertEqual(process_outbox_entries([entry.pk]), {})
+                NotificationOutbox.objects.filter(pk=entry.pk).update(next_attempt_at=timezone.now())
+
+            self.assertEqual(process_outbox_entries([entry.pk]), {'failed': 1})
+
+        entry.refresh_from_db()
+        self.assertEqual(entry.attempts, 3)
+        self.assertIsNotNone(entry.processed_at)
+        self.assertEqual(process_outbox_entries([entry.pk]), {})
+
+
+class AdminBulkStatusTests(TestCase):
+    """Admin bulk status actions have the side effects of Task.save"""
+
+    def setUp(self):
+        self.creator = create_employee(1)
+        self.assignee = create_employee(2)
+        self.admin = create_employee(3)
+        self.admin.is_staff = self.admin.is_superuser = True
+        self.admin.save()
+        self.task = Task.objects.create(name='مهمة', created_by=self.creator, assigned_to=self.assignee)
+        mail.outbox = []
+
+    def test_mark_as_finished_notifies_the_creator(self):
+        self.client.force_login(self.admin)
+        with mock.patch('tasks.services.notification_outbox.dispatch_outbox_entries') as dispatch:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse('admin:tasks_task_changelist'), {
+                    'action': 'mark_as_finished',
+                    '_selected_action': [self.task.pk],
+                })
+
+        entry = NotificationOutbox.objects.get(task=self.task, notification_type='task_completed')
+        dispatch.assert_any_call([entry.pk])
+        self.assertTrue(ActivityFeedItem.objects.filter(
+            recipient=self.creator, activity_type='completed-task', task=self.task
+        ).exists())
+
+        self.assertEqual(process_outbox_entries([entry.pk]), {'sent': 1})
+        self.assertEqual(mail.outbox[0].to, [self.creator.email])
+        self.assertEqual(TaskCounter.objects.get(employee=self.creator).completed_tasks, 1)
+
+
+class KeysetPaginatorTests(TestCase):
+    """Cursor pages walk the tasks by (created_at, id) and ignore bad cursors"""
+
+    def setUp(self):
+        self.creator = create_employee(1)
+        start = timezone.now() - timedelta(days=1)
+        for number in range(5):
+            task = Task.objects.create(name=f'مهمة {number}', created_by=self.creator)
+            # Two tasks share a timestamp, so the id has to break the tie
+            Task.objects.filter(pk=task.pk).update(created_at=start + timedelta(minutes=min(number, 3)))
+        self.expected = list(Task.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+
+    def get_page(self, cursor=None):
+        return KeysetPaginator(Task.objects.all(), 2).get_page(cursor)
+
+    def ids(self, page):
+        return [task.pk for task in page]
+
+    def test_cursor_round_trip(self):
+        created_at = timezone.now()
+        cursor = encode_cursor([created_at, timezone.now().date(), 7, 'x'], 'previous')
+
+        self.assertEqual(decode_cursor(cursor), ([created_at, created_at.date(), 7, 'x'], 'previous'))
+        self.assertNotIn('=', cursor)
+
+    def test_walk_forward_and_back(self):
+        first = self.get_page()
+        self.assertEqual(self.ids(first), self.expected[:2])
+        self.assertFalse(first.has_previous())
+
+        second = self.get_page(first.next_cursor)
+        third = self.get_page(second.next_cursor)
+        self.assertEqual(self.ids(second), self.expected[2:4])
+        self.assertEqual(self.ids(third), self.expected[4:])
+        self.assertFalse(third.has_next())
+
+        back = self.get_page(third.previous_cursor)
+        self.assertEqual(self.ids(back), self.expected[2:4])
+        self.assertEqual(self.ids(self.get_page(back.previous_cursor)), self.expected[:2])
+
+    def test_tampered_cursors_give_first_page(self):
+        valid = self.get_page().next_cursor
+        tampered = [
+            'not a cursor!',
+            valid[:-3],
+            valid + 'x',
+            encode_cursor([1], 'next'),
+            encode_cursor(['yesterday', 3], 'next'),
+            encode_cursor([timezone.now(), 1], 'sideways'),
+            base64.urlsafe_b64encode(b'{"d":"next","v":"ab"}').decode(),
+            base64.urlsafe_b64encode(b'{"d":"next","v":[{"dt":"soon"},1]}').decode(),
+            base64.urlsafe_b64encode(b'[1,2]').decode(),
+        ]
+        for cursor in tampered:
+            with self.subTest(cursor=cursor):
+                page = self.get_page(cursor)
+                self.assertEqual(self.ids(page), self.expected[:2])
+                self.assertFalse(page.has_previous())
+
+
+class FakeSMTPBackend:
+    """Email backend with an SMTP-like connection counting the NOOPs"""
+
+    def __init__(self, **kwargs):
+        self.connection = None
+        self.noops = 0
+
+    def open(self):
+        self.connection = self
+
+    def close(self):
+        self.connection = None
+
+    def noop(self):
+        self.noops += 1
+        return (250, b'OK')
+
+
+@mock.patch('tasks.services.email_connection.get_connection', FakeSMTPBackend)
+class EmailConnectionPoolTests(SimpleTestCase):
+    """Pooled connections are checked only after idling, batches leave a slot free"""
+
+    def create_pool(self, max_connections=2):
+        return EmailConnectionPool(
+            max_connections=max_connections, idle_timeout=60, max_messages=100,
+            acquire_timeout=0.1, check_after_idle=10,
+        )
+
+    def test_noop_only_after_idle(self):
+        pool = self.create_pool()
+        pooled = pool.acquire()
+        pool.release(pooled)
+
+        self.assertIs(pool.acquire(), pooled)
+        self.assertEqual(pooled.backend.noops, 0)
+        pool.release(pooled)
+
+        pooled.last_used -= 30
+        self.assertTrue(pooled.is_usable(pool.idle_timeout, pool.max_messages, pool.check_after_idle))
+        self.assertEqual(pooled.backend.noops, 1)
+
+    def test_batches_leave_a_connection_for_single_sends(self):
+        pool = self.create_pool(max_connections=2)
+        batch = pool.acquire(batch=True)
+
+        with self.assertRaises(TimeoutError):
+            pool.acquire(batch=True)
+        single = pool.acquire()
+
+        pool.release(single)
+        pool.release(batch)
+        pool.release(pool.acquire(batch=True))
+
+
+class OverdueNotificationTests(TestCase):
+    """Overdue chunks count sent, skipped and failed tasks apart"""
+
+    def setUp(self):
+        # Process-wide stores may hold rows of earlier tests' employees with the same ids
+        get_preference_store().invalidate()
+        self.creator = create_employee(1)
+        self.assignee = create_employee(2)
+        yesterday = timezone.now().date() - timedelta(days=1)
+        self.task = Task.objects.create(
+            name='مهمة', created_by=self.creator, assigned_to=self.assignee, due_date=yesterday
+        )
+        mail.outbox = []
+
+        # The registry is refreshed on commit, which never comes in a TestCase
+        EmailNotificationService()._create_default_template('task_overdue')
+        get_template_registry().invalidate()
+        self.addCleanup(get_template_registry().invalidate)
+
+    def opt_out(self, *users):
+        for preferences in NotificationPreference.objects.filter(user__in=users):
+            preferences.task_overdue_email = False
+            preferences.save()
+            # Invalidated on commit otherwise
+            get_preference_store().invalidate(preferences.user_id)
+
+    def send(self):
+        with mock.patch('tasks.services.overdue_notifications.publish_live_event') as publish:
+            results = send_overdue_notifications([self.task.pk])
+        published_to = [set(call.args[0]) for call in publish.call_args_list]
+        return results, published_to
+
+    def test_sent(self):
+        results, published_to = self.send()
+
+        self.assertEqual(results, {'sent': 1, 'skipped': 0, 'failed': 0})
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(published_to, [{self.creator.pk, self.assignee.pk}])
+
+    def test_opted_out_recipient_gets_no_live_event(self):
+        self.opt_out(self.creator)
+
+        results, published_to = self.send()
+
+        self.assertEqual(results['sent'], 1)
+        self.assertEqual(published_to, [{self.assignee.pk}])
+
+    def test_all_recipients_opted_out_is_skipped(self):
+        self.opt_out(self.creator, self.assignee)
+
+        results, published_to = self.send()
+
+        self.assertEqual(results, {'sent': 0, 'skipped': 1, 'failed': 0})
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(published_to, [])
+
+    def test_send_error_is_failed(self):
+        with mock.patch(
+            'tasks.services.notification_service.EmailNotificationService.send_task_overdue_notification',
+            side_effect=SMTPException('connection lost'),
+        ):
+            results, published_to = self.send()
+
+        self.assertEqual(results, {'sent': 0, 'skipped': 0, 'failed': 1})
+        self.assertEqual(published_to, [])
+
+
+class NormalizeSearchTextTests(SimpleTestCase):
+    """Arabic text is folded to one spelling before indexing and searching"""
+
+    def test_diacritics_and_tatweel_are_dropped(self):
+        self.assertEqual(normalize_search_text('مَشْرُوعٌ'), 'مشروع')
+        self.assertEqual(normalize_search_text('مشـــروع'), 'مشروع')
+
+    def test_letter_variants_are_unified(self):
+        self.assertEqual(normalize_search_text('أحمد إبراهيم آمال'), 'احمد ابراهيم امال')
+        self.assertEqual(normalize_search_text('مدرسة مستشفى'), 'مدرسه مستشفي')
+
+    def test_lowercase_words_only(self):
+        self.assertEqual(normalize_search_text('  Project-ONE, مهمة!  '), 'project one مهمه')
+        self.assertEqual(normalize_search_text(None), '')
+
+
+class SearchTests(TestCase):
+    """search() matches every query word against the normalized search text"""
+
+    def setUp(self):
+        self.creator = create_employee(1)
+        self.assignee = create_employee(2)
+        self.assignee.name = 'أحمد إبراهيم'
+        self.assignee.save()
+
+    def test_tasks(self):
+        task = Task.objects.create(name='ترميم المدرسة', detail='دهان الجدران', created_by=self.creator)
+        Task.objects.create(name='زيارة ميدانية', created_by=self.creator)
+
+        self.assertEqual(list(search(Task.objects.all(), 'مدرسة')), [task])
+        self.assertEqual(list(search(Task.objects.all(), 'تَرْمِيم الجُدران')), [task])
+        self.assertEqual(list(search(Task.objects.all(), 'ترميم زيارة')), [])
+
+    def test_projects_by_employee_names(self):
+        project = Project.objects.create(name='مشروع السقيا', created_by=self.creator)
+        project.assigned_employees.add(self.assignee)
+        Project.objects.create(name='مشروع آخر', created_by=self.creator)
+
+        self.assertEqual(list(search(Project.objects.all(), 'سقيا')), [project])
+        self.assertEqual(list(search(Project.objects.all(), 'احمد')), [project])
+
+    def test_employees(self):
+        self.assertEqual(list(search(Employee.objects.all(), 'ابراهيم')), [self.assignee])
+        self.assertEqual(list(search(Employee.objects.all(), 'J1')), [self.creator])
+        self.assertEqual(search(Employee.objects.all(), 'موظف', limit=1).count(), 1)
+
+    def test_renamed_employee_refreshes_project_search(self):
+        led = Project.objects.create(name='مشروع', created_by=self.creator, primary_assigned_employee=self.assignee)
+        assigned = Project.objects.create(name='مشروع', created_by=self.creator)
+        assigned.assigned_employees.add(self.assignee)
+        other = Project.objects.create(name='مشروع', created_by=self.creator)
+
+        self.assignee.name = 'خالد سعيد'
+        self.assignee.save()
+
+        self.assertEqual(set(search(Project.objects.all(), 'خالد')), {led, assigned})
+        self.assertEqual(list(search(Project.objects.all(), 'احمد')), [])
+        other.refresh_from_db()
+        self.assertNotIn('خالد', other.search_text)
+
+
+@mock.patch('tasks.services.deadline_reminders.is_weekend', return_value=False)
+class DeadlineReminderPlannerTests(TestCase):
+    """One planning run sends the due reminders and writes trackers and logs in bulk"""
+
+    def setUp(self):
+        get_preference_store().invalidate()
+        self.creator = create_employee(1)
+        self.assignee = create_employee(2)
+        today = timezone.now().date()
+        self.tasks = [
+            Task.objects.create(
+                name=f'مهمة {days}', created_by=self.creator, assigned_to=self.assignee,
+                due_date=today + timedelta(days=days),
+            )
+            for days in (0, 1, 3)
+        ]
+        # Not due for a reminder
+        Task.objects.create(
+            name='لاحقاً', created_by=self.creator, assigned_to=self.assignee,
+            due_date=today + timedelta(days=2),
+        )
+        mail.outbox = []
+
+    def inserts(self, queries, table):
+        return [
+            query for query in queries
+            if query['sql'].startswith('INSERT') and f'INTO "{table}"' in query['sql']
+        ]
+
+    def test_run_writes_in_bulk(self, is_weekend):
+        with CaptureQueriesContext(connection) as queries:
+            stats = DeadlineReminderPlanner().run()
+
+        self.assertEqual(stats['total_tasks_checked'], 3)
+        self.assertEqual(stats['reminders_sent'], 6)
+        self.assertEqual(len(mail.outbox), 6)
+        self.assertEqual(len(self.inserts(queries, 'task_reminder_trackers')), 1)
+        self.assertEqual(len(self.inserts(queries, 'email_notification_logs')), 1)
+        self.assertEqual(TaskReminderTracker.objects.count(), 6)
+        self.assertEqual(EmailNotificationLog.objects.filter(is_reminder=True, status='sent').count(), 6)
+
+    def test_already_reminded_tasks_are_skipped(self, is_weekend):
+        reminded = self.tasks[1]
+        for user in (self.creator, self.assignee):
+            tracker = TaskReminderTracker.objects.create(task=reminded, user=user)
+            tracker.mark_reminder_sent('one_day')
+
+        stats = DeadlineReminderPlanner().run()
+
+        self.assertEqual(stats['reminders_sent'], 4)
+        self.assertEqual(stats['reminders_skipped'], 2)
+        self.assertFalse(EmailNotificationLog.objects.filter(task=reminded, is_reminder=True).exists())
+
+        # A second run the same day sends nothing
+        mail.outbox = []
+        stats = DeadlineReminderPlanner().run()
+        self.assertEqual(stats['reminders_sent'], 0)
+        self.assertEqual(stats['reminders_skipped'], 6)
+        self.assertEqual(mail.outbox, [])
+
+    @override_settings(USE_CELERY_FOR_EMAILS=True)
+    def test_uses_the_pooled_service(self, is_weekend):
+        self.assertIs(type(DeadlineReminderPlanner().service), EmailNotificationService)
+
+
+class PreferenceStoreTests(TestCase):
+    """Each worker keeps its own copy of the preferences and reloads only users changed elsewhere"""
+
+    def setUp(self):
+        cache.clear()
+        self.first = create_employee(1)
+        self.second = create_employee(2)
+        # Two workers sharing the cache
+        self.worker = PreferenceStore(version_check_seconds=0)
+        self.other_worker = PreferenceStore(version_check_seconds=0)
+
+    def test_cached_after_first_load(self):
+        self.worker.load([self.first, self.second])
+
+        with self.assertNumQueries(0):
+            preferences = self.worker.get_many([self.first.pk, self.second.pk])
+        self.assertEqual(set(preferences), {self.first.pk, self.second.pk})
+
+    def test_invalidation_reaches_other_workers_for_that_user_only(self):
+        self.worker.load([self.first, self.second])
+        self.other_worker.load([self.first, self.second])
+
+        preferences = NotificationPreference.objects.get(user=self.first)
+        preferences.task_overdue_email = False
+        preferences.save()
+        self.other_worker.invalidate(self.first.pk)
+
+        with self.assertNumQueries(1):
+            preferences = self.worker.get_many([self.first.pk, self.second.pk])
+        self.assertFalse(preferences[self.first.pk].task_overdue_email)
+        self.assertTrue(preferences[self.second.pk].task_overdue_email)
+
+        with self.assertNumQueries(0):
+            self.worker.get(self.first)
+
+    def test_invalidating_everyone_reaches_other_workers(self):
+        self.worker.load([self.first, self.second])
+
+        self.other_worker.invalidate()
+
+        with self.assertNumQueries(1):
+            self.worker.get_many([self.first.pk, self.second.pk])
+
+    def test_size_is_bounded(self):
+        third = create_employee(3)
+        store = PreferenceStore(version_check_seconds=0, max_size=2)
+
+        store.load([self.first, self.second])
+        store.get(self.first)
+        store.get(third)
+
+        # The least recently used user was dropped
+        self.assertEqual(list(store._preferences), [self.first.pk, third.pk])
+
+
+class DailyDigestPipelineTests(TestCase):
+    """Digests are loaded with a fixed number of queries and follow the users' local digest time"""
+
+    def setUp(self):
+        get_preference_store().invalidate()
+        self.creator = create_employee(1)
+        self.assignee = create_employee(2)
+        self.idle = create_employee(3)
+        today = timezone.localdate()
+        self.overdue = Task.objects.create(
+            name='متأخرة', created_by=self.creator, assigned_to=self.assignee, due_date=today - timedelta(days=2)
+        )
+        self.due_today = Task.objects.create(
+            name='اليوم', created_by=self.creator, assigned_to=self.assignee, due_date=today
+        )
+        Task.objects.create(name='منتهية', created_by=self.creator, assigned_to=self.assignee, status='finished')
+        mail.outbox = []
+
+        EmailNotificationService()._create_default_template('daily_digest')
+        get_template_registry().invalidate()
+        self.addCleanup(get_template_registry().invalidate)
+
+    def test_loading_takes_two_queries(self):
+        pipeline = DailyDigestPipeline()
+        with self.assertNumQueries(2):
+            recipients = pipeline.load_recipients()
+            tasks = pipeline.load_tasks(recipients)
+
+        digests = pipeline.partition_tasks(recipients, tasks)
+        self.assertEqual(set(digests[self.assignee.pk]['assigned_tasks']), {self.overdue, self.due_today})
+        self.assertEqual(set(digests[self.creator.pk]['created_tasks']), {self.overdue, self.due_today})
+        self.assertEqual(digests[self.assignee.pk]['overdue_tasks'], [self.overdue])
+        self.assertEqual(digests[self.assignee.pk]['due_today_tasks'], [self.due_today])
+        self.assertFalse(any(digests[self.idle.pk].values()))
+
+    def test_query_count_does_not_grow_with_tasks(self):
+        with CaptureQueriesContext(connection) as few:
+            DailyDigestPipeline(dry_run=True).run()
+        for number in range(10):
+            Task.objects.create(name=f'مهمة {number}', created_by=self.idle, assigned_to=self.assignee)
+        with CaptureQueriesContext(connection) as many:
+            stats = DailyDigestPipeline(dry_run=True).run()
+
+        self.assertEqual(len(many), len(few))
+        self.assertEqual(stats['tasks_loaded'], 12)
+
+    def test_run_sends_to_users_with_tasks(self):
+        stats = DailyDigestPipeline().run()
+
+        self.assertEqual(stats['emails_sent'], 2)
+        self.assertEqual(stats['skipped'], 1)
+        self.assertEqual(sorted(email.to[0] for email in mail.outbox), [self.creator.email, self.assignee.email])
+
+    def test_window_uses_local_digest_time(self):
+        NotificationPreference.objects.filter(user=self.creator).update(digest_time=time(8, 0))
+        NotificationPreference.objects.filter(user=self.assignee).update(digest_time=time(5, 0))
+        NotificationPreference.objects.filter(user=self.idle).update(digest_time=time(8, 20))
+
+        # 05:00 UTC is 08:00 in Riyadh
+        now = datetime(2026, 10, 16, 5, 0, tzinfo=dt_timezone.utc)
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            recipients = DailyDigestPipeline().load_recipients(window_minutes=30)
+
+        self.assertEqual({user.pk for user in recipients}, {self.creator.pk, self.idle.pk})
+
+
+class TemplateRegistryTests(TestCase):
+    """Workers serve templates from memory and reload them once a template change is committed"""
+
+    def setUp(self):
+        cache.clear()
+        get_template_registry().invalidate()
+        self.addCleanup(get_template_registry().invalidate)
+        self.template = NotificationTemplate.objects.create(
+            name='تكليف', template_type='task_assigned', subject_template='مهمة {task_name}',
+            html_template='<p>{task_name}</p>', text_template='{task_name}',
+        )
+        # Another worker, checking the shared version on every read
+        self.worker = NotificationTemplateRegistry(version_check_seconds=0)
+
+    def subject(self):
+        template = self.worker.get('task_assigned')
+        return self.worker.render_subject(template, {'task_name': 'ترميم'})
+
+    def test_templates_served_without_queries(self):
+        self.assertEqual(self.subject(), 'مهمة ترميم')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.subject(), 'مهمة ترميم')
+
+    def test_reloaded_after_template_save_is_committed(self):
+        self.assertEqual(self.subject(), 'مهمة ترميم')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.template.subject_template = 'مهمة جديدة: {task_name}'
+            self.template.save()
+            # Not before the commit
+            self.assertEqual(self.subject(), 'مهمة ترميم')
+
+        self.assertEqual(self.subject(), 'مهمة جديدة: ترميم')
+
+    def test_deactivated_template_is_dropped(self):
+        self.subject()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.template.is_active = False
+            self.template.save()
+
+        self.assertIsNone(self.worker.get('task_assigned'))
+
+
+class EmailRendererTests(SimpleTestCase):
+    """The compiled renderer gives the same output as render_to_string"""
+
+    TEMPLATES = [
+        f'{notification_type}.{extension}'
+        for notification_type in ('task_assigned', 'task_completed', 'task_overdue', 'daily_digest', 'welcome')
+        for extension in ('html', 'txt')
+    ]
+
+    def build_context(self, number, site_name='جمعية إعمار'):
+        user = Employee(name=f'موظف {number}', email=f'employee{number}@example.com')
+        project = Project(name='مشروع <الترميم>')
+        task = Task(
+            pk=number,
+            name=f'مهمة {number} & "تجربة"',
+            detail='تفاصيل <b>المهمة</b>',
+            due_date=timezone.localdate() + timedelta(days=1),
+            project=project,
+            created_by=user,
+            assigned_to=user,
+        )
+        return {
+            'task': task,
+            'user': user,
+            'recipient': user,
+            'site_name': site_name,
+            'site_url': 'https://example.com',
+            'support_email': 'support@example.com',
+            'task_url': f'https://example.com/tasks/{number}/',
+            'login_url': 'https://example.com/employees/login/',
+            'task_name': task.name,
+            'user_name': user.name,
+            'assigner_name': user.name,
+            'completer_name': user.name,
+            'completion_date': '2026-10-16',
+            'due_date': '2026-10-17',
+            'days_overdue': 2,
+            'project_name': project.name,
+            'today': '2026-10-16',
+            'assigned_tasks': [task],
+            'created_tasks': [task, task],
+            'overdue_tasks': [],
+            'due_today_tasks': [task],
+        }
+
+    def test_same_output_as_render_to_string(self):
+        renderer = EmailRenderer()
+        contexts = [self.build_context(1), self.build_context(2), self.build_context(3, site_name='موقع آخر')]
+
+        for template_name in self.TEMPLATES:
+            # The later renders reuse the compiled template and layout
+            for context in contexts:
+                with self.subTest(template=template_name, user=context['user_name'], site=context['site_name']):
+                    self.assertEqual(
+                        renderer.render(template_name, context),
+                        render_to_string(f'emails/{template_name}', context)
+                    )
+
+        # The HTML emails went through the pre-rendered layout, one per site name
+        self.assertEqual(renderer.get_compiled('task_assigned.html').parent_name, 'emails/base_email.html')
+        self.assertEqual(len([layout for layout in renderer._layouts.values() if layout]), 2)
+
+
+class TaskPermissionTests(TestCase):
+    """with_permissions computes the Task.can_*_by rules in SQL and the views enforce them"""
+
+    def setUp(self):
+        self.creator = create_employee(1)
+        self.assignee = create_employee(2)
+        self.other = create_employee(3)
+        self.task = Task.objects.create(name='مهمة', created_by=self.creator, assigned_to=self.assignee)
+
+    def test_flags(self):
+        expected = {
+            self.creator: (True, True, True),
+            self.assignee: (False, False, True),
+            self.other: (False, False, False),
+        }
+        for user, flags in expected.items():
+            with self.subTest(user=user.username):
+                task = Task.objects.with_permissions(user).get(pk=self.task.pk)
+                self.assertEqual((task.user_can_edit, task.user_can_delete, task.user_can_change_status), flags)
+                self.assertEqual(
+                    (task.can_be_edited_by(user), task.can_be_deleted_by(user), task.can_change_status_by(user)),
+                    flags
+                )
+
+    def test_views_forbid_other_users(self):
+        self.client.force_login(self.other)
+        ajax = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+        self.assertEqual(self.client.get(reverse('tasks:edit_task', args=[self.task.pk])).status_code, 403)
+        response = self.client.post(reverse('tasks:delete_task', args=[self.task.pk]), **ajax)
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(response.json()['success'])
+        response = self.client.post(reverse('tasks:toggle_task_status', args=[self.task.pk]), **ajax)
+        self.assertEqual(response.status_code, 403)
+
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'new')
+
+    def test_assignee_can_only_change_status(self):
+        self.client.force_login(self.assignee)
+        ajax = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+        self.assertEqual(self.client.post(reverse('tasks:delete_task', args=[self.task.pk])).status_code, 403)
+        response = self.client.post(reverse('tasks:toggle_task_status', args=[self.task.pk]), **ajax)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['new_status'], 'finished')
+
+
+class ExportTests(TestCase):
+    """Exports stream every row of the queryset as CSV or as a valid XLSX workbook"""
+
+    def setUp(self):
+        self.creator = create_employee(1)
+        self.project = Project.objects.create(name='مشروع', created_by=self.creator)
+        for number in range(5):
+            Task.objects.create(name=f'مهمة {number}', created_by=self.creator, project=self.project)
+
+    def get_content(self, file_format):
+        response = export_response(TASK_EXPORT, Task.objects.all(), file_format, chunk_size=2)
+        self.assertIn('tasks_', response['Content-Disposition'])
+        return b''.join(response.streaming_content)
+
+    def test_csv_has_header_and_every_row(self):
+        content = self.get_content('csv').decode('utf-8')
+
+        self.assertTrue(content.startswith('\ufeff'))
+        rows = list(csv.reader(io.StringIO(content[1:])))
+        self.assertEqual(rows[0], TASK_EXPORT.headers)
+        self.assertEqual(len(rows), 6)
+        self.assertEqual({row[0] for row in rows[1:]}, {f'مهمة {number}' for number in range(5)})
+        self.assertEqual({row[2] for row in rows[1:]}, {'مشروع'})
+
+    def test_xlsx_is_a_valid_workbook(self):
+        content = self.get_content('xlsx')
+
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertIn('[Content_Types].xml', archive.namelist())
+            self.assertIn(TASK_EXPORT.title, archive.read('xl/workbook.xml').decode('utf-8'))
+            sheet = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+
+        self.assertEqual(len(re.findall('<row ', sheet)), 6)
+        for header in TASK_EXPORT.headers:
+            self.assertIn(f'>{header}<', sheet)
+
+    def test_project_export_rows(self):
+        rows = list(PROJECT_EXPORT.iter_rows(Project.objects.all()))
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(len(rows[0]), len(PROJECT_EXPORT.headers))
+        self.assertEqual(rows[0][0], 'مشروع')
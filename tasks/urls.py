@@ -7,6 +7,7 @@ urlpatterns = [
     # Task management URLs
     path('my-tasks/', views.my_tasks, name='my_tasks'),
     path('finished-tasks/', views.finished_tasks, name='finished_tasks'),
+    path('finished-tasks/export/', views.export_finished_tasks, name='export_finished_tasks'),
     
     # Employee Tasks URLs - New Addition
     path('employee-tasks/', views.employee_tasks_list, name='employee_tasks_list'),
@@ -1,6 +1,7 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.contrib.auth import get_user_model
+from django.core.exceptions import PermissionDenied
 from django.http import JsonResponse
 from django.core.paginator import Paginator
 from django.db.models import Q
@@ -10,9 +11,14 @@ from django.utils import timezone
 from .models import Project, Task
 from datetime import datetime
 from .models import MonthlyGoal
+from .services.task_stats import get_task_stats
+from .search import search
+from .pagination import KeysetPaginator
+from .exports import EXPORT_FORMATS, TASK_EXPORT, export_response
 
 
 from django.db.models import Q, Count, Case, When, IntegerField
+from django.db.models.functions import Coalesce
 from .models import Task, Project
 
 
@@ -50,10 +56,9 @@ def my_tasks(request):
     assigned_filter = request.GET.get('assigned', '')
     
     if search_query:
-        search_q = Q(name__icontains=search_query) | Q(detail__icontains=search_query)
-        my_unassigned_tasks = my_unassigned_tasks.filter(search_q)
-        assigned_to_me_tasks = assigned_to_me_tasks.filter(search_q)
-        my_assigned_tasks = my_assigned_tasks.filter(search_q)
+        my_unassigned_tasks = search(my_unassigned_tasks, search_query)
+        assigned_to_me_tasks = search(assigned_to_me_tasks, search_query)
+        my_assigned_tasks = search(my_assigned_tasks, search_query)
     
     if project_filter:
         project_q = Q(project_id=project_filter)
@@ -70,20 +75,7 @@ def my_tasks(request):
     employees = Employee.objects.filter(is_active_employee=True).order_by('name')
     
     # Calculate statistics
-    total_my_tasks = Task.objects.filter(
-        Q(created_by=request.user) | Q(assigned_to=request.user)
-    ).count()
-    
-    my_created_tasks = Task.objects.filter(created_by=request.user).count()
-    my_active_tasks = Task.objects.filter(
-        Q(created_by=request.user) | Q(assigned_to=request.user),
-        status='new'
-    ).count()
-    overdue_tasks = Task.objects.filter(
-        Q(created_by=request.user) | Q(assigned_to=request.user),
-        status='new',
-        due_date__lt=timezone.now().date()
-    ).count()
+    task_counters = get_task_stats(request)
     
     context = {
         'title': 'مهامي',
@@ -96,31 +88,30 @@ def my_tasks(request):
         'assigned_filter': assigned_filter,
         'projects': projects,
         'employees': employees,
-        'total_my_tasks': total_my_tasks,
-        'my_created_tasks': my_created_tasks,
-        'my_active_tasks': my_active_tasks,
-        'overdue_tasks': overdue_tasks,
+        'total_my_tasks': task_counters['total'],
+        'my_created_tasks': task_counters['created'],
+        'my_active_tasks': task_counters['pending'],
+        'overdue_tasks': task_counters['overdue'],
     }
     
     return render(request, 'tasks/my_tasks.html', context)
 
-@login_required
-def finished_tasks(request):
+def _task_permission_denied(request, error_msg):
     """
-    Display finished tasks with filters
+    403 for a task action the user may not perform (JSON for AJAX requests)
+    """
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse({'success': False, 'error': error_msg}, status=403)
+    raise PermissionDenied(error_msg)
+
+def _filter_finished_tasks(request, tasks):
+    """
+    Apply the finished tasks page filters (search, project, creator, assignee)
     """
-    tasks = Task.objects.filter(
-        Q(created_by=request.user) | Q(assigned_to=request.user),
-        status='finished'
-    ).select_related('project', 'created_by', 'assigned_to')
-    
     # Search functionality
     search_query = request.GET.get('search', '')
     if search_query:
-        tasks = tasks.filter(
-            Q(name__icontains=search_query) |
-            Q(detail__icontains=search_query)
-        )
+        tasks = search(tasks, search_query)
     
     # Filter by project
     project_filter = request.GET.get('project', '')
@@ -137,18 +128,24 @@ def finished_tasks(request):
     if assigned_filter:
         tasks = tasks.filter(assigned_to_id=assigned_filter)
     
-    # إضافة معلومات الصلاحيات لكل مهمة
-    task_list = []
-    for task in tasks:
-        task.can_change_status_by = task.can_change_status_by(request.user)
-        task.can_be_edited_by = task.can_be_edited_by(request.user)
-        task.can_be_deleted_by = task.can_be_deleted_by(request.user)
-        task_list.append(task)
+    return tasks, search_query, project_filter, creator_filter, assigned_filter
+
+
+@login_required
+def finished_tasks(request):
+    """
+    Display finished tasks with filters
+    """
+    tasks = Task.objects.filter(
+        Q(created_by=request.user) | Q(assigned_to=request.user),
+        status='finished'
+    ).select_related('project', 'created_by', 'assigned_to').with_permissions(request.user)
     
-    # Pagination
-    paginator = Paginator(task_list, 15)  # 15 tasks per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    tasks, search_query, project_filter, creator_filter, assigned_filter = _filter_finished_tasks(request, tasks)
+    
+    # Keyset pagination on the completion time, newest first
+    paginator = KeysetPaginator(tasks, 15, ordering=('-updated_at', '-pk'))  # 15 tasks per page
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
     # Get related data for filters
     projects = Project.objects.all().order_by('name')
@@ -170,27 +167,48 @@ def finished_tasks(request):
         'projects': projects,
         'creators': creators,
         'assigned_users': assigned_users,
-        'total_finished': len(task_list),
+        'total_finished': paginator.count,
     }
     
     return render(request, 'tasks/finished_tasks.html', context)
 
 
+@login_required
+def export_finished_tasks(request):
+    """
+    Download the finished tasks matching the page filters as CSV or Excel (streamed)
+    """
+    file_format = request.GET.get('format', 'csv')
+    if file_format not in EXPORT_FORMATS:
+        file_format = 'csv'
+    
+    tasks = Task.objects.filter(
+        Q(created_by=request.user) | Q(assigned_to=request.user),
+        status='finished'
+    )
+    tasks = _filter_finished_tasks(request, tasks)[0].order_by('-updated_at', '-pk')
+    
+    return export_response(TASK_EXPORT, tasks, file_format)
+
+
 
 @login_required
 def task_detail(request, pk):
     """
     Display task detail
     """
-    task = get_object_or_404(Task.objects.select_related('project', 'created_by', 'assigned_to'), pk=pk)
+    task = get_object_or_404(
+        Task.objects.select_related('project', 'created_by', 'assigned_to').with_permissions(request.user),
+        pk=pk
+    )
     
     # Check if request is AJAX for modal display
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         context = {
             'task': task,
-            'can_edit': task.can_be_edited_by(request.user),
-            'can_delete': task.can_be_deleted_by(request.user),
-            'can_change_status': task.can_change_status_by(request.user),
+            'can_edit': task.user_can_edit,
+            'can_delete': task.user_can_delete,
+            'can_change_status': task.user_can_change_status,
         }
         # تأكد من المسار الصحيح
         return render(request, 'tasks/partials/task_detail_modal.html', context)
@@ -311,15 +329,14 @@ def edit_task(request, pk):
     """
     Edit existing task
     """
-    task = get_object_or_404(Task.objects.select_related('project', 'created_by', 'assigned_to'), pk=pk)
+    task = get_object_or_404(
+        Task.objects.select_related('project', 'created_by', 'assigned_to').with_permissions(request.user),
+        pk=pk
+    )
     
     # Check permissions
-    if not task.can_be_edited_by(request.user):
-        error_msg = 'ليس لديك صلاحية لتعديل هذه المهمة'
-        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            return JsonResponse({'success': False, 'error': error_msg})
-        messages.error(request, error_msg)
-        return redirect('tasks:my_tasks')
+    if not task.user_can_edit:
+        return _task_permission_denied(request, 'ليس لديك صلاحية لتعديل هذه المهمة')
     
     if request.method == 'POST':
         try:
@@ -375,6 +392,7 @@ def edit_task(request, pk):
             task.project = project
             task.assigned_to = assigned_to
             task.status = data['status']
+            task.changed_by_id = request.user.pk
             task.save()
             
             success_msg = f'تم تحديث المهمة "{task.name}" بنجاح'
@@ -418,15 +436,11 @@ def delete_task(request, pk):
     """
     Delete task with confirmation
     """
-    task = get_object_or_404(Task, pk=pk)
+    task = get_object_or_404(Task.objects.with_permissions(request.user), pk=pk)
     
     # Check permissions
-    if not task.can_be_deleted_by(request.user):
-        error_msg = 'ليس لديك صلاحية لحذف هذه المهمة'
-        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            return JsonResponse({'success': False, 'error': error_msg})
-        messages.error(request, error_msg)
-        return redirect('tasks:my_tasks')
+    if not task.user_can_delete:
+        return _task_permission_denied(request, 'ليس لديك صلاحية لحذف هذه المهمة')
     
     try:
         task_name = task.name
@@ -453,19 +467,16 @@ def toggle_task_status(request, pk):
     """
     Toggle task status between new and finished
     """
-    task = get_object_or_404(Task, pk=pk)
+    task = get_object_or_404(Task.objects.with_permissions(request.user), pk=pk)
     
     # Check permissions
-    if not task.can_change_status_by(request.user):
-        error_msg = 'ليس لديك صلاحية لتغيير حالة هذه المهمة'
-        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            return JsonResponse({'success': False, 'error': error_msg})
-        messages.error(request, error_msg)
-        return redirect('tasks:my_tasks')
+    if not task.user_can_change_status:
+        return _task_permission_denied(request, 'ليس لديك صلاحية لتغيير حالة هذه المهمة')
     
     try:
         # Toggle status
         task.status = 'finished' if task.status == 'new' else 'new'
+        task.changed_by_id = request.user.pk
         task.save()
         
         status_text = 'مكتملة' if task.status == 'finished' else 'جديدة'
@@ -502,13 +513,7 @@ def projects(request):
     # Search functionality
     search_query = request.GET.get('search', '')
     if search_query:
-        projects = projects.filter(
-            Q(name__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(assigned_employees__name__icontains=search_query) |
-            Q(primary_assigned_employee__name__icontains=search_query) |
-            Q(created_by__name__icontains=search_query)
-        ).distinct()
+        projects = search(projects, search_query)
     
     # Filter by status
     status_filter = request.GET.get('status', '')
@@ -532,10 +537,9 @@ def projects(request):
             status__in=['new', 'in_progress']
         )
     
-    # Pagination
-    paginator = Paginator(projects, 12)  # 12 projects per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination, newest first
+    paginator = KeysetPaginator(projects, 12)  # 12 projects per page
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
     # Get employees for filter dropdown
     employees = Employee.objects.filter(is_active_employee=True).order_by('name')
@@ -1216,32 +1220,19 @@ def employee_tasks_list(request):
     Shows employee cards and when clicked shows their tasks
     """
     # Get all active employees with task counts
+    # Counts are read from the TaskCounter rollup (one join, no aggregation)
     employees = Employee.objects.filter(
         is_active_employee=True
     ).annotate(
-        total_tasks=Count('assigned_tasks') + Count('created_tasks'),
-        finished_tasks=Count(
-            Case(
-                When(Q(assigned_tasks__status='finished') | Q(created_tasks__status='finished'), then=1),
-                output_field=IntegerField()
-            )
-        ),
-        pending_tasks=Count(
-            Case(
-                When(Q(assigned_tasks__status='new') | Q(created_tasks__status='new'), then=1),
-                output_field=IntegerField()
-            )
-        )
+        total_tasks=Coalesce('task_counter__total_tasks', 0),
+        finished_tasks=Coalesce('task_counter__completed_tasks', 0),
+        pending_tasks=Coalesce('task_counter__pending_tasks', 0),
     ).order_by('name')
     
     # Search functionality
     search_query = request.GET.get('search', '')
     if search_query:
-        employees = employees.filter(
-            Q(name__icontains=search_query) |
-            Q(job_title__icontains=search_query) |
-            Q(job_number__icontains=search_query)
-        )
+        employees = search(employees, search_query)
     
     # Filter by section
     section_filter = request.GET.get('section', '')
@@ -1305,15 +1296,14 @@ def employee_task_detail(request, employee_id):
         assigned_tasks = assigned_tasks.filter(project_id=project_filter)
         created_tasks = created_tasks.filter(project_id=project_filter)
     
-    if search_query:
-        search_q = Q(name__icontains=search_query) | Q(detail__icontains=search_query)
-        assigned_tasks = assigned_tasks.filter(search_q)
-        created_tasks = created_tasks.filter(search_q)
-    
-    # Order by date
+    # Order by date (search results are ranked first, then by date)
     assigned_tasks = assigned_tasks.order_by('-created_at')
     created_tasks = created_tasks.order_by('-created_at')
     
+    if search_query:
+        assigned_tasks = search(assigned_tasks, search_query)
+        created_tasks = search(created_tasks, search_query)
+    
     # Get projects for filter
     projects = Project.objects.filter(
         Q(tasks__assigned_to=employee) | Q(tasks__created_by=employee)